@@ -291,63 +291,109 @@ def GaussianMultiErr(p, t, L, L_err):
 # Optimization and Bootstrap routines                           #
 #################################################################
 
-#function: Monte Carlo Error Analysis (independent gaussian errors)
-def MCerr(func, ins, params, errs, nums, conf, nproc=1):
+#function: draw Monte Carlo trial parameters
+def MCtrials(params, errs, nums, conf, cov=None, seed=None):
+    #params : list of parameters to put into function
+    #errs : list of error associated with parameters
+    #nums : list of number of trials to compute for each parameter,
+    #       or total number of trials (int) when cov is given
+    #conf : confidence interval within which trials are kept
+    #cov : covariance matrix of parameters, None for independent errors
+    #seed : int seed or np.random.RandomState, None for global np.random
+    #returns (n_trials x n_params) array of trials and, for independent
+    #errors, index of the parameter perturbed in each trial (else None)
+
+    from scipy.stats import norm, chi2
+
+    #random stream
+    if seed is None:
+        rng = np.random
+    elif isinstance(seed, np.random.RandomState):
+        rng = seed
+    else:
+        rng = np.random.RandomState(seed)
+    params = np.asarray(params, dtype=float)
+    n = len(params)
+    if cov is None:
+        #perturb one parameter at a time, others held at value
+        trials, groups = [], []
+        for i in range(n):
+            #perturb parameter N times by STD
+            trial = rng.normal(params[i], errs[i], nums[i])
+            #confidence interval
+            conf_int = norm.interval(conf, loc=params[i], scale=errs[i])
+            trial = trial[np.logical_and(trial>conf_int[0], trial<conf_int[1])]
+            block = np.tile(params, (len(trial), 1))
+            block[:,i] = trial
+            trials.append(block)
+            groups.append(np.full(len(trial), i))
+        return np.concatenate(trials, axis=0), np.concatenate(groups)
+    else:
+        #perturb all parameters jointly
+        N = nums if np.ndim(nums) == 0 else int(np.sum(nums))
+        trials = rng.multivariate_normal(params, cov, N)
+        #confidence region, in mahalanobis distance
+        d = trials - params
+        d2 = np.sum(d*np.linalg.solve(cov, d.T).T, axis=1)
+        trials = trials[d2 < chi2.ppf(conf, n)]
+        return trials, None
+
+#function: evaluate function at each Monte Carlo trial
+def MCeval(func, ins, trials, vectorized=False, nproc=1):
+    #func : function taking in parameters
+    #ins : list of inputs to function
+    #trials : (n_trials x n_params) array of parameters
+    #vectorized : whether func broadcasts over array parameters.
+    #             Each parameter is passed as an (n_trials, 1, ...) array
+    #             broadcasting against the inputs.
+    #returns array of values, first axis over trials
+    if vectorized:
+        #trials along a new leading axis
+        extra = max([np.ndim(x) for x in ins]+[0])
+        cols = [trials[:,j].reshape((-1,)+(1,)*extra) for j in range(trials.shape[1])]
+        vals = np.asarray(func(*(list(ins)+cols)))
+        return np.broadcast_to(vals, (len(trials),)+vals.shape[1:])
+    elif nproc > 1:
+        from .multi import WorkMap
+        #shared persistent pool, started once for all calls
+        vals, done = WorkMap(func, [list(ins)+list(trial) for trial in trials], nproc=nproc)
+        return np.array(vals)
+    else:
+        return np.array([func(*(list(ins)+list(trial))) for trial in trials])
+
+#function: Monte Carlo Error Analysis (independent or joint gaussian errors)
+def MCerr(func, ins, params, errs, nums, conf, nproc=1, cov=None, seed=None, vectorized=False):
     #func : function taking in parameters
     #ins : list of inputs to function
     #params : list of parameters to put into function
     #err : list of error associated with parameters
-    #nums: list of number of trials to compute for each parameter
-    #np.random.seed(0)
-
-    from scipy.stats import norm
-
-    #val = func(*(ins+params))
-    n = len(params)
-    val_errs = np.zeros(n)
-    val_means = np.zeros(n)
-    #val_means = np.zeros(n)
-    #for each parameter
-    for i in range(n):
-        #print "computing parameter "+str(i+1)+"/"+str(n)
-        #perturb parameter N times by STD
-        trials = np.random.normal(params[i], errs[i], nums[i])
-        #confidence interval
-        conf_int = norm.interval(conf, loc=params[i], scale=errs[i])
-        trials = trials[np.logical_and(trials>conf_int[0], trials<conf_int[1])]
-
-        if nproc > 1:
-            from multiprocessing import Pool
-            pool = Pool(nproc)
-            procs = []
-            #vals = np.zeros(nums[i])
-            #for each perturbation
-            for j in range(len(trials)):
-                #calculate value using perturbed perameter
-                trial_params = np.copy(params)
-                trial_params[i] = trials[j]
-                #perform processes in parallel
-                #vals[j] = func(*(ins+trial_params))
-                procs.append(pool.apply_async(func, ins+list(trial_params)))
-            vals = np.array([proc.get(timeout=10) for proc in procs])
-            pool.terminate()
-        else:
-            vals = np.zeros(len(trials))
-            #for each perturbation
-            for j in range(len(trials)):
-                #calculate value using perturbed perameter
-                trial_params = np.copy(params)
-                trial_params[i] = trials[j]
-                #perform process
-                vals[j] = func(*(ins+list(trial_params)))
-        
-        #error associated with perturbation of parameter
-        val_errs[i] = vals.std()
-        val_means[i] = vals.mean()
-        #val_means[i] = vals.mean()
-    #total summed error associated with all perturbation
-    val_err = np.sqrt(np.square(val_errs).sum())
-    val = val_means.mean()
+    #nums: list of number of trials to compute for each parameter,
+    #      or total number of trials when cov is given
+    #cov : covariance matrix of parameters, perturbs parameters jointly.
+    #      None perturbs each parameter independently.
+    #seed : int seed or np.random.RandomState for reproducible trials
+    #vectorized : evaluate all trials in one call of func (see MCeval)
+    #nproc : number of processes in shared pool, if not vectorized
+    #returns value and error, arrays if func returns arrays
+
+    #all trials at once
+    trials, groups = MCtrials(params, errs, nums, conf, cov=cov, seed=seed)
+    vals = MCeval(func, ins, trials, vectorized=vectorized, nproc=nproc)
+    if groups is None:
+        #spread over joint perturbation
+        val = vals.mean(axis=0)
+        val_err = vals.std(axis=0)
+    else:
+        n = len(params)
+        #error associated with perturbation of each parameter
+        val_errs = np.array([vals[groups==i].std(axis=0) for i in range(n)])
+        val_means = np.array([vals[groups==i].mean(axis=0) for i in range(n)])
+        #total summed error associated with all perturbation
+        val_err = np.sqrt(np.square(val_errs).sum(axis=0))
+        val = val_means.mean(axis=0)
+    if np.ndim(val) == 0:
+        #scalar function
+        return float(val), float(val_err)
     #return value and error
     return val, val_err
 
@@ -374,23 +420,70 @@ def fit_leastchi2(p0, datax, datay, yerr, function, errfunc=False, bounds=None,
     return res.x
 
 #function: bootstrap fitting method (Pedro Duarte)
-def fit_bootstrap(p0, datax, datay, yerr, function, errfunc=False, perturb=True, n=3000, nproc=4):
-
-    from multiprocessing import Pool
-    pool = Pool(nproc)
-
-    popt = fit_leastchi2(p0, datax, datay[0], yerr, function, errfunc)
-
+def fit_bootstrap(p0, datax, datay, yerr, function, errfunc=False, perturb=True, n=3000, nproc=4, timeout=None, chunksize=50, tol=None, full_output=False):
+    #datay : data if perturb, else list of data followed by resampled data
+    #n : maximum number of resampled data sets fitted. if not perturb,
+    #    datay[0] only gives best fit and at most n of datay[1:] are
+    #    fitted (all of datay used to be fitted, ignoring n)
+    #timeout : seconds for all fits, fits finished by then are used
+    #chunksize : resampled data sets fitted per worker task
+    #tol : stop once fractional change in parameter std over a round
+    #      of nproc*chunksize fits is below tol, None fits all n
+    #full_output : also return (n_fits x n_params) matrix of fits
+
+    from timeit import default_timer as timer
+    from functools import partial
+    from .multi import WorkMap
+
+    #best fit to unperturbed data
+    data = datay if perturb else datay[0]
+    popt = fit_leastchi2(p0, datax, data, yerr, function, errfunc)
+
+    #resampled data sets are fit starting from best fit
+    fit = partial(fit_leastchi2, popt, datax, yerr=yerr, function=function, errfunc=errfunc)
     if perturb:
-        # n random data sets are generated and fitted
-        randomDelta = np.random.normal(0., yerr, (n, len(datay)))
-        randomdataY = datay + randomDelta
+        n_max = n
     else:
-        randomdataY = datay
-    #perform processes asynchronously
-    procs = [pool.apply_async(fit_leastchi2, [p0, datax, randY, yerr, function, errfunc]) for randY in randomdataY]
-    ps = np.array([proc.get(timeout=10) for proc in procs])
-    pool.terminate()
+        n_max = min(n, len(datay)-1)
+    #fit resampled data in rounds, checking convergence after each
+    start = timer()
+    nround = max(1, nproc)*chunksize
+    ps = np.zeros((0, len(popt)))
+    std = None
+    while len(ps) < n_max:
+        m = min(nround, n_max-len(ps))
+        if perturb:
+            # m random data sets are generated and fitted
+            randomDelta = np.random.normal(0., yerr, (m, len(data)))
+            randomdataY = data + randomDelta
+        else:
+            randomdataY = datay[1+len(ps):1+len(ps)+m]
+        if timeout is not None:
+            remain = timeout - (timer()-start)
+            if remain <= 0:
+                break
+        else:
+            remain = None
+        if nproc == 1:
+            fits, done = [fit(randY) for randY in randomdataY], [True]*m
+        else:
+            #fit in shared pool, shipping fixed arguments once
+            fits, done = WorkMap(fit, [(randY,) for randY in randomdataY], nproc=nproc, chunksize=chunksize, timeout=remain)
+        #fits finished before timeout
+        fits = [p for p, d in zip(fits, done) if d]
+        if len(fits) > 0:
+            ps = np.concatenate((ps, fits), axis=0)
+        if not all(done):
+            break
+        #check convergence of parameter errors
+        std_old, std = std, np.std(ps, 0)
+        if tol is not None and std_old is not None:
+            if np.all(np.absolute(std-std_old) <= tol*std):
+                break
+    
+    if len(ps) == 0:
+        #errors from no fits would be nan, looking like a result
+        raise RuntimeError('No bootstrap fits finished within timeout.')
     
     #mean fit parameters
     #mean_pfit = np.mean(ps,0)
@@ -401,12 +494,13 @@ def fit_bootstrap(p0, datax, datay, yerr, function, errfunc=False, perturb=True,
                 # 1sigma corresponds to 68.3% confidence interval
                 # 2sigma corresponds to 95.44% confidence interval
     err_pfit = Nsigma * np.std(ps,0)
-    mean_pfit = np.mean(ps,0)
 
     #pfit_bootstrap = mean_pfit
     pfit_bootstrap = popt
     perr_bootstrap = err_pfit
-    return pfit_bootstrap, perr_bootstrap 
+    if full_output:
+        return pfit_bootstrap, perr_bootstrap, ps
+    return pfit_bootstrap, perr_bootstrap
 
     
 
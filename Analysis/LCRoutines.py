@@ -16,6 +16,7 @@
 
 #essential modules
 import numpy as np
+import os
 
 #################################################################
 # String Formatting Functions                                   #
@@ -242,8 +243,7 @@ def LCpurify(ts, mags, errs, strs=None, fluxes=None, snrs=None, nthres=None, lim
             if flags is not None:
                 for sflag in sflags:
                     #apply filter based on strs
-                    strlist = np.array([streach[-len(sflag):] for streach in strs[i]])
-                    index = np.logical_and(index,strlist!=sflag)
+                    index = np.logical_and(index,np.logical_not(np.char.endswith(strs[i],sflag)))
         #check for SNR filter (better than limiting magnitudes)
         if nthres is not None:
             index = np.logical_and(index, snrs[i] >= nthres)
@@ -253,7 +253,7 @@ def LCpurify(ts, mags, errs, strs=None, fluxes=None, snrs=None, nthres=None, lim
             index = np.logical_and(index, mags[i].astype(float) < lims[i])
         if aflag is not None:
             #antiflag prevents deletion of points below det lim
-            matches = np.array([strs[i][j][:len(aflag)]==aflag for j in range(len(strs[i]))])
+            matches = np.char.startswith(np.asarray(strs[i],dtype=str),aflag)
             index = np.logical_or(index, matches)
 
         mags[i] = mags[i][index]
@@ -455,8 +455,196 @@ def LCbin(t, mag, err, winlength):
             errb.append(np.sqrt(1/winnorm))
     return np.array(tb), np.array(magb), np.array(errb)
 
-#function: load light curve from text file
-def LCload(filenames, tcol, magcols, errcols=None, fluxcols=None, SNcols=None, SNthres=None, limcols=None, fcols=None, racols=None, deccols=None, terrcols=None, scols=None, flags=None, aflag=None, mode='single'):
+#################################################################
+# Light Curve Storage Functions                                 #
+#################################################################
+
+#function: name of header file accompanying binary light curve
+def LCheadname(filename):
+    return os.path.splitext(filename)[0]+'.hdr'
+
+#function: split text light curve file into header lines and rows of str tokens
+def LCtokens(filename):
+    head, rows = [], []
+    for line in open(filename):
+        line = line.strip()
+        if line.startswith(';'):
+            head.append(line)
+        elif len(line.split(';')[0]) > 0:
+            rows.append(line.split(';')[0].split())
+    return head, rows
+
+#function: convert rows of light curve str tokens to structured array
+def LCrecords(rows, names=None, dtype=None, strlen=32):
+    '''
+    #####################################################################
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    #   rows: list of rows, each a list of str column entries           #
+    #  names; list of str column names. If not given or not unique,     #
+    #         columns are named c0, c1, ...                             #
+    #  dtype; numpy structured dtype of columns. If not given, columns  #
+    #         where every entry is a number are float, others are str.  #
+    # strlen; int minimum length of str columns, leaving room to append #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #   data: structured array with one field per column                #
+    #####################################################################
+    '''
+    if dtype is None:
+        ncol = len(rows[0]) if len(rows) > 0 else len(names)
+        if names is None or len(names) != ncol or len(set(names)) != ncol:
+            names = ['c'+str(j) for j in range(ncol)]
+        formats = []
+        for j in range(ncol):
+            col = [row[j] for row in rows]
+            try:
+                np.array(col, dtype=float)
+                formats.append('f8')
+            except ValueError:
+                formats.append('U'+str(max([strlen]+[len(s) for s in col])))
+        dtype = np.dtype({'names':names, 'formats':formats})
+    data = np.zeros(len(rows), dtype=dtype)
+    for j, name in enumerate(dtype.names):
+        data[name] = [row[j] for row in rows]
+    return data
+
+#function: convert text light curve file to binary light curve file
+def LCtxt2npy(filename, outname=None, dtype=None, strlen=32):
+    '''
+    #####################################################################
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    # filename: str name of text light curve file, ';' header lines     #
+    #  outname; str name of binary light curve file, .npy (default      #
+    #           filename with extension replaced)                       #
+    #    dtype; numpy structured dtype of columns (default inferred)    #
+    #   strlen; int minimum length of str columns                       #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #  outname: str name of binary light curve file. Rows are stored as #
+    #           a numpy structured array, header lines in a .hdr file.  #
+    #####################################################################
+    '''
+    if outname is None:
+        outname = os.path.splitext(filename)[0]+'.npy'
+    head, rows = LCtokens(filename)
+    #column names from last header line
+    names = head[-1][1:].split() if len(head) > 0 else None
+    np.save(outname, LCrecords(rows, names=names, dtype=dtype, strlen=strlen))
+    hdrfile = open(LCheadname(outname), 'w')
+    hdrfile.write('\n'.join(head))
+    hdrfile.close()
+    return outname
+
+#function: convert binary light curve file to text light curve file
+def LCnpy2txt(filename, outname=None):
+    '''
+    #####################################################################
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    # filename: str name of binary light curve file                     #
+    #  outname; str name of text light curve file (default filename     #
+    #           with extension replaced by .txt)                        #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #  outname: str name of text light curve file, space padded columns #
+    #####################################################################
+    '''
+    if outname is None:
+        outname = os.path.splitext(filename)[0]+'.txt'
+    data = np.load(filename, mmap_mode='r')
+    #columns as str, floats at full precision
+    cols = [data[name].astype(str) for name in data.dtype.names]
+    lens = [max([len(s) for s in col]+[0])+2 for col in cols]
+    out = []
+    if os.path.exists(LCheadname(filename)):
+        out += open(LCheadname(filename)).read().splitlines()
+    for i in range(len(data)):
+        out.append(' '+''.join([padstr(str(col[i]), l) for col, l in zip(cols, lens)]))
+    outfile = open(outname, 'w')
+    outfile.write('\n'.join(out))
+    outfile.close()
+    return outname
+
+#function: append rows to binary light curve file
+def LCappend(filename, rows):
+    '''
+    #####################################################################
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    # filename: str name of binary light curve file                     #
+    #     rows: structured array, or list of rows of str column entries #
+    #           as in text light curve file                             #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #        N: int number of rows in binary light curve file           #
+    #####################################################################
+    '''
+    from io import BytesIO
+    from numpy.lib import format
+
+    #read header of npy file
+    f = open(filename, 'rb')
+    version = format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran, dtype = format.read_array_header_1_0(f)
+    else:
+        shape, fortran, dtype = format.read_array_header_2_0(f)
+    offset = f.tell()
+    f.close()
+    if isinstance(rows, np.ndarray) and rows.dtype.names is not None:
+        rows = rows.astype(dtype)
+    else:
+        rows = LCrecords(rows, dtype=dtype)
+    N = shape[0]+len(rows)
+    #header with new length, npy headers are padded to grow in place
+    hdr = BytesIO()
+    if version == (1, 0):
+        format.write_array_header_1_0(hdr, {'descr':format.dtype_to_descr(dtype), 'fortran_order':False, 'shape':(N,)})
+    else:
+        format.write_array_header_2_0(hdr, {'descr':format.dtype_to_descr(dtype), 'fortran_order':False, 'shape':(N,)})
+    if len(hdr.getvalue()) == offset:
+        f = open(filename, 'r+b')
+        f.write(hdr.getvalue())
+        f.seek(offset+shape[0]*dtype.itemsize)
+        f.write(rows.tobytes())
+        f.close()
+    else:
+        #header grew, rewrite file
+        np.save(filename, np.concatenate([np.load(filename), rows]))
+    return N
+
+#function: load columns of light curve file in one pass, binary or text
+def LCread(filename, usecols, dtypes):
+    '''
+    #####################################################################
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    # filename: str name of light curve file. Files ending in .npy are  #
+    #           read as binary light curve, memory mapped.              #
+    #  usecols: list of int locations of columns                        #
+    #   dtypes: list of types of each column array                      #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #     cols: list of column arrays                                   #
+    #####################################################################
+    '''
+    if filename.endswith('.npy'):
+        data = np.load(filename, mmap_mode='r')
+        names = data.dtype.names
+        return [np.array(data[names[col]]).astype(dtype) for col, dtype in zip(usecols, dtypes)]
+    #tokenize file once, then convert each requested column
+    head, rows = LCtokens(filename)
+    return [np.array([row[col] for row in rows], dtype=dtype) for col, dtype in zip(usecols, dtypes)]
+
+#function: load light curve from text or binary file
+def LCload(filenames, tcol, magcols, errcols=None, fluxcols=None, SNcols=None, SNthres=None, limcols=None, fcols=None, racols=None, deccols=None, terrcols=None, scols=None, flags=None, aflag=None, mode='single', nproc=1):
     '''
     #######################################################################
     # Input                                                               #
@@ -465,6 +653,7 @@ def LCload(filenames, tcol, magcols, errcols=None, fluxcols=None, SNcols=None, S
     #             'multi' => read from many txt each containing one band. #
     #                                                                     #
     # filenames: string file name (single), or list of file names (multi) #
+    #            Files ending in .npy are read as binary light curves.    #
     #                                                                     #
     #      tcol: int location of time column.                             #
     #                                                                     #
@@ -507,6 +696,9 @@ def LCload(filenames, tcol, magcols, errcols=None, fluxcols=None, SNcols=None, S
     #            corresponding to a measured magnitude below the          #
     #            detection limit from purging.                            #
     #            "" indicates don't purge at all based on lims.           #
+    #                                                                     #
+    #     nproc; int number of processes loading files (multi), None for  #
+    #            all cores. Each file is read in one pass.                #
     # ------------------------------------------------------------------- #
     # Output                                                              #
     # ------------------------------------------------------------------- #
@@ -537,168 +729,94 @@ def LCload(filenames, tcol, magcols, errcols=None, fluxcols=None, SNcols=None, S
     #  terrs; list of terr (if given)                                     #
     #######################################################################
     '''
+    #columns to load, each with the type it is loaded as
+    keys = ['t', 'mags', 'errs', 'fluxes', 'snrs', 'lims', 'strs', 'fs', 'ras', 'decs', 'terrs']
+    cols = [tcol, magcols, errcols, fluxcols, SNcols, limcols, scols, fcols, racols, deccols, terrcols]
+    types = [float, str, str, str, float, float, str, str, float, float, float]
+    if errcols == 'valerr':
+        #errors are in mag column formatting
+        cols[2] = None
     #check load mode, multifile or singlefile
     if mode == 'single':
-        #load time column
-        t = np.loadtxt(filenames,usecols=(tcol,),comments=';',unpack=True)
-        ts = [t]*len(magcols)
-        #load mag columns
-        mags = list(np.loadtxt(filenames,dtype=str,usecols=magcols,comments=';',unpack=True))
-        #retrieve mag errors
-        if errcols == 'valerr': #error columns in formatting
-            #extract errors from magnitude
-            mags, errs = LCsplit(mags)
-        elif errcols is not None: #error columns in file
-            #load err columns
-            errs = list(np.loadtxt(filenames,dtype=str,usecols=errcols,comments=';',unpack=True))
-        else: #no errors given
-            errs = [np.array(['1.0']*len(t)) for t in ts]
-        #retrieve fluxes
-        if fluxcols is not None:
-            #load flux columns
-            fluxes = list(np.loadtxt(filenames,dtype=str,usecols=fluxcols,comments=';',unpack=True))
-        else: #no fluxes given
-            fluxes = [np.array(['1.0']*len(t)) for t in ts]
-        if SNcols is not None:
-            #load SNR column
-            snrs = list(np.loadtxt(filenames,usecols=SNcols,comments=';',unpack=True))
-        else: #no SNR given
-            snrs = [np.array([-1.0]*len(t)) for t in ts]
-        if limcols is not None:
-            #load Mlims column
-            lims = np.loadtxt(filenames,usecols=limcols,comments=';',unpack=True)
-        else: #no lims given
-            lims = [np.array([-1.0]*len(t)) for t in ts]
-
-        #check if comment strings are given
-        if scols is not None:
-            #extract comments from files
-            strs = np.loadtxt(filenames,dtype=str,usecols=scols,comments=';',unpack=True)
-        else: #no strings given
-            strs = [np.array(['_']*len(t)) for t in ts]
-
-        #check if filename strings are given
-        if fcols is not None:
-            #extract comments from files
-            fs = np.loadtxt(filenames,dtype=str,usecols=fcols,comments=';',unpack=True)
-        else: #no strings given
-            fs = [np.array(['_']*len(t)) for t in ts]
-
-        #check if locations are given
-        if racols is not None:
-            #extract comments from files
-            ras = np.loadtxt(filenames,usecols=racols,comments=';',unpack=True)
-        else: #no strings given
-            ras = [np.array([0]*len(t)) for t in ts]
-        if deccols is not None:
-            #extract comments from files
-            decs = np.loadtxt(filenames,usecols=deccols,comments=';',unpack=True)
-        else: #no strings given
-            decs = [np.array([0]*len(t)) for t in ts]
-        if terrcols is not None:
-            #extract comments from files
-            terrs = np.loadtxt(filenames,usecols=terrcols,comments=';',unpack=True)
-        else: #no strings given
-            terrs = [np.array([0]*len(t)) for t in ts]
-            
+        #all bands in one file, list of columns for each quantity
+        keys = [key for key, col in zip(keys, cols) if col is not None]
+        types = [typ for typ, col in zip(types, cols) if col is not None]
+        cols = [col for col in cols if col is not None]
+        usecols, dtypes = [], []
+        for col, typ in zip(cols, types):
+            usecols += list(np.atleast_1d(col))
+            dtypes += [typ]*len(np.atleast_1d(col))
+        #load all columns in one pass
+        data = LCread(filenames, usecols, dtypes)
+        loaded = {}
+        for key, col in zip(keys, cols):
+            loaded[key] = data[:len(np.atleast_1d(col))]
+            data = data[len(np.atleast_1d(col)):]
+        ts = loaded['t']*len(magcols)
     elif mode == 'multi':
-        #load from each file
-        ts, mags = [], []
-        for filename in filenames:
-            #load time column
-            ts.append(np.loadtxt(filename,usecols=(tcol,),comments=';',unpack=True))
-            #load mag column
-            mags.append(np.loadtxt(filename,dtype=str,usecols=(magcols,),comments=';',unpack=True))
-        #retrieve mag errors
-        if errcols == 'valerr': #error columns in formatting
-            #extract errors from magnitude
-            mags, errs = LCsplit(mags)
-        elif errcols is not None: #error columns in files
-            #extract errors from files
-            errs = []
-            for filename in filenames:
-                #load err columns
-                errs.append(np.loadtxt(filename,dtype=str,usecols=(errcols,),comments=';',unpack=True))
-        else: #no errors given
-            errs = [np.array(['1.0']*len(t)) for t in ts]
-        #retrieve fluxes
-        if fluxcols is not None:
-            #extract fluxes from files
-            fluxes = []
-            for filename in filenames:
-                #load flux columns
-                fluxes.append(np.loadtxt(filename,dtype=str,usecols=(fluxcols,),comments=';',unpack=True))
-        else: #no fluxes given
-            fluxes = [np.array(['1.0']*len(t)) for t in ts]
-        #check if SNR are given
-        if SNcols is not None:
-            #extract SNR from files
-            snrs = []
-            for filename in filenames:
-                #load SNR column
-                snrs.append(np.loadtxt(filename,usecols=(SNcols,),comments=';',unpack=True))
-        else: #no SNR given
-            snrs = [np.array([-1.0]*len(t)) for t in ts]
-        #check if limiting magnitudes are given
-        if limcols is not None:
-            #extract mlims from files
-            lims = []
-            for filename in filenames:
-                #load comment column
-                lims.append(np.loadtxt(filename,usecols=(limcols,),comments=';',unpack=True))
-        else: #no lims given
-            lims = [np.array([1.0]*len(t)) for t in ts]
-
-        #check if comment strings are given
-        if scols is not None:
-            #extract comments from files
-            strs = []
-            for filename in filenames:
-                #load comment column
-                s = np.loadtxt(filename,dtype=str,usecols=(scols,),comments=';',unpack=True)
-                strs.append(s)
+        #one band in each file, one column for each quantity
+        keys = [key for key, col in zip(keys, cols) if col is not None]
+        usecols = [col for col in cols if col is not None]
+        dtypes = [typ for typ, col in zip(types, cols) if col is not None]
+        #load all columns of each file in one pass
+        if nproc == 1 or len(filenames) < 2:
+            data = [LCread(filename, usecols, dtypes) for filename in filenames]
         else:
-            strs = [np.array(['_']*len(t)) for t in ts]
-
-        #check if filename strings are given
-        if fcols is not None:
-            #extract comments from files
-            fs = []
-            for filename in filenames:
-                #load comment column
-                f = np.loadtxt(filename,dtype=str,usecols=(fcols,),comments=';',unpack=True)
-                fs.append(f)
-        else: #no strings given
-            fs = [np.array(['_']*len(t)) for t in ts]
-
-        #check if locations are given
-        if racols is not None:
-            #extract comments from files
-            ras = []
-            for filename in filenames:
-                #load comment column
-                ra = np.loadtxt(filename,usecols=(racols,),comments=';',unpack=True)
-                ras.append(ra)
-        else: #no strings given
-            ras = [np.array([0]*len(t)) for t in ts]
-        if deccols is not None:
-            #extract comments from files
-            decs = []
-            for filename in filenames:
-                #load comment column
-                dec = np.loadtxt(filename,usecols=(deccols,),comments=';',unpack=True)
-                decs.append(dec)
-        else: #no strings given
-            decs = [np.array([0]*len(t)) for t in ts]
-        if terrcols is not None:
-            #extract comments from files
-            terrs = []
-            for filename in filenames:
-                #load comment column
-                terr = np.loadtxt(filename,usecols=(terrcols,),comments=';',unpack=True)
-                terrs.append(terr)
-        else: #no strings given
-            terrs = [np.array([0]*len(t)) for t in ts]
+            from .multi import WorkMap
+            data, done = WorkMap(LCread, [(filename, usecols, dtypes) for filename in filenames], nproc=nproc, chunksize=1)
+        loaded = {}
+        for k, key in enumerate(keys):
+            loaded[key] = [datum[k] for datum in data]
+        ts = loaded['t']
+    mags = loaded['mags']
+    #retrieve mag errors
+    if errcols == 'valerr': #error columns in formatting
+        #extract errors from magnitude
+        mags, errs = LCsplit(mags)
+    elif errcols is not None: #error columns in file
+        errs = loaded['errs']
+    else: #no errors given
+        errs = [np.array(['1.0']*len(t)) for t in ts]
+    #retrieve fluxes
+    if fluxcols is not None:
+        fluxes = loaded['fluxes']
+    else: #no fluxes given
+        fluxes = [np.array(['1.0']*len(t)) for t in ts]
+    #check if SNR are given
+    if SNcols is not None:
+        snrs = loaded['snrs']
+    else: #no SNR given
+        snrs = [np.array([-1.0]*len(t)) for t in ts]
+    #check if limiting magnitudes are given
+    if limcols is not None:
+        lims = loaded['lims']
+    elif mode == 'single': #no lims given
+        lims = [np.array([-1.0]*len(t)) for t in ts]
+    else:
+        lims = [np.array([1.0]*len(t)) for t in ts]
+    #check if comment strings are given
+    if scols is not None:
+        strs = loaded['strs']
+    else: #no strings given
+        strs = [np.array(['_']*len(t)) for t in ts]
+    #check if filename strings are given
+    if fcols is not None:
+        fs = loaded['fs']
+    else: #no strings given
+        fs = [np.array(['_']*len(t)) for t in ts]
+    #check if locations are given
+    if racols is not None:
+        ras = loaded['ras']
+    else: #no locations given
+        ras = [np.array([0]*len(t)) for t in ts]
+    if deccols is not None:
+        decs = loaded['decs']
+    else: #no locations given
+        decs = [np.array([0]*len(t)) for t in ts]
+    if terrcols is not None:
+        terrs = loaded['terrs']
+    else: #no time errors given
+        terrs = [np.array([0]*len(t)) for t in ts]
 
     #check if SN filter is applied
     if SNthres is not None:
@@ -749,7 +867,7 @@ def DLT_load(filename, tcol, magcol, errcol, syscol=None):
     #load time column, convert to day of year
     t = np.loadtxt(filename,usecols=(tcol,),comments='#',unpack=True, dtype=str)
     year = t[0][:4]
-    t = np.array([isot_day(time, year) for time in t])
+    t = np.atleast_1d(isot_day(t, year))
     #load magnitudes, filter out nans
     mag = np.loadtxt(filename,usecols=(magcol,),comments='#',unpack=True)
     err = np.loadtxt(filename,usecols=(errcol,),comments='#',unpack=True)
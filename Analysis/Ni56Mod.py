@@ -26,20 +26,36 @@ def ArnettFit(t, M_N, MejE):
     #################################
     #array of luminosity (erg/s)
 
-    from scipy.integrate import simps
-    
     #Constants
     M_sun=2.e33
-    c=3.e10
     #parameters to be fitted
     M_Ni=M_N*M_sun
-    M_ejE_K = MejE*((M_sun)**3/(1.e51))**(0.25)
     #time axis (sec)
     #dt=(np.arange(103*4)/4.+0.25)*86400.
     #dt = np.arange(0.25,103.25,0.25)*86400.
-    dt = t*86400.
-    dt = np.array([dt]) if (isinstance(dt, np.float64) or isinstance(dt, float)) else dt
-    n = len(dt)
+    dt = np.atleast_1d(t)*86400.
+
+    e_Ni=3.90e10 #erg/s/g energy produced by 1 gram of Ni
+    e_Co=6.78e9 #erg/s/g energy produced by 1 gram of Co
+
+    #A(z) and B(z) integrated from 0 to x, for all times at once
+    x, y, s = ArnettScales(dt, MejE)
+    int_A = ArnettInt(x, y)
+    int_B = ArnettInt(x, y-s)
+    L_ph=M_Ni*((e_Ni-e_Co)*int_A+e_Co*int_B)
+
+    #return results
+    return L_ph
+
+#function: Arnett dimensionless time x, and decay parameters y, s
+def ArnettScales(dt, MejE):
+    #dt = time from epoch in seconds
+    #MejE = (Mej^3/Ek)^(1/4)
+
+    #Constants
+    M_sun=2.e33
+    c=3.e10
+    M_ejE_K = MejE*((M_sun)**3/(1.e51))**(0.25)
 
     beta=13.8 #constant of integration (Arnett 1982)
     k_opt=0.1 #g/cm^2 optical opacity (this corresponds to electron scattering)
@@ -47,32 +63,69 @@ def ArnettFit(t, M_N, MejE):
     tau_Ni=8.8*86400. #decay time of Ni56 in sec
     tau_Co=9.822e6 #decay time of Co56 in sec
 
-    e_Ni=3.90e10 #erg/s/g energy produced by 1 gram of Ni
-    e_Co=6.78e9 #erg/s/g energy produced by 1 gram of Co
-
     #tau_m is the timescale of the light-curve
     #tau_m=((k_opt/(beta*c))**0.5)*((10./3.)**(0.25))*M_ejE_K
     tau_m=((k_opt/(beta*c))**0.5)*((6./5.)**(0.25))*M_ejE_K
 
-    #integrate up the A(z) factor where z goes from 0 to x
-    int_A=np.zeros(n) 
-    int_B=np.zeros(n) 
-    L_ph=np.zeros(n)
-
     x=dt/tau_m
     y=tau_m/(2.*tau_Ni)
     s=tau_m*(tau_Co-tau_Ni)/(2.*tau_Co*tau_Ni)
-
-    for i in range(n):
-        z=np.arange(100)*x[i]/100.
-        Az=2.*z*np.exp(-2.*z*y+np.square(z))
-        Bz=2.*z*np.exp(-2.*z*y+2.*z*s+np.square(z))
-        int_A[i]=simps(Az,z)
-        int_B[i]=simps(Bz,z)
-        L_ph[i]=(M_Ni*np.exp(-1.*np.square(x[i])))*((e_Ni-e_Co)*int_A[i]+e_Co*int_B[i])
-
-    #return results
-    return L_ph
+    return x, y, s
+
+#function: exp(-x^2) times integral of 2z*exp(z^2-2zy) from 0 to x
+def ArnettInt(x, y):
+    #closed form using Dawson's integral, stable for large x
+    from scipy.special import dawsn
+    return (np.exp(-2.*x*y)*(1.+2.*y*dawsn(x-y))
+            - np.exp(-np.square(x))*(1.-2.*y*dawsn(y)))
+
+#global: table of Arnett peak times (days) over MejE, built on first use
+arnettpeaks = None
+
+#function: tabulate Arnett peak time over log spaced MejE grid
+def ArnettPeakTable(MejEs=np.logspace(-4, 4, 4001)):
+    #default MejE range gives peak times of about 0.0033 to 1460 days
+    global arnettpeaks
+    e_Ni=3.90e10 #erg/s/g energy produced by 1 gram of Ni
+    e_Co=6.78e9 #erg/s/g energy produced by 1 gram of Co
+    #dimensionless decay parameters for each MejE
+    _, y, s = ArnettScales(0., MejEs)
+    #zero of light curve slope, dL/dx over 2x
+    def slope(x):
+        return ((e_Ni-e_Co)*(np.exp(-2.*x*y)-ArnettInt(x, y))
+                + e_Co*(np.exp(-2.*x*(y-s))-ArnettInt(x, y-s)))
+    #bisect for all MejE at once, slope is positive before peak
+    lo, hi = np.zeros(len(MejEs)), np.full(len(MejEs), 20.)
+    for i in range(60):
+        mid = 0.5*(lo+hi)
+        rise = slope(mid) > 0
+        lo, hi = np.where(rise, mid, lo), np.where(rise, hi, mid)
+    #peak time in days
+    tau_m = ArnettScales(86400., MejEs)[0]
+    arnettpeaks = (MejEs, 0.5*(lo+hi)/tau_m)
+    return arnettpeaks
+
+#function: interpolate log-log table, NaN outside it
+def ArnettLookup(x, xs, ys):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logx = np.log(x)
+        inside = np.logical_and(logx >= np.log(xs[0]), logx <= np.log(xs[-1]))
+        y = np.where(inside, np.exp(np.interp(logx, np.log(xs), np.log(ys))), np.nan)
+    if np.ndim(y) == 0:
+        return float(y)
+    return y
+
+#function: Arnett peak time (days) for MejE, from cached table
+def ArnettPeak(MejE):
+    #NaN for MejE outside table
+    MejEs, tpeaks = arnettpeaks if arnettpeaks is not None else ArnettPeakTable()
+    return ArnettLookup(MejE, MejEs, tpeaks)
+
+#function: MejE giving Arnett peak at time tpeak (days), from cached table
+def ArnettPeakMejE(tpeak):
+    #NaN for tpeak outside table
+    MejEs, tpeaks = arnettpeaks if arnettpeaks is not None else ArnettPeakTable()
+    return ArnettLookup(tpeak, tpeaks, MejEs)
 
 #function: break Arnett degeneracy
 def ArnettMejE(MejE, MejEerr, vej, vejerr):
@@ -103,36 +156,22 @@ def ArnettNi56MC(p, tmax, Lmax, Lmax_err, n=100):
 
 #function: Arnett error function for determining MejEk parameter
 def ArnettMaxErr1(p, tmax, tmax_err):
-
-    from scipy.optimize import fmin
-
     #get maximum of 
-    ta_max = fmin(lambda t: -1*ArnettFit(t, 1.0, np.absolute(p)), 50, (), 0.01)[0]
+    ta_max = ArnettPeak(np.absolute(p))
     tX2 = np.absolute(ta_max-tmax)/tmax_err
     return tX2
 
 #function: fit 2 parameter function to a 2D intercept using Monte Carlo
-def ArnettIntercept(tmax, Lmax, tmax_err, Lmax_err, p0=1.2, n=100, nproc=4):
-
-    from scipy.optimize import fmin
-    from multiprocessing import Pool
+def ArnettIntercept(tmax, Lmax, tmax_err, Lmax_err, p0=1.2, n=100, nproc=4, timeout=None):
+    #p0, nproc, timeout : unused, MejE is found by inverting peak time table
 
-    #to pickle properly, you need dill.
-    from .multi import apply_async
-
-    pool = Pool(nproc)
-    
     #bootstrap sample in x-direction to determine MejEk
     xs = np.random.normal(tmax, tmax_err, n)
-    #For each point, solve function
-    procs = []
-    for i, x in enumerate(xs):
-        print((str(i+1)+'/'+str(n)))
-        errfunc = lambda p: ArnettMaxErr1(p, x, tmax_err)
-        procs.append(apply_async(pool, fmin, [errfunc, p0, (), 0.001, 0.01]))
-    #retrieve processes
-    popt = [proc.get()[0] for proc in procs]
-    pool.terminate()
+    #For each point, MejE with Arnett peak at that time. draws at
+    #non-positive times, or outside peak time table, have no MejE and
+    #are dropped, so ME and MEerr come from fewer than n samples
+    popt = ArnettPeakMejE(xs[xs > 0])
+    popt = popt[np.isfinite(popt)]
     #interpret results
     ME = np.mean(popt, axis=0)
     MEerr = np.std(popt, axis=0)
@@ -145,6 +184,56 @@ def ArnettIntercept(tmax, Lmax, tmax_err, Lmax_err, p0=1.2, n=100, nproc=4):
 # Piro and Nakar 2014 based Ni56 model.                         #
 #################################################################
 
+#global: grid in x=t/t_diff for Ni56 distribution integrals
+ni_xrange = np.linspace(0.0005,1,2000, endpoint=True)
+#global: Ni56 distribution normalization integrals, keyed by (beta, x_2)
+ni56norms = {}
+
+#function: integral of unnormalized Ni56 distribution over x_range, cached
+def Ni56norm(beta, x_2):
+    key = (float(beta), float(x_2))
+    if key not in ni56norms:
+        from scipy.integrate import simpson
+        if len(ni56norms) > 1024:
+            #forget old fits
+            ni56norms.clear()
+        intg_x56 = ni_xrange**0.76/(1.+np.exp(-beta*(ni_xrange-x_2)))
+        ni56norms[key] = simpson(intg_x56, x=ni_xrange)
+    return ni56norms[key]
+
+#function: cumulative trapezoid integral of y over x, along last axis
+def cumtrapz(y, x):
+    steps = 0.5*(y[...,1:]+y[...,:-1])*np.diff(x)
+    return np.concatenate((np.zeros(y.shape[:-1]+(1,)), np.cumsum(steps, axis=-1)), axis=-1)
+
+#function: luminosity from Ni56 shallower and deeper than diffusion depth
+def NiDiffLum(x, X56_range, eps, eps_diff, L_diff):
+    from scipy.special import erfc
+
+    x_range = ni_xrange
+    #Ni56 mass above each depth in x_range
+    intg_ni = X56_range*x_range**0.76
+    cum_ni = cumtrapz(intg_ni, x_range)
+    #lambda function, normalized by total Ni56
+    lambd = L_diff*(eps/eps_diff)/cum_ni[-1]
+    #luminosity due to Ni56 shallower than diffusion depth.
+    L_direct = lambd*np.interp(x, x_range, cum_ni)
+    #luminosity due to Ni56 deeper than diffusion depth, before x=1
+    L_tail = np.zeros(len(x))
+    deep = x < 1
+    x_deep = x[deep]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        diff_corr = erfc(x_range/x_deep[:,None]/np.sqrt(2.))/erfc(1./np.sqrt(2.))
+    #cumulative tail integrals, one row per time
+    cum_tail = cumtrapz(intg_ni*diff_corr, x_range)
+    #interpolate each row at its diffusion depth
+    j = np.clip(np.searchsorted(x_range, x_deep)-1, 0, len(x_range)-2)
+    w = np.clip((x_deep-x_range[j])/(x_range[j+1]-x_range[j]), 0, 1)
+    rows = np.arange(len(x_deep))
+    cum_x = cum_tail[rows,j]*(1-w) + cum_tail[rows,j+1]*w
+    L_tail[deep] = lambd[deep]*(cum_tail[:,-1]-cum_x)
+    return L_direct, L_tail
+
 #function: Piro and Nakar model
 def PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2, plot=False):
     #Inputs
@@ -165,9 +254,6 @@ def PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2, plot=False):
     #################################
     #array of luminosity (erg/s)
 
-    from scipy.integrate import simps
-    from scipy.special import erfc
-
     #Constants
     M_sun=2.e33
 
@@ -176,7 +262,6 @@ def PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2, plot=False):
     #time axis, in days
     t = np.array([t]) if (isinstance(t, np.float64) or
                             isinstance(t, float)) else t
-    n = len(t)
 
     k_opt=1.0 #x0.1g/cm^2 (this corresponds to electron scattering)
     
@@ -200,12 +285,11 @@ def PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2, plot=False):
     x = t/t_diff
 
     #normalize Ni56 distribution
-    x_range=np.linspace(0.0005,1,2000, endpoint=True)
-    intg_x56 = x_range**0.76/(1.+np.exp(-beta*(x_range-x_2)))
+    x_range = ni_xrange
     #Ni56 mass
     M_ni = L_diff/eps_diff/M_sun
     #normalization factor
-    norm = M_ni/(1.76*dM_diff)/simps(intg_x56, x_range)
+    norm = M_ni/(1.76*dM_diff)/Ni56norm(beta, x_2)
     #Ni56 mass fraction at depth
     X56_x = norm/(1+np.exp(-beta*(x-x_2)))
     #total Ni56 distribution
@@ -214,44 +298,10 @@ def PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2, plot=False):
     #approx. local heating from Ni56 in erg/s
     L56 = X56_x*dM*M_sun*eps
     
-    #integrate lambda function
-    intg_lambd = simps(X56_range*x_range**0.76, x_range)
-    lambd = (eps/eps_diff)/(intg_lambd/(X56_x*x**1.76))
     #integrate from 0 to t at each epoch
-    L_direct = np.zeros(n)
-    L_tail = np.zeros(n)
-    L_ph = np.zeros(n)
-    for i in range(n):
-        #before diffusion time is reached
-        if x[i] < 1: #there is Ni56 deeper than diffusion depth
-            #luminosity due to Ni56 shallower than diffusion depth.
-            mask_direct = x_range<=x[i]
-            x_direct = x_range[mask_direct]
-            X56_direct = X56_range[mask_direct]
-            intg_direct = (X56_direct/X56_x[i])*(x_direct/x[i])**1.76/x_direct
-            L_direct[i] = L_diff * lambd[i] * simps(intg_direct, x_direct)
-            
-            #luminosity due to Ni56 deeper than diffusion depth.
-            mask_tail = x_range>=x[i]
-            x_tail = x_range[mask_tail]
-            X56_tail = X56_range[mask_tail]
-            intg_tail =  (X56_tail/X56_x[i])*(x_tail/x[i])**1.76/x_tail
-            diff_corr = erfc(x_tail/x[i]/np.sqrt(2.))/erfc(1./np.sqrt(2.))
-            L_tail[i] = L_diff * lambd[i] * simps(intg_tail*diff_corr, x_tail)
-        else: #diffusion depth has exposed all nickel
-            #L_direct[i] = 0.35*M_sun*eps[i]
-            
-            #luminosity due to Ni56 shallower than diffusion depth.
-            x_direct = x_range
-            X56_direct = X56_range
-            intg_direct = (X56_direct/X56_x[i])*(x_direct/x[i])**1.76/x_direct
-            L_direct[i] = L_diff * lambd[i] * simps(intg_direct, x_direct)
-            
-            #no Ni56 is deeper than diffusion depth
-            L_tail[i] = 0
-        
-        #total luminosity
-        L_ph[i] = L_direct[i] + L_tail[i]
+    L_direct, L_tail = NiDiffLum(x, X56_range, eps, eps_diff, L_diff)
+    #total luminosity
+    L_ph = L_direct + L_tail
         
     if plot:
         import matplotlib.pyplot as plt
@@ -297,8 +347,6 @@ def PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2, plot=False):
 
 #function: plot Ni56 model
 def plotNi56mod(tB, tfit, LB, LBerr, t_diff, L_diff, Mni, Mej, Ek, beta, x_2, etc):
-    from scipy.integrate import simps
-    from scipy.special import erfc
     
     t = np.arange(t_diff/1000,tfit,0.01)
     L = PN13Fit(t, t_diff, L_diff, Mej, Ek, beta, x_2)
@@ -331,25 +379,18 @@ def plotNi56mod(tB, tfit, LB, LBerr, t_diff, L_diff, Mni, Mej, Ek, beta, x_2, et
     x = t/t_diff
 
     #normalize Ni56 distribution
-    x_range=np.linspace(0.0005,1,2000, endpoint=True)
-    intg_x56 = x_range**0.76/(1.+np.exp(-beta*(x_range-x_2)))
+    x_range = ni_xrange
     #Ni56 mass
     M_ni = L_diff/eps_diff/M_sun
     #normalization factor
-    norm = M_ni/(1.76*dM_diff)/simps(intg_x56, x_range)
+    norm = M_ni/(1.76*dM_diff)/Ni56norm(beta, x_2)
     #Ni56 mass fraction at depth
     X56_x = norm/(1+np.exp(-beta*(x-x_2)))
     #total Ni56 distribution
     X56_range = norm/(1+np.exp(-beta*(x_range-x_2)))
 
     #quantity of nickel above diffusion depth
-    M_ni = np.zeros(len(t))
-    for i in range(len(t)):
-        mask_ni = x_range<=x[i]
-        x_ni = x_range[mask_ni]
-        X56_ni = X56_range[mask_ni]
-        intg_ni = X56_ni*x_ni**0.76
-        M_ni[i] = 1.76*dM[i]*simps(intg_ni, x_ni)
+    M_ni = 1.76*dM*np.interp(x, x_range, cumtrapz(X56_range*x_range**0.76, x_range))
     
     #approx. local heating from Ni56 in erg/s
     M56 = X56_x*dM
@@ -431,9 +472,6 @@ def Ni56dist(t, t_diff, L_diff, Mej, Ek, beta, x_2):
     #################################
     #array of Ni56 fraction
 
-    from scipy.integrate import simps
-    from scipy.special import erfc
-
     #Constants
     M_sun=2.e33
 
@@ -466,12 +504,10 @@ def Ni56dist(t, t_diff, L_diff, Mej, Ek, beta, x_2):
     x = t/t_diff
 
     #normalize Ni56 distribution
-    x_range=np.linspace(0.0005,1,2000, endpoint=True)
-    intg_x56 = x_range**0.76/(1.+np.exp(-beta*(x_range-x_2)))
     #Ni56 mass
     M_ni = L_diff/eps_diff/M_sun
     #normalization factor
-    norm = M_ni/(1.76*dM_diff)/simps(intg_x56, x_range)
+    norm = M_ni/(1.76*dM_diff)/Ni56norm(beta, x_2)
     #Ni56 mass fraction at depth
     X56_x = norm/(1+np.exp(-beta*(x-x_2)))
     #Ni56 distribution
@@ -480,7 +516,6 @@ def Ni56dist(t, t_diff, L_diff, Mej, Ek, beta, x_2):
 
 #function: predict observations in some band
 def predNi56mod(t, wave, z, DM, taus, t_diff, L_diff, Mej, Ek, beta, x_2):
-    from scipy.integrate import simps
     from .SEDAnalysis import BBflux
 
     #t = np.arange(t_diff/1000,twin,0.01)
@@ -515,25 +550,18 @@ def predNi56mod(t, wave, z, DM, taus, t_diff, L_diff, Mej, Ek, beta, x_2):
     x = tr/t_diff
 
     #normalize Ni56 distribution
-    x_range=np.linspace(0.0005,1,2000, endpoint=True)
-    intg_x56 = x_range**0.76/(1.+np.exp(-beta*(x_range-x_2)))
+    x_range = ni_xrange
     #Ni56 mass
     M_ni = L_diff/eps_diff/M_sun
     #normalization factor
-    norm = M_ni/(1.76*dM_diff)/simps(intg_x56, x_range)
+    norm = M_ni/(1.76*dM_diff)/Ni56norm(beta, x_2)
     #Ni56 mass fraction at depth
     X56_x = norm/(1+np.exp(-beta*(x-x_2)))
     #total Ni56 distribution
     X56_range = norm/(1+np.exp(-beta*(x_range-x_2)))
 
     #quantity of nickel above diffusion depth
-    M_ni = np.zeros(len(t))
-    for i in range(len(t)):
-        mask_ni = x_range<=x[i]
-        x_ni = x_range[mask_ni]
-        X56_ni = X56_range[mask_ni]
-        intg_ni = X56_ni*x_ni**0.76
-        M_ni[i] = 1.76*dM[i]*simps(intg_ni, x_ni)
+    M_ni = 1.76*dM*np.interp(x, x_range, cumtrapz(X56_range*x_range**0.76, x_range))
     
     #approx. local heating from Ni56 in erg/s
     M56 = X56_x*dM
@@ -623,9 +651,6 @@ def ShallowNiFit(t, t_diff, L_diff, Mej, Ek, beta, x_2, x_s, a_s, plot=False):
     #################################
     #array of luminosity (erg/s)
 
-    from scipy.integrate import simps
-    from scipy.special import erfc
-
     #Constants
     M_sun=2.e33
 
@@ -634,7 +659,6 @@ def ShallowNiFit(t, t_diff, L_diff, Mej, Ek, beta, x_2, x_s, a_s, plot=False):
     #time axis, in days
     t = np.array([t]) if (isinstance(t, np.float64) or
                             isinstance(t, float)) else t
-    n = len(t)
 
     k_opt=1.0 #x0.1g/cm^2 (this corresponds to electron scattering)
     
@@ -658,12 +682,11 @@ def ShallowNiFit(t, t_diff, L_diff, Mej, Ek, beta, x_2, x_s, a_s, plot=False):
     x = t/t_diff
 
     #normalize Ni56 distribution
-    x_range=np.linspace(0.0005,1,2000, endpoint=True)
-    intg_x56 = x_range**0.76/(1.+np.exp(-beta*(x_range-x_2)))
+    x_range = ni_xrange
     #Ni56 mass
     M_ni = L_diff/eps_diff/M_sun
     #normalization factor
-    norm = M_ni/(1.76*dM_diff)/simps(intg_x56, x_range)
+    norm = M_ni/(1.76*dM_diff)/Ni56norm(beta, x_2)
     #Ni56 mass fraction at depth
     X56_x = norm/(1+np.exp(-beta*(x-x_2)))
     #X56_x[x < x_s] = a_s*X56_x[x < x_s]
@@ -679,44 +702,10 @@ def ShallowNiFit(t, t_diff, L_diff, Mej, Ek, beta, x_2, x_s, a_s, plot=False):
     #approx. local heating from Ni56 in erg/s
     L56 = X56_x*dM*M_sun*eps
     
-    #integrate lambda function
-    intg_lambd = simps(X56_range*x_range**0.76, x_range)
-    lambd = (eps/eps_diff)/(intg_lambd/(X56_x*x**1.76))
     #integrate from 0 to t at each epoch
-    L_direct = np.zeros(n)
-    L_tail = np.zeros(n)
-    L_ph = np.zeros(n)
-    for i in range(n):
-        #before diffusion time is reached
-        if x[i] < 1: #there is Ni56 deeper than diffusion depth
-            #luminosity due to Ni56 shallower than diffusion depth.
-            mask_direct = x_range<=x[i]
-            x_direct = x_range[mask_direct]
-            X56_direct = X56_range[mask_direct]
-            intg_direct = (X56_direct/X56_x[i])*(x_direct/x[i])**1.76/x_direct
-            L_direct[i] = L_diff * lambd[i] * simps(intg_direct, x_direct)
-            
-            #luminosity due to Ni56 deeper than diffusion depth.
-            mask_tail = x_range>=x[i]
-            x_tail = x_range[mask_tail]
-            X56_tail = X56_range[mask_tail]
-            intg_tail =  (X56_tail/X56_x[i])*(x_tail/x[i])**1.76/x_tail
-            diff_corr = erfc(x_tail/x[i]/np.sqrt(2.))/erfc(1./np.sqrt(2.))
-            L_tail[i] = L_diff * lambd[i] * simps(intg_tail*diff_corr, x_tail)
-        else: #diffusion depth has exposed all nickel
-            #L_direct[i] = 0.35*M_sun*eps[i]
-            
-            #luminosity due to Ni56 shallower than diffusion depth.
-            x_direct = x_range
-            X56_direct = X56_range
-            intg_direct = (X56_direct/X56_x[i])*(x_direct/x[i])**1.76/x_direct
-            L_direct[i] = L_diff * lambd[i] * simps(intg_direct, x_direct)
-            
-            #no Ni56 is deeper than diffusion depth
-            L_tail[i] = 0
-        
-        #total luminosity
-        L_ph[i] = L_direct[i] + L_tail[i]
+    L_direct, L_tail = NiDiffLum(x, X56_range, eps, eps_diff, L_diff)
+    #total luminosity
+    L_ph = L_direct + L_tail
         
     if plot:
         import matplotlib.pyplot as plt
@@ -762,7 +751,6 @@ def ShallowNiFit(t, t_diff, L_diff, Mej, Ek, beta, x_2, x_s, a_s, plot=False):
 
 #function: predict observations in some band
 def predShallowNimod(t, wave, z, DM, taus, t_diff, L_diff, Mej, Ek, beta, x_2, x_s, a_s, prnt=False):
-    from scipy.integrate import simps
     from .SEDAnalysis import BBflux
     
     #t = np.arange(t_diff/1000,twin,0.01)
@@ -806,12 +794,11 @@ def predShallowNimod(t, wave, z, DM, taus, t_diff, L_diff, Mej, Ek, beta, x_2, x
     x = tr/t_diff
     
     #normalize Ni56 distribution
-    x_range=np.linspace(0.0005,1,2000, endpoint=True)
-    intg_x56 = x_range**0.76/(1.+np.exp(-beta*(x_range-x_2)))
+    x_range = ni_xrange
     #Ni56 mass
     M_ni = L_diff/eps_diff/M_sun
     #normalization factor
-    norm = M_ni/(1.76*dM_diff)/simps(intg_x56, x_range)
+    norm = M_ni/(1.76*dM_diff)/Ni56norm(beta, x_2)
     #Ni56 mass fraction at depth
     X56_x = norm/(1+np.exp(-beta*(x-x_2)))
     #X56_x[x < x_s] = a_s*X56_x[x < x_s]
@@ -822,13 +809,7 @@ def predShallowNimod(t, wave, z, DM, taus, t_diff, L_diff, Mej, Ek, beta, x_2, x
     X56_range[x_range < x_s] = a_s
     
     #quantity of nickel above diffusion depth
-    M_ni = np.zeros(len(tr))
-    for i in range(len(tr)):
-        mask_ni = x_range<=x[i]
-        x_ni = x_range[mask_ni]
-        X56_ni = X56_range[mask_ni]
-        intg_ni = X56_ni*x_ni**0.76
-        M_ni[i] = 1.76*dM[i]*simps(intg_ni, x_ni)
+    M_ni = 1.76*dM*np.interp(x, x_range, cumtrapz(X56_range*x_range**0.76, x_range))
     
     #approx. local heating from Ni56 in erg/s
     M56 = X56_x*dM
@@ -315,15 +315,63 @@ def fitRJtail(waves, fluxes, fluxerrs):
     a_err = np.sqrt(1/np.sum(w))
     return a_mean, a_err
 
+#global: synthetic blackbody photometry tables, keyed by filter file
+bbtables = {}
+#global: log10 temperature grid [K] of synthetic photometry tables
+bb_logT = np.linspace(2.5, 7.0, 1801)
+#global: mean wavelengths [A] of filters, for temperatures off table
+bbwaves = {}
+
+#function: log filter averaged normalized planck distribution over bb_logT
+def BBtable(filterfile):
+    if filterfile not in bbtables:
+        from .SpecAnalysis import filter_curve
+        fwave, ftrans = filter_curve(filterfile)
+        #resample filter finely over its range
+        wave = np.linspace(fwave[0], fwave[-1], 2000)
+        trans = np.interp(wave, fwave, ftrans)
+        #photon counting average of fnu, weighted by T/lambda dlambda
+        weight = trans/wave*(wave[1]-wave[0])
+        weight[[0,-1]] *= 0.5
+        Ts = np.power(10, bb_logT)
+        with np.errstate(over='ignore'):
+            p_int = planck(wave[None,:], Ts[:,None])
+        table = p_int.dot(weight)/weight.sum()
+        bbwaves[filterfile] = np.sum(trans*wave)/np.sum(trans)
+        bbtables[filterfile] = np.log10(np.maximum(table, 1e-300))
+    return bbtables[filterfile]
+
+#function: normalized planck distribution averaged through filter
+def BBsynphot(Teff, filterfile, z=0):
+    #Teff, z can be floats or arrays, broadcast elementwise
+    #rest frame temperatures outside table (10^2.5 to 10^7 K) use
+    #planck at mean wavelength of filter instead
+    #redshift is exact rescaling of temperature,
+    #planck(wave/(1+z), T) = planck(wave, T/(1+z))/(1+z)
+    Tz = np.asarray(Teff, dtype=float)/(1.0+np.asarray(z))
+    table = BBtable(filterfile)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        logTz = np.log10(Tz)
+        logp = np.interp(logTz, bb_logT, table)
+        inside = np.logical_and(logTz >= bb_logT[0], logTz <= bb_logT[-1])
+        p = np.where(inside, np.power(10, logp), planck(bbwaves[filterfile], Tz))
+    return np.where(Tz > 0, p, 0.)/(1.0+np.asarray(z))
+
 #function: L, T fluxes derived using blackbody spectrum
 def BBflux(Lc,Teff,wave,z,DM):
-    #give wave in observer frame
+    #give wave in observer frame, or filter file name for synthetic
+    #photometry through filter curve (see BBsynphot) in place of
+    #blackbody at effective wavelength
+    #Lc, Teff, wave can be floats or arrays, broadcast elementwise
     
     #luminosity distance [pc -> cm]
     dl = 10*np.power(10, DM/5.0)*3.086*10**18
     Area = 4.0*np.pi*np.square(dl) #cm^2
     #kasen model in observer band
-    Lc_wave = planck(wave/(1.0+z),Teff)*Lc/Area
+    if isinstance(wave, str):
+        Lc_wave = BBsynphot(Teff, wave, z)*Lc/Area
+    else:
+        Lc_wave = planck(wave/(1.0+z),Teff)*Lc/Area
     #Lc_angle_wave = np.nan_to_num(Lc_angle_wave)
     #ergs/s/Hz/cm^2, luminosity density in observer frame
     #return in uJy, 10**29 uJy = 1 ergs/s/Hz/cm^2
@@ -61,11 +61,11 @@ def BreakoutFlash(R8,T5,m_c=1):
 def ShockCoolingMod(t_day,R8,T5,m_c=1,late=True):
     """This calculates the luminosity, L, and Teff for the Piro, Chang, and Weinberg 2010 analytic shock cooling model.
     
-    :param t_day: time (days since explosion in rest frame)
+    :param t_day: time (days since explosion in rest frame), float or array
     :param R8: radius of envelope surface [10^8 cm].
     :param T5: effective temperature of envelope [10^5 K]
     :param m_c: ejecta mass in units of M_chandra. default = 1
-    :return: luminosity (erg/s), Teff (K)
+    :return: luminosity (erg/s), Teff (K), broadcast over inputs
     """
 
     #Errata
@@ -82,7 +82,6 @@ def ShockCoolingMod(t_day,R8,T5,m_c=1,late=True):
     
     #scalings
     t = t_day * 86400. #s
-    t4 = t/(1.e4) #10^4 s
     R85 = R8*1.e8 / (10**8.5) #3x10^8 cm
     g9 = g/1.e9 #x10^9 cm/s^2
     
@@ -104,29 +103,34 @@ def ShockCoolingMod(t_day,R8,T5,m_c=1,late=True):
     t_c = (rho_c / (2.*((v9*g9/K1)**0.66)*(rho6**0.12)/(R85**1.3)))**(1./1.3)
 
     #late, t_c =False, 100000000
-    #Luminosity and temperature model
-    if t < 0:
-        Lsh = 0
-        Tsh = 100
-    elif t < t_c and not late:
+    #Luminosity and temperature model, masks select branch for each time
+    before = t < 0
+    shallow = np.logical_and(np.logical_not(before), np.logical_and(t < t_c, not late))
+    #times before explosion are masked, evaluate them at dummy time
+    t = np.where(before, 1.e4, t)
+    t4 = t/(1.e4) #10^4 s
+    with np.errstate(divide='ignore', invalid='ignore'):
         #shallow diffusion depth (relativistic)
-        Lsh = EL* (3.e41) * ((g9/K1)**-0.5) * (
+        Lshallow = EL* (3.e41) * ((g9/K1)**-0.5) * (
             v9**1.8) * (rho6**0.42) * R85 * (t**-0.34) #erg/s 
-        Tsh = ET* (1.e6) * ((g9/K1)**-0.065) * (
+        Tshallow = ET* (1.e6) * ((g9/K1)**-0.065) * (
             v9**0.019) * (rho6**0.0035) * (R85**0.13) * (t**-0.46) #K
-    else:
         #deep diffusion depth (non-relativistic)
-        Lsh = EL* (2.e40) * ((g9/K2)**-0.41) * (
+        Ldeep = EL* (2.e40) * ((g9/K2)**-0.41) * (
             v9**1.9) * (rho6**0.36) * (R85**0.83) * (t4**-0.16) #erg/s
-        Tsh = ET* (2.e4) * ((g9/K2)**-0.058) * (
+        Tdeep = ET* (2.e4) * ((g9/K2)**-0.058) * (
             v9**0.030) * (rho6**0.0058) * (R85**0.11) * (t4**-0.44) #K
-        
+    Lsh = np.where(before, 0., np.where(shallow, Lshallow, Ldeep))
+    Tsh = np.where(before, 100., np.where(shallow, Tshallow, Tdeep))
+    if np.ndim(Lsh) == 0:
+        #scalar time
+        return float(Lsh), float(Tsh)
     return Lsh, Tsh #erg/s, K
 
 def ShockCoolingFit(t_day, wave, z, DM, m_c, R8, T5, t0, late=True):
     from .SEDAnalysis import BBflux
-    #shift time to rest frame
-    t_rest = t_day/(1+z) - t0
+    #shift time to rest frame, float or array of times
+    t_rest = np.asarray(t_day)/(1+z) - t0
     #calculate shock cooling luminosity in rest frame
     Lsh, Tsh = ShockCoolingMod(t_rest, R8, T5, m_c, late=late)
     #shift luminosity to observer frame flux in band
@@ -134,21 +138,28 @@ def ShockCoolingFit(t_day, wave, z, DM, m_c, R8, T5, t0, late=True):
     #return predicted flux in band
     return Fsh
 
-#function: Error function for multi-band early light curve leastsq fitting
-def ShockCoolingMultiErr(p, t, L, L_err, z, DM, Mej):
+#function: band wavelengths of multi-band error functions
+def errwaves(waves, bs):
+    #waves : list of wavelengths (Angstrom) or filter files, one per
+    #band in bs, None for effective wavelengths of bands bs
     from .Cosmology import wave_0, bands
+    if waves is None:
+        return [wave_0[bands[b]] for b in bs]
+    return list(waves)
+
+#function: Error function for multi-band early light curve leastsq fitting
+def ShockCoolingMultiErr(p, t, L, L_err, z, DM, Mej, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #Shock cooling component p0=epoch (in rest frame), p1=R8
     #Fix t5=0.1 temperature, because assume late time
-    B_pred = np.array([ShockCoolingFit(ti, wave_0[bands['B']], z, DM, Mej,
-                                       p[1], 0.1, p[0], late=True)
-                       for ti in t[0]])
-    V_pred = np.array([ShockCoolingFit(ti, wave_0[bands['V']], z, DM, Mej,
-                                       p[1], 0.1, p[0], late=True)
-                       for ti in t[1]])
-    I_pred = np.array([ShockCoolingFit(ti, wave_0[bands['i']], z, DM, Mej,
-                                       p[1], 0.1, p[0], late=True)
-                       for ti in t[2]])
+    B_pred = ShockCoolingFit(t[0], waves[0], z, DM, Mej,
+                             p[1], 0.1, p[0], late=True)
+    V_pred = ShockCoolingFit(t[1], waves[1], z, DM, Mej,
+                             p[1], 0.1, p[0], late=True)
+    I_pred = ShockCoolingFit(t[2], waves[2], z, DM, Mej,
+                             p[1], 0.1, p[0], late=True)
     #Power law component, p2=epoch (in rest frame)
     B_pred = np.array(B_pred) + earlyFit(t[0], p[2]*(1.+z), p[3], p[6]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[2]*(1.+z), p[4], p[7])
@@ -160,15 +171,16 @@ def ShockCoolingMultiErr(p, t, L, L_err, z, DM, Mej):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def ShockCoolingViErr(p, t, L, L_err, z, DM, Mej):
-    from .Cosmology import wave_0, bands
+def ShockCoolingViErr(p, t, L, L_err, z, DM, Mej, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'Vi')
     #Shock cooling component p0=epoch (in rest frame), p1=R8
     #Fix t5=0.1 temperature, because assume late time
-    V_pred = np.array([ShockCoolingFit(ti, wave_0[bands['V']], z, DM, Mej,
-                              p[1], 0.1, p[0]) for ti in t[0]])
-    I_pred = np.array([ShockCoolingFit(ti, wave_0[bands['i']], z, DM, Mej,
-                              p[1], 0.1, p[0]) for ti in t[1]])
+    V_pred = ShockCoolingFit(t[0], waves[0], z, DM, Mej,
+                             p[1], 0.1, p[0])
+    I_pred = ShockCoolingFit(t[1], waves[1], z, DM, Mej,
+                             p[1], 0.1, p[0])
     #Power law component, p2=epoch (in rest frame) 
     V_pred = np.array(V_pred) + earlyFit(t[0], p[2]*(1.+z), p[3], p[5])
     I_pred = np.array(I_pred) + earlyFit(t[1], p[2]*(1.+z), p[4], p[6]) 
@@ -181,36 +193,47 @@ def ShockCoolingViErr(p, t, L, L_err, z, DM, Mej):
 # Kasen Companion-Ejecta Interaction (CEI) model.               #
 #################################################################
 
+#function: time (days) for ejecta to reach companion, and transition velocity
+def Kasen_onset(a13, m_c=1, e_51=1):
+    L_u = 1.69 # constant related to ejecta density profile.
+    with np.errstate(invalid='ignore'):
+        vt = 6.0 * 10**8 * L_u * np.sqrt(e_51/m_c) # transition velocity
+    v9 = vt / 10**9
+    
+    ti = (1.0e4 * a13 / v9) / 86400.0
+    return ti, v9
+
 #function: Kasen model of shock interaction with companion
 def Kasen2010(t_day,a13,m_c=1,e_51=1,kappa=1.0):
     """This calculates the luminosity, Liso, and Teff for the Kasen2010 analytic models.
     This incorporates the parameterization of viewing angle from Olling 2015
     
-    :param t_day: time (days since explosion in rest frame)
-    :param a13: semi-major axis of binary separation (10^13 cm)
+    :param t_day: time (days since explosion in rest frame), float or array
+    :param a13: semi-major axis of binary separation (10^13 cm), float or array
     :param theta: viewing angle (degrees) minimum at 180.
     :param m_c: ejecta mass in units of M_chandra. default = 1
     :param e_51: explosion energy in units of 10^51 ergs. default=1
     :param kappa: opacity. default = 0.2 cm^2/g
-    :return: luminosity (erg/s) (isotropic, angular), Teff (K)
+    :return: luminosity (erg/s) (isotropic, angular), Teff (K), broadcast over inputs
     """
     
     #offset t_day to account for time it takes for interaction to begin
-    L_u = 1.69 # constant related to ejecta density profile.
-    vt = 6.0 * 10**8 * L_u * np.sqrt(e_51/m_c) # transition velocity
-    v9 = vt / 10**9
-    
-    ti = (1.0e4 * a13 / v9) / 86400.0
+    ti, v9 = Kasen_onset(a13, m_c, e_51)
     t_day = t_day - ti
     
-    #check validity of kasen
-    if t_day > 0 and e_51/m_c > 0:
+    #check validity of kasen at each time
+    valid = np.logical_and(t_day > 0, e_51/m_c > 0)
+    #invalid times are masked, evaluate them at dummy time
+    t_day = np.where(t_day > 0, t_day, 1.)
+    with np.errstate(divide='ignore', invalid='ignore'):
         # Equations for Luminosity and Teff
         Lc_iso = 10**43 * a13 * m_c * v9**(7./4.) * kappa**(-3./4.) * t_day**(-1./2.) # (erg/s)
         Teff = 2.5 * 10**4 * a13**(1./4.) * kappa**(-35./36) * t_day**(-37./72.)
-    else:
-        Lc_iso = 0
-        Teff = 1000
+    Lc_iso = np.where(valid, Lc_iso, 0.)
+    Teff = np.where(valid, Teff, 1000.)
+    if np.ndim(Lc_iso) == 0:
+        #scalar time
+        return float(Lc_iso), float(Teff)
     return Lc_iso,Teff #erg/s
 
 #function: Kasen fitting functyion
@@ -218,8 +241,8 @@ def KasenFit(t_day,a13,kappa,wave,z,m_c,e_51,DM,t0):
     #essential imports
     from .SEDAnalysis import BBflux
     
-    #shift time to rest frame
-    t_rest = t_day/(1+z) - t0
+    #shift time to rest frame, float or array of times
+    t_rest = np.asarray(t_day)/(1+z) - t0
     
     #calculate Kasen luminosity in rest frame
     Lk, Tk = Kasen2010(t_rest,a13,m_c,e_51,kappa)
@@ -234,19 +257,17 @@ def Kasen_isocorr(theta):
     return 0.982 * np.exp(-((theta % 180.0)/99.7)**2) + 0.018
 
 #function: Error function for multi-band early light curve leastsq fitting
-def kasenMultiErr(p, t, L, L_err, z, DM, m_c, e_51):
-    from .Cosmology import wave_0, bands
+def kasenMultiErr(p, t, L, L_err, z, DM, m_c, e_51, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #Kasen component p0=epoch (in rest frame), p1=a13, p2=theta
-    B_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['B']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[0]])*Kasen_isocorr(p[2])
-    V_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['V']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[1]])*Kasen_isocorr(p[2])
-    I_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['i']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[2]])*Kasen_isocorr(p[2])
+    B_pred = KasenFit(t[0], p[1], 1.0, waves[0], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(p[2])
+    V_pred = KasenFit(t[1], p[1], 1.0, waves[1], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(p[2])
+    I_pred = KasenFit(t[2], p[1], 1.0, waves[2], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(p[2])
     #Power law component, p3=epoch
     B_pred = np.array(B_pred) + earlyFit(t[0], p[3]*(1.+z), p[4], p[7]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[3]*(1.+z), p[5], p[8]) 
@@ -258,19 +279,17 @@ def kasenMultiErr(p, t, L, L_err, z, DM, m_c, e_51):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def kasenFixedMultiErr(p, t, L, L_err, z, DM, m_c, e_51, angle):
-    from .Cosmology import wave_0, bands
+def kasenFixedMultiErr(p, t, L, L_err, z, DM, m_c, e_51, angle, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #Kasen component p0=epoch (in rest frame), p1=a13, p2=theta
-    B_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['B']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[0]])*Kasen_isocorr(angle)
-    V_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['V']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[1]])*Kasen_isocorr(angle)
-    I_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['i']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[2]])*Kasen_isocorr(angle)
+    B_pred = KasenFit(t[0], p[1], 1.0, waves[0], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(angle)
+    V_pred = KasenFit(t[1], p[1], 1.0, waves[1], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(angle)
+    I_pred = KasenFit(t[2], p[1], 1.0, waves[2], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(angle)
     #Power law component, p3=epoch
     B_pred = np.array(B_pred) + earlyFit(t[0], p[2]*(1.+z), p[3], p[6]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[2]*(1.+z), p[4], p[7]) 
@@ -282,19 +301,17 @@ def kasenFixedMultiErr(p, t, L, L_err, z, DM, m_c, e_51, angle):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def kasent0MultiErr(p, t, L, L_err, z, DM, m_c, e_51, t0):
-    from .Cosmology import wave_0, bands
+def kasent0MultiErr(p, t, L, L_err, z, DM, m_c, e_51, t0, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #Kasen component p0=epoch (in rest frame), p1=a13, p2=theta
-    B_pred = np.array([KasenFit(ti, p[0], 1.0, wave_0[bands['B']], z,
-                                m_c, e_51, DM, t0)
-                       for ti in t[0]])*Kasen_isocorr(p[1])
-    V_pred = np.array([KasenFit(ti, p[0], 1.0, wave_0[bands['V']], z,
-                                m_c, e_51, DM, t0)
-                       for ti in t[1]])*Kasen_isocorr(p[1])
-    I_pred = np.array([KasenFit(ti, p[0], 1.0, wave_0[bands['i']], z,
-                                m_c, e_51, DM, t0)
-                       for ti in t[2]])*Kasen_isocorr(p[1])
+    B_pred = KasenFit(t[0], p[0], 1.0, waves[0], z,
+                      m_c, e_51, DM, t0)*Kasen_isocorr(p[1])
+    V_pred = KasenFit(t[1], p[0], 1.0, waves[1], z,
+                      m_c, e_51, DM, t0)*Kasen_isocorr(p[1])
+    I_pred = KasenFit(t[2], p[0], 1.0, waves[2], z,
+                      m_c, e_51, DM, t0)*Kasen_isocorr(p[1])
     #Power law component, p3=epoch
     B_pred = np.array(B_pred) + earlyFit(t[0], p[2]*(1.+z), p[3], p[6]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[2]*(1.+z), p[4], p[7]) 
@@ -306,19 +323,17 @@ def kasent0MultiErr(p, t, L, L_err, z, DM, m_c, e_51, t0):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def kasenPowMultiErr(p, t, L, L_err, z, DM, m_c, e_51, sep, angle):
-    from .Cosmology import wave_0, bands
+def kasenPowMultiErr(p, t, L, L_err, z, DM, m_c, e_51, sep, angle, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #Kasen component p0=epoch (in rest frame), p1=a13, p2=theta
-    B_pred = np.array([KasenFit(ti, sep, 1.0, wave_0[bands['B']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[0]])*Kasen_isocorr(angle)
-    V_pred = np.array([KasenFit(ti, sep, 1.0, wave_0[bands['V']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[1]])*Kasen_isocorr(angle)
-    I_pred = np.array([KasenFit(ti, sep, 1.0, wave_0[bands['i']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[2]])*Kasen_isocorr(angle)
+    B_pred = KasenFit(t[0], sep, 1.0, waves[0], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(angle)
+    V_pred = KasenFit(t[1], sep, 1.0, waves[1], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(angle)
+    I_pred = KasenFit(t[2], sep, 1.0, waves[2], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(angle)
     #Power law component, p3=epoch
     B_pred = np.array(B_pred) + earlyFit(t[0], p[1]*(1.+z), p[2], p[5]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[1]*(1.+z), p[3], p[6]) 
@@ -330,16 +345,15 @@ def kasenPowMultiErr(p, t, L, L_err, z, DM, m_c, e_51, sep, angle):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def kasenViErr(p, t, L, L_err, z, DM, m_c, e_51):
-    from .Cosmology import wave_0, bands
+def kasenViErr(p, t, L, L_err, z, DM, m_c, e_51, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'Vi')
     #Kasen component p0=epoch (in rest frame), p1=a13, p2=theta
-    V_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['V']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[0]])*Kasen_isocorr(p[2])
-    I_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['i']], z,
-                                m_c, e_51, DM, p[0])
-                       for ti in t[1]])*Kasen_isocorr(p[2])
+    V_pred = KasenFit(t[0], p[1], 1.0, waves[0], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(p[2])
+    I_pred = KasenFit(t[1], p[1], 1.0, waves[1], z,
+                      m_c, e_51, DM, p[0])*Kasen_isocorr(p[2])
     #Power law component
     V_pred = np.array(V_pred) + earlyFit(t[0], p[3]*(1.+z), p[4], p[6]) 
     I_pred = np.array(I_pred) + earlyFit(t[1], p[3]*(1.+z), p[5], p[7]) 
@@ -348,37 +362,197 @@ def kasenViErr(p, t, L, L_err, z, DM, m_c, e_51):
     I_err = (I_pred - L[1])/L_err[1]
     return np.concatenate([V_err, I_err],axis=0)
 
+#################################################################
+# Tabulated Kasen CEI model grid.                               #
+#################################################################
+
+#global: Kasen model grids loaded in memory, keyed by parameter hash
+kasengrids = {}
+
+#function: multilinear interpolation of values on grid axes at points
+def gridinterp(axes, values, points):
+    #axes : list of nondecreasing 1D arrays, one per dimension of values
+    #values : array of values on grid (can be memory mapped)
+    #points : list of arrays of coordinates along each axis, same shape
+    #points outside grid are not extrapolated, and give NaN
+    shape = np.shape(points[0])
+    idxs, wgts = [], []
+    outside = np.zeros(int(np.prod(shape)), dtype=bool)
+    for axis, x in zip(axes, points):
+        x = np.ravel(x)
+        if len(axis) == 1:
+            #singleton axis, value held fixed
+            idxs.append(np.zeros(len(x), dtype=int))
+            wgts.append(np.zeros(len(x)))
+            outside |= np.logical_not(np.isclose(x, axis[0]))
+        else:
+            outside |= np.logical_or(x < axis[0], x > axis[-1])
+            #lower grid index and weight of upper grid point
+            i = np.clip(np.searchsorted(axis, x)-1, 0, len(axis)-2)
+            #zero width cells (repeated nodes) take lower grid point
+            width = axis[i+1]-axis[i]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                w = np.where(width > 0, np.clip((x-axis[i])/width, 0, 1), 0.0)
+            idxs.append(i)
+            wgts.append(w)
+    #sum over corners of enclosing cell
+    out = np.zeros(len(idxs[0]))
+    for corner in range(2**len(axes)):
+        index, weight = [], np.ones(len(out))
+        for d in range(len(axes)):
+            up = (corner >> d) & 1
+            if up and len(axes[d]) == 1:
+                break
+            index.append(idxs[d]+up)
+            weight = weight*(wgts[d] if up else 1-wgts[d])
+        else:
+            out += weight*values[tuple(index)]
+    out[outside] = np.nan
+    return out.reshape(shape)
+
+#class: Kasen model band fluxes tabulated over parameter grid
+class KasenGrid:
+    """
+    #################################################################
+    # Desc: Kasen 2010 CEI band fluxes tabulated over rest frame    #
+    #       time since interaction onset (tau), a13, m_c, e_51,     #
+    #       kappa and z for each band in waves, at DM=0. Queries    #
+    #       interpolate log flux multilinearly (log axes except z), #
+    #       shifting to observed time and scaling to DM exactly.    #
+    #       Tables are cached in memory, and in cachedir as .npy    #
+    #       files read memory mapped, keyed by hash of the grid.    #
+    #       Queries are valid only within the tabulated ranges of   #
+    #       tau, a13, m_c, e_51, kappa and z (a single value must   #
+    #       match). Flux outside them is NaN, while times before    #
+    #       interaction onset have zero flux.                       #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #     a13s: array of binary separations (10^13 cm)              #
+    #     m_cs; array of ejecta masses (M_chandra)                  #
+    #   e_51s; array of explosion energies (10^51 ergs)             #
+    #   kappas; array of opacities                                  #
+    #       zs; array of redshifts                                  #
+    #     taus; array of rest frame days since interaction onset    #
+    #           None for 121 log spaced days from 1e-4 to 100       #
+    #    waves; list of band wavelengths (Angstrom) or filter files #
+    # cachedir; str directory to keep tables in, None for memory    #
+    #################################################################
+    """
+    def __init__(self, a13s, m_cs=[1.0], e_51s=[1.0], kappas=[1.0], zs=[0.0], taus=None, waves=None, cachedir=None):
+        import os
+        import hashlib
+        from .Cosmology import wave_0
+
+        if taus is None:
+            taus = np.logspace(-4, 2, 121)
+        if waves is None:
+            waves = wave_0
+        self.waves = list(waves)
+        #sorted axes without repeated nodes (e.g., clamped error spans)
+        self.grid = [np.unique(np.asarray(axis, dtype=float)) for axis in [taus, a13s, m_cs, e_51s, kappas, zs]]
+        #interpolation axes, log scale except redshift
+        self.axes = [np.log10(axis) for axis in self.grid[:-1]] + [self.grid[-1]]
+        #key tables by grid and bands
+        sha = hashlib.sha1()
+        for axis in self.grid:
+            sha.update(axis.tobytes())
+        sha.update(repr(self.waves).encode())
+        self.key = sha.hexdigest()
+        if self.key in kasengrids:
+            self.logF = kasengrids[self.key]
+            return
+        cachefile = None if cachedir is None else os.path.join(cachedir, 'kasen_'+self.key+'.npy')
+        if cachefile is not None and os.path.exists(cachefile):
+            self.logF = np.load(cachefile, mmap_mode='r')
+        else:
+            self.logF = self.tabulate()
+            if cachefile is not None:
+                np.save(cachefile, self.logF)
+                self.logF = np.load(cachefile, mmap_mode='r')
+        kasengrids[self.key] = self.logF
+
+    #function: compute log10 band fluxes at DM=0 over grid
+    def tabulate(self):
+        from .SEDAnalysis import BBflux
+
+        tau, a13, m_c, e_51, kappa, z = np.meshgrid(*self.grid, indexing='ij')
+        #rest frame time since explosion
+        ti, v9 = Kasen_onset(a13, m_c, e_51)
+        Lk, Tk = Kasen2010(tau+ti, a13, m_c, e_51, kappa)
+        logF = np.zeros((len(self.waves),)+tau.shape)
+        with np.errstate(over='ignore', divide='ignore'):
+            for n, wave in enumerate(self.waves):
+                #floor keeps log finite where flux underflows
+                logF[n] = np.log10(np.maximum(BBflux(Lk, Tk, wave, z, 0), 1e-300))
+        return logF
+
+    #function: interpolated Kasen band flux, arguments as KasenFit
+    def flux(self, t_day, a13, kappa, wave, z, m_c, e_51, DM, t0):
+        #grid band matching wave
+        n = self.waves.index(wave)
+        #shift time to rest frame, then to time since interaction onset
+        t_rest = np.asarray(t_day)/(1+z) - t0
+        ti, v9 = Kasen_onset(a13, m_c, e_51)
+        tau, a13, m_c, e_51, kappa, z = np.broadcast_arrays(t_rest-ti, a13, m_c, e_51, kappa, z)
+        valid = np.logical_and(tau > 0, e_51/m_c > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            points = [np.log10(np.where(valid, tau, 1.)), np.log10(a13), np.log10(m_c), np.log10(e_51), np.log10(kappa), z]
+        logF = gridinterp(self.axes, self.logF[n], points)
+        #scale luminosity distance from 10pc to DM
+        Fk = np.where(valid, np.power(10, logF - 0.4*DM), 0.)
+        if np.ndim(Fk) == 0:
+            return float(Fk)
+        return Fk
+
 #function: rule out Kasen model to sig at angle theta
 def ruleout(F, Ferr, Fk, Fkerr, theta, sig, lims=None):
-    #angle corrected Kasen luminosity
-    Fk_theta = Fk*Kasen_isocorr(theta)
-    Fk_theta_err = Fkerr*Kasen_isocorr(theta)
+    #theta : viewing angle, or array of angles
+    #sig : sigma level, or array of sigma levels
+    #lims : limiting fluxes at each point, or one row per sig
+    #returns bool, or (n_sig x n_theta) boolean matrix of ruled out angles
+    thetas = np.atleast_1d(np.asarray(theta, dtype=float))
+    sigs = np.atleast_1d(np.asarray(sig, dtype=float))[:,None,None]
+    #angle corrected Kasen luminosity, one row per angle
+    corr = Kasen_isocorr(thetas)[:,None]
+    Fk_theta = Fk*corr
+    Fk_theta_err = Fkerr*corr
     #total error
     Err = np.sqrt(np.square(Ferr)+np.square(Fk_theta_err))
     #which is more constraining? datapoint or limit?
-    level = F + sig*Err
+    level = F + sigs*Err
     if lims is not None:
-        level[level < lims] = lims[level < lims]
+        lims = np.asarray(lims, dtype=float)
+        if lims.ndim == 2:
+            lims = lims[:,None,:]
+        level = np.where(level < lims, lims, level)
     #check if any points rule out angle with conf
-    if any(Fk_theta > level):
-        return True
-    else:
-        return False
+    out = np.any(Fk_theta > level, axis=-1)
+    return ruleshape(out, theta, sig)
 
 #function: rule out Kasen model to sig at angle theta (using both distributions)
 def sym_ruleout(F, Ferr, Fk, Fkerr, JN, theta, sig):
+    #theta, sig : as in ruleout
+    thetas = np.atleast_1d(np.asarray(theta, dtype=float))
+    sigs = np.atleast_1d(np.asarray(sig, dtype=float))[:,None,None]
     #noise in data number
     N = np.sqrt(np.square(Ferr/JN) - np.absolute(F)/JN)
-    #angle corrected Kasen luminosity
-    Fk_theta = Fk*Kasen_isocorr(theta)
-    Fk_theta_err = Fkerr*Kasen_isocorr(theta)
+    #angle corrected Kasen luminosity, one row per angle
+    corr = Kasen_isocorr(thetas)[:,None]
+    Fk_theta = Fk*corr
+    Fk_theta_err = Fkerr*corr
     #total error
     FN_err = np.sqrt(np.square(Fk_theta_err/JN)+np.square(N)+Fk_theta)*JN
     #check if any points rule out angle with conf
-    if any(Fk_theta - sig*FN_err > F + sig*Ferr):
-        return True
-    else:
-        return False
+    out = np.any(Fk_theta - sigs*FN_err > F + sigs*Ferr, axis=-1)
+    return ruleshape(out, theta, sig)
+
+#function: shape rule out matrix to match sig and theta inputs
+def ruleshape(out, theta, sig):
+    out = out.reshape(np.shape(sig)+np.shape(theta))
+    if out.ndim == 0:
+        return bool(out)
+    return out
 
 #################################################################
 # Piro CSM-Ejecta Interaction (CSM) model.                      #
@@ -404,13 +578,17 @@ def CSMpeak(Eej, Mej, Mext, Rext):
     return t_peak, L_peak, Teff_peak
 
 def CSMmod(t_day, Eej, Mej, Mext, Rext):
-    #t_day is time in days since explosion
+    #t_day is time in days since explosion, float or array
     #Eej is ejecta kinetic energy in 10^51 ergs 
     #Mej is ejecta mass in solar masses
     #Mext is mass of extended material in 0.01 solar masses
     #Rext is radius of extended material in 10^13 cm
 
-    if t_day > 0 and Eej/Mej > 0:
+    #check validity of model at each time
+    valid = np.logical_and(t_day > 0, Eej/Mej > 0)
+    #invalid times are masked, evaluate them at dummy time
+    t_day = np.where(t_day > 0, t_day, 1.)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
         #time in seconds
         ts = t_day*86400.0
         
@@ -436,16 +614,18 @@ def CSMmod(t_day, Eej, Mej, Mext, Rext):
         #Radius evolution of CSM
         Rcsm = Rext*1.0e13 + vext*ts #cm
         #Temperature evolution of CSM given blackbody
-        Tcsm = max(np.power(Lcsm/(4*sb_const*np.pi*Rcsm**2), 0.25), 100) #K
-    else:
-        Lcsm = 0
-        Tcsm = 1000
+        Tcsm = np.maximum(np.power(Lcsm/(4*sb_const*np.pi*Rcsm**2), 0.25), 100) #K
+    Lcsm = np.where(valid, Lcsm, 0.)
+    Tcsm = np.where(valid, Tcsm, 1000.)
+    if np.ndim(Lcsm) == 0:
+        #scalar time
+        return float(Lcsm), float(Tcsm)
     return Lcsm, Tcsm
 
 def CSMFit(t_day, wave, z, DM, Mej, Eej, Mext, Rext, t0):
     from .SEDAnalysis import BBflux
-    #shift time to rest frame
-    t_rest = t_day/(1+z) - t0
+    #shift time to rest frame, float or array of times
+    t_rest = np.asarray(t_day)/(1+z) - t0
     #calculate CSM luminosity in rest frame
     Lcsm, Tcsm = CSMmod(t_rest, Eej, Mej, Mext, Rext)
     #shift luminosity to observer frame flux in band
@@ -454,16 +634,17 @@ def CSMFit(t_day, wave, z, DM, Mej, Eej, Mext, Rext, t0):
     return Fcsm
 
 #function: Error function for multi-band early light curve leastsq fitting
-def CSMMultiErr(p, t, L, L_err, z, DM, Mej, Eej):
-    from .Cosmology import wave_0, bands
+def CSMMultiErr(p, t, L, L_err, z, DM, Mej, Eej, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #CSM component p0=epoch (in rest frame), p1=Mext, p2=Rext
-    B_pred = np.array([CSMFit(ti, wave_0[bands['B']], z, DM, Mej, Eej,
-                              p[1], p[2], p[0]) for ti in t[0]])
-    V_pred = np.array([CSMFit(ti, wave_0[bands['V']], z, DM, Mej, Eej,
-                              p[1], p[2], p[0]) for ti in t[1]])
-    I_pred = np.array([CSMFit(ti, wave_0[bands['i']], z, DM, Mej, Eej,
-                              p[1], p[2], p[0]) for ti in t[2]])
+    B_pred = CSMFit(t[0], waves[0], z, DM, Mej, Eej,
+                    p[1], p[2], p[0])
+    V_pred = CSMFit(t[1], waves[1], z, DM, Mej, Eej,
+                    p[1], p[2], p[0])
+    I_pred = CSMFit(t[2], waves[2], z, DM, Mej, Eej,
+                    p[1], p[2], p[0])
     #Power law component
     B_pred = np.array(B_pred) + earlyFit(t[0], p[3]*(1.+z), p[4], p[7]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[3]*(1.+z), p[5], p[8])
@@ -475,16 +656,17 @@ def CSMMultiErr(p, t, L, L_err, z, DM, Mej, Eej):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def CSMt0MultiErr(p, t, L, L_err, z, DM, Mej, Eej, t0):
-    from .Cosmology import wave_0, bands
+def CSMt0MultiErr(p, t, L, L_err, z, DM, Mej, Eej, t0, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #CSM component p0=epoch (in rest frame), p1=Mext, p2=Rext
-    B_pred = np.array([CSMFit(ti, wave_0[bands['B']], z, DM, Mej, Eej,
-                              p[0], p[1], t0) for ti in t[0]])
-    V_pred = np.array([CSMFit(ti, wave_0[bands['V']], z, DM, Mej, Eej,
-                              p[0], p[1], t0) for ti in t[1]])
-    I_pred = np.array([CSMFit(ti, wave_0[bands['i']], z, DM, Mej, Eej,
-                              p[0], p[1], t0) for ti in t[2]])
+    B_pred = CSMFit(t[0], waves[0], z, DM, Mej, Eej,
+                    p[0], p[1], t0)
+    V_pred = CSMFit(t[1], waves[1], z, DM, Mej, Eej,
+                    p[0], p[1], t0)
+    I_pred = CSMFit(t[2], waves[2], z, DM, Mej, Eej,
+                    p[0], p[1], t0)
     #Power law component
     B_pred = np.array(B_pred) + earlyFit(t[0], p[2]*(1.+z), p[3], p[6]) 
     V_pred = np.array(V_pred) + earlyFit(t[1], p[2]*(1.+z), p[4], p[7])
@@ -496,14 +678,15 @@ def CSMt0MultiErr(p, t, L, L_err, z, DM, Mej, Eej, t0):
     return np.concatenate([B_err, V_err, I_err],axis=0)
 
 #function: Error function for multi-band early light curve leastsq fitting
-def CSMViErr(p, t, L, L_err, z, DM, Mej, Eej):
-    from .Cosmology import wave_0, bands
+def CSMViErr(p, t, L, L_err, z, DM, Mej, Eej, waves=None):
     from .LCFitting import earlyFit
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'Vi')
     #CSM component p0=epoch (in rest frame), p1=Mext, p2=Rext
-    V_pred = np.array([CSMFit(ti, wave_0[bands['V']], z, DM, Mej, Eej,
-                              p[1], p[2], p[0]) for ti in t[0]])
-    I_pred = np.array([CSMFit(ti, wave_0[bands['i']], z, DM, Mej, Eej,
-                              p[1], p[2], p[0]) for ti in t[1]])
+    V_pred = CSMFit(t[0], waves[0], z, DM, Mej, Eej,
+                    p[1], p[2], p[0])
+    I_pred = CSMFit(t[1], waves[1], z, DM, Mej, Eej,
+                    p[1], p[2], p[0])
     #Power law component 
     V_pred = np.array(V_pred) + earlyFit(t[0], p[3]*(1.+z), p[4], p[6])
     I_pred = np.array(I_pred) + earlyFit(t[1], p[3]*(1.+z), p[5], p[7]) 
@@ -517,18 +700,16 @@ def CSMViErr(p, t, L, L_err, z, DM, Mej, Eej):
 #################################################################
 
 #function: Error function for multi-band early light curve leastsq fitting
-def CompMultiErr(p, t, L, L_err, z, DM, m_c, e_51, tbase, Lbase):
-    from .Cosmology import wave_0, bands
+def CompMultiErr(p, t, L, L_err, z, DM, m_c, e_51, tbase, Lbase, waves=None):
+    #band wavelengths, or filter files for synthetic photometry
+    waves = errwaves(waves, 'BVi')
     #Kasen component p0=epoch (in rest frame), p1=a13, p2=theta
-    B_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['B']],
-                                m_c, e_51, z, DM, p[0])
-                       for ti in t[0]])*Kasen_isocorr(p[2])
-    V_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['V']],
-                                m_c, e_51, z, DM, p[0])
-                       for ti in t[1]])*Kasen_isocorr(p[2])
-    I_pred = np.array([KasenFit(ti, p[1], 1.0, wave_0[bands['i']],
-                                m_c, e_51, z, DM, p[0])
-                       for ti in t[2]])*Kasen_isocorr(p[2])
+    B_pred = KasenFit(t[0], p[1], 1.0, waves[0],
+                      m_c, e_51, z, DM, p[0])*Kasen_isocorr(p[2])
+    V_pred = KasenFit(t[1], p[1], 1.0, waves[1],
+                      m_c, e_51, z, DM, p[0])*Kasen_isocorr(p[2])
+    I_pred = KasenFit(t[2], p[1], 1.0, waves[2],
+                      m_c, e_51, z, DM, p[0])*Kasen_isocorr(p[2])
     #Base component
     B_base = np.interp(t[0], tbase[0]-p[3], Lbase[0])
     V_base = np.interp(t[1], tbase[1]-p[3], Lbase[1])
@@ -8,6 +8,7 @@
 
 #essential modules
 import numpy as np
+from functools import lru_cache
 
 #################################################################
 # Processing Spectra using Synphot                              #
@@ -79,7 +80,55 @@ def spec_fits(filename, get_err=False, get_meta=False):
         else:
             return spec
 
+#################################################################
+# Filter Registry                                               #
+#################################################################
+
+#function: wavelength unit of filter file
+def filter_unit(filterfile):
+    #Bessel filter functions are tabulated in nm
+    if filterfile.split('/')[-1][:6] == 'Bessel':
+        return 'nm'
+    else:
+        return 'AA'
+
+#function: load filter transmission curve, wavelength in Angstrom
+@lru_cache(maxsize=32)
+def filter_curve(filterfile):
+    data = np.loadtxt(filterfile, ndmin=2)
+    wave, trans = data[:,0], data[:,1]
+    if filter_unit(filterfile) == 'nm':
+        wave = wave*10.0
+    order = np.argsort(wave)
+    return wave[order], trans[order]
+
+#function: synphot filter element, cached by filter path and units
+@lru_cache(maxsize=32)
+def filter_load(filterfile, wave_unit):
+    from synphot import SpectralElement
+    return SpectralElement.from_file(filterfile, wave_unit=wave_unit)
+
+#function: synphot filter element of filter file
+def filter_element(filterfile):
+    return filter_load(filterfile, filter_unit(filterfile))
+
+#function: squared filter element for propagating error spectra
+@lru_cache(maxsize=32)
+def filter_element2(filterfile):
+    from synphot import SpectralElement, Empirical1D
+    filt = filter_element(filterfile)
+    fwave = filt.waveset
+    return SpectralElement(Empirical1D, points=fwave,
+                           lookup_table=np.square(filt(fwave)))
+
+#function: Vega spectrum, loaded once
+@lru_cache(maxsize=1)
+def vega_spectrum():
+    from synphot import SourceSpectrum
+    return SourceSpectrum.from_vega()
+
 #function: calculate zero point of filter system
+@lru_cache(maxsize=32)
 def filter_vega_zp(filterfile, filterzero):
     '''
     ######################################################
@@ -93,15 +142,12 @@ def filter_vega_zp(filterfile, filterzero):
     # mag_0: magnitude of Vega in filter system.         #
     ######################################################
     '''
-    from synphot import SourceSpectrum, SpectralElement, Observation
+    from synphot import Observation
     
     #load Vega spectrum
-    spec = SourceSpectrum.from_vega()
+    spec = vega_spectrum()
     #Load ascii filter function
-    if filterfile.split('/')[-1][:6] == 'Bessel':
-        filt = SpectralElement.from_file(filterfile, wave_unit='nm')
-    else:
-        filt = SpectralElement.from_file(filterfile, wave_unit='AA')
+    filt = filter_element(filterfile)
     wave = filt.waveset
     #Synthetic observation
     obs = Observation(spec, filt)
@@ -125,21 +171,15 @@ def filter_flux(filterfile, syn_spec, syn_err=None, wrange=None):
     # flux: flux of source in filter system.             #
     ######################################################
     '''
-    from synphot import SpectralElement, Observation, Empirical1D, SourceSpectrum
-    import astropy.units as u
+    from synphot import Observation, Empirical1D, SourceSpectrum
     
     #Load ascii filter function
-    if filterfile.split('/')[-1][:6] == 'Bessel':
-        filt = SpectralElement.from_file(filterfile, wave_unit='nm')
-    else:
-        filt = SpectralElement.from_file(filterfile, wave_unit='AA')
+    filt = filter_element(filterfile)
+    fwave = filt.waveset
+    swave = syn_spec.waveset
     if wrange is None:
-        fwave = filt.waveset
-        swave = syn_spec.waveset
         wrange = (max(fwave[0],swave[0]),min(fwave[-1],swave[-1]))
-        wlengths = fwave[np.logical_and(fwave>wrange[0], fwave<wrange[1])]
-    else:
-        wlengths = fwave[np.logical_and(fwave>wrange[0], fwave<wrange[1])]
+    wlengths = fwave[np.logical_and(fwave>wrange[0], fwave<wrange[1])]
     #Synthetic observation
     obs = Observation(syn_spec, filt, force='extrap')
     #flux = obs.effstim(flux_unit='jy', waverange=wrange).value
@@ -147,8 +187,7 @@ def filter_flux(filterfile, syn_spec, syn_err=None, wrange=None):
     #Synthetic observation of error spectrum
     if syn_err is not None:
         #square filter and error spectrum
-        filt2 = SpectralElement(Empirical1D, points=fwave,
-                          lookup_table=np.square(filt(fwave)))
+        filt2 = filter_element2(filterfile)
         pseudo_flux = np.square(syn_err(swave,flux_unit='jy')).value
         syn_err2 = SourceSpectrum(Empirical1D, points=swave,
                                    lookup_table=pseudo_flux)
@@ -175,17 +214,13 @@ def filter_mag(filterfile, filterzero, syn_spec, syn_err=None, wrange=None):
     # mag: magnitude of source in filter system.         #
     ######################################################
     '''
-    from synphot import SpectralElement, Observation, Empirical1D, SourceSpectrum
-    import astropy.units as u
+    from synphot import Observation, Empirical1D, SourceSpectrum
     
     #Load ascii filter function
-    if filterfile.split('/')[-1][:6] == 'Bessel':
-        filt = SpectralElement.from_file(filterfile, wave_unit='nm')
-    else:
-        filt = SpectralElement.from_file(filterfile, wave_unit='AA')
+    filt = filter_element(filterfile)
+    fwave = filt.waveset
+    swave = syn_spec.waveset
     if wrange is None:
-        fwave = filt.waveset
-        swave = syn_spec.waveset
         wrange = (max(fwave[0],swave[0]),min(fwave[-1],swave[-1]))
     waves = np.linspace(wrange[0], wrange[-1], 10000)
     #Synthetic observation
@@ -197,8 +232,7 @@ def filter_mag(filterfile, filterzero, syn_spec, syn_err=None, wrange=None):
     #Synthetic observation of error spectrum
     if syn_err is not None:
         #square filter and error spectrum
-        filt2 = SpectralElement(Empirical1D, points=fwave,
-                          lookup_table=np.square(filt(fwave)))
+        filt2 = filter_element2(filterfile)
         pseudo_flux = np.square(syn_err(swave,flux_unit='jy')).value
         syn_err2 = SourceSpectrum(Empirical1D, points=swave,
                                    lookup_table=pseudo_flux)
@@ -218,10 +252,8 @@ def filter_mag(filterfile, filterzero, syn_spec, syn_err=None, wrange=None):
 
 #function: evaluate S correction on Vega spectrum from filt1 to filt2
 def Scorr_vega(filt1,filt2, zerof1,zerof2):
-    from synphot import SourceSpectrum
-    
     #load Vega spectrum
-    spec = SourceSpectrum.from_vega()
+    spec = vega_spectrum()
     #Scorr = -2.5log(flux2/flux1) such that mag2 = mag1 + Scorr
     mag1 = filter_mag(filt1, zerof1, spec)
     mag2 = filter_mag(filt2, zerof2, spec)
@@ -240,11 +272,98 @@ def Scorr(filt1,filt2, zerof1,zerof2, syn_spec, syn_err=None, wrange1=None,wrang
         return scorr, scorr_err
     else:
         #if error spectrum is not given
-        mag1 = filter_mag(filt1, zerof1, syn_spec, wrange1)
-        mag2 = filter_mag(filt2, zerof2, syn_spec, wrange2)
+        mag1 = filter_mag(filt1, zerof1, syn_spec, wrange=wrange1)
+        mag2 = filter_mag(filt2, zerof2, syn_spec, wrange=wrange2)
         scorr = mag2 - mag1
         return scorr
 
+#function: trapezoid integral of y over x
+def trapint(y, x):
+    return np.sum(0.5*np.diff(x)*(y[1:]+y[:-1]))
+
+#function: filter sampled on wavelength grid of wrange, cached
+@lru_cache(maxsize=32)
+def filter_sample(filterfile, wrange):
+    #returns grid, filter and squared filter on grid, their
+    #effstim normalizations and pivot wavelengths
+    filt = filter_element(filterfile)
+    filt2 = filter_element2(filterfile)
+    waves = np.linspace(wrange[0], wrange[-1], 10000)
+    trans = filt(waves).value
+    trans2 = filt2(waves).value
+    norm = abs(trapint(waves*trans, waves))
+    norm2 = abs(trapint(waves*trans2, waves))
+    return waves, trans, trans2, norm, norm2, filt.pivot(), filt2.pivot()
+
+#function: evaluates magnitudes of list of spectra in filter system
+def filter_mag_batch(filterfile, filterzero, syn_specs, syn_errs=None, wrange=None):
+    '''
+    ######################################################
+    # Input                                              #
+    # -------------------------------------------------- #
+    # filterfile: file containing filter function        #
+    # filterzero: flux [Jy] corresponding to mag=0       #
+    #  syn_specs: list of synphot spectrum objects       #
+    #   syn_errs: list of synphot error spectrum objects #
+    #     wrange: (start,end) observed wavelength range  #
+    # -------------------------------------------------- #
+    # Output                                             #
+    # -------------------------------------------------- #
+    # mags: magnitudes of sources in filter system, and  #
+    #       errors if syn_errs is given. Same as         #
+    #       filter_mag, but filter is sampled once per   #
+    #       wavelength grid instead of per spectrum.     #
+    ######################################################
+    '''
+    import astropy.units as u
+    from synphot import units, Empirical1D, SourceSpectrum
+    
+    fwave = filter_element(filterfile).waveset
+    mags, mag_errs = np.zeros(len(syn_specs)), np.zeros(len(syn_specs))
+    for i, syn_spec in enumerate(syn_specs):
+        swave = syn_spec.waveset
+        if wrange is None:
+            wrange_i = (max(fwave[0],swave[0]),min(fwave[-1],swave[-1]))
+        else:
+            wrange_i = wrange
+        wrange_i = (float(units.validate_quantity(wrange_i[0], u.AA).value),
+                    float(units.validate_quantity(wrange_i[-1], u.AA).value))
+        #filter on grid, shared by spectra on same grid
+        waves, trans, trans2, norm, norm2, pivot, pivot2 = filter_sample(filterfile, wrange_i)
+        #effective stimulus, integrated in FLAM as synphot does
+        flam = units.convert_flux(waves, syn_spec(waves)*trans, units.FLAM).value
+        flux = abs(trapint(waves*flam, waves))/norm
+        flux = units.convert_flux(pivot, flux*units.FLAM, 'jy').value
+        #Calibrate magnitude with zero point
+        mags[i] = -2.512*np.log10(flux/filterzero)
+        #Synthetic observation of error spectrum
+        if syn_errs is not None:
+            #square error spectrum, filter already squared
+            pseudo_flux = np.square(syn_errs[i](swave,flux_unit='jy')).value
+            syn_err2 = SourceSpectrum(Empirical1D, points=swave,
+                                      lookup_table=pseudo_flux)
+            flam = units.convert_flux(waves, syn_err2(waves)*trans2, units.FLAM).value
+            flux_err = abs(trapint(waves*flam, waves))/norm2
+            flux_err = np.sqrt(units.convert_flux(pivot2, flux_err*units.FLAM, units.PHOTLAM).value)
+            #convert to magnitude error
+            mag_errs[i] = (2.5/np.log(10))*(flux_err/flux)
+    if syn_errs is not None:
+        return mags, mag_errs
+    else:
+        return mags
+
+#function: evaluate S corrections on list of specs from filt1 to filt2
+def Scorr_batch(filt1,filt2, zerof1,zerof2, syn_specs, syn_errs=None, wrange1=None,wrange2=None):
+    #returns array of Scorr, and array of errors if syn_errs given
+    if syn_errs is not None:
+        mag1, err1 = filter_mag_batch(filt1, zerof1, syn_specs, syn_errs, wrange1)
+        mag2, err2 = filter_mag_batch(filt2, zerof2, syn_specs, syn_errs, wrange2)
+        return mag2 - mag1, np.sqrt(err1**2 + err2**2)
+    else:
+        mag1 = filter_mag_batch(filt1, zerof1, syn_specs, wrange=wrange1)
+        mag2 = filter_mag_batch(filt2, zerof2, syn_specs, wrange=wrange2)
+        return mag2 - mag1
+
 #################################################################
 # Spectral Line Fitting                                         #
 #################################################################
@@ -7,3 +7,4 @@ from .SpecAnalysis import *
 from .SEDAnalysis import *
 from .Ni56Mod import *
 from .ShockMod import *
+from .multi import *
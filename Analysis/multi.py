@@ -1,10 +1,193 @@
+#################################################################
+# Name:     multi.py                                            #
+# Author:   Yuan Qi Ni                                          #
+# Function: Program contains persistent worker pool service for #
+#           bootstrap and Monte Carlo routines. Workers live    #
+#           across calls, functions are serialized once in the  #
+#           parent and unpacked once per worker, tasks are      #
+#           submitted in chunks which can be cancelled or       #
+#           collected partially, hung workers are killed.       #
+#################################################################
+
+#essential modules
+import numpy as np
+from collections import OrderedDict
+
 #To pickle properly, you need dill. Highly recommend.
-import dill
 
 #import these when pickling function in multiprocessing
 def run_dill_encoded(payload):
+    import dill
     fun, args = dill.loads(payload)
     return fun(*args)
 def apply_async(pool, fun, args):
+    import dill
     payload = dill.dumps((fun, args))
     return pool.apply_async(run_dill_encoded, (payload,))
+
+#################################################################
+# Persistent worker pool service                                #
+#################################################################
+
+#global: shared process pools, keyed by number of workers, each
+#started on first use
+workpools = {}
+#global: serialized functions in parent, keyed by id of function
+workpayloads = {}
+#global: unpacked functions in worker, keyed by digest of payload,
+#least recently used are dropped beyond workfuncs_max
+workfuncs = OrderedDict()
+workfuncs_max = 4
+
+#function: serialize function once, with dill if available
+def workpayload(func):
+    import hashlib
+    entry = workpayloads.get(id(func))
+    if entry is None or entry[0] is not func:
+        try:
+            import dill as pickle
+        except ImportError:
+            import pickle
+        payload = pickle.dumps(func)
+        if len(workpayloads) > 64:
+            #forget functions from old calls
+            workpayloads.clear()
+        entry = (func, hashlib.sha1(payload).hexdigest(), payload)
+        workpayloads[id(func)] = entry
+    return entry[1], entry[2]
+
+#function: evaluate chunk of tasks in worker, unpacking function once
+def workchunk(key, payload, chunk):
+    func = workfuncs.get(key)
+    if func is None:
+        try:
+            import dill as pickle
+        except ImportError:
+            import pickle
+        func = pickle.loads(payload)
+        workfuncs[key] = func
+        #functions carry data of their calls, forget old ones
+        while len(workfuncs) > workfuncs_max:
+            workfuncs.popitem(last=False)
+    else:
+        workfuncs.move_to_end(key)
+    return [func(*args) for args in chunk]
+
+#function: number of workers, None for all cores
+def worknproc(nproc=None):
+    import os
+    if nproc is None:
+        return os.cpu_count() or 1
+    return int(nproc)
+
+#function: get shared worker pool of nproc workers, start it if needed
+def WorkPool(nproc=None):
+    #nproc : number of workers, None for all cores
+    #each size has its own pool, so asking for another size never
+    #disturbs batches other callers have in flight
+    nproc = worknproc(nproc)
+    pool = workpools.get(nproc)
+    if pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(nproc)
+        workpools[nproc] = pool
+    return pool
+
+#function: stop shared worker pools
+def WorkShutdown(wait=True, kill=False, pool=None):
+    #kill : terminate worker processes, including running tasks
+    #pool : pool to stop, None stops all pools
+    for nproc, executor in list(workpools.items()):
+        if pool is not None and executor is not pool:
+            continue
+        del workpools[nproc]
+        if kill:
+            #executor cannot stop running tasks, so this relies on its
+            #private _processes (CPython). other batches on this pool
+            #then fail with BrokenProcessPool rather than hang
+            procs = list((getattr(executor, '_processes', None) or {}).values())
+            for proc in procs:
+                proc.kill()
+            for proc in procs:
+                proc.join()
+            executor.shutdown(wait=False)
+        else:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+#class: batch of chunked tasks submitted to shared worker pool
+class WorkBatch:
+    def __init__(self, func, args, nproc=None, chunksize=None):
+        self.nproc = worknproc(nproc)
+        self.pool = WorkPool(self.nproc)
+        self.args = [tuple(arg) for arg in args]
+        self.n = len(self.args)
+        if chunksize is None:
+            #few chunks per worker, balancing load against overhead
+            chunksize = max(1, int(np.ceil(self.n/(4.0*self.nproc))))
+        self.chunksize = chunksize
+        key, payload = workpayload(func)
+        #future for each chunk, with index of its first task
+        self.futures = {}
+        for i in range(0, self.n, chunksize):
+            future = self.pool.submit(workchunk, key, payload, self.args[i:i+chunksize])
+            self.futures[future] = i
+
+    #function: cancel chunks that have not started
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+
+    #function: wait for chunks, return results so far
+    def collect(self, timeout=None, cancel=True):
+        #timeout : seconds to wait for all chunks, None waits forever
+        #cancel : cancel unfinished chunks at timeout, killing pool if
+        #         any are still running
+        #returns list of results (None where unfinished), and done mask
+        from concurrent.futures import wait
+        finished, pending = wait(self.futures, timeout=timeout)
+        results = [None]*self.n
+        done = np.zeros(self.n, dtype=bool)
+        for future in finished:
+            if future.cancelled():
+                continue
+            i = self.futures[future]
+            #task errors are raised
+            vals = future.result()
+            results[i:i+len(vals)] = vals
+            done[i:i+len(vals)] = True
+        if pending and cancel:
+            if any(future.running() for future in pending):
+                #running chunks cannot be cancelled, kill hung workers,
+                #pool restarts on next use. unfinished chunks then fail
+                #with BrokenProcessPool, which is ignored here
+                WorkShutdown(kill=True, pool=self.pool)
+            else:
+                self.cancel()
+        return results, done
+
+#function: map function over argument tuples on shared worker pool
+def WorkMap(func, args, nproc=None, chunksize=None, timeout=None):
+    '''
+    #################################################################
+    # Desc: Evaluate func(*arg) for each arg on the shared worker   #
+    #       pool. func is serialized once per call (dill if found), #
+    #       sent with each chunk and unpacked once per worker.      #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #      func: function to evaluate                               #
+    #      args: list of argument tuples                            #
+    #     nproc; number of workers, None for all cores              #
+    # chunksize; tasks per chunk, None for a few chunks per worker  #
+    #   timeout; seconds to wait, None waits for all tasks          #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    #   results: list of results in order of args, None for tasks   #
+    #            unfinished at timeout (their chunks are cancelled, #
+    #            workers still running them are killed)             #
+    #      done: boolean array of finished tasks                    #
+    #################################################################
+    '''
+    batch = WorkBatch(func, args, nproc=nproc, chunksize=chunksize)
+    return batch.collect(timeout=timeout)
@@ -9,6 +9,20 @@
 #essential modules
 import numpy as np
 
+#global: reference epochs at start of each year, astropy Time
+year_epochs = {}
+
+#function: cached astropy Time at start of year
+def year_epoch(year):
+    #year : int (or str) reference year YYYY
+    year = int(year)
+    t_ref = year_epochs.get(year)
+    if t_ref is None:
+        from astropy.time import Time
+        t_ref = Time(str(year)+"-01-01T00:00:00.000", format='isot', scale='utc')
+        year_epochs[year] = t_ref
+    return t_ref
+
 #function: converts KSPTime to isot time
 def ksp_isot(time):
     '''
@@ -20,13 +34,27 @@ def ksp_isot(time):
     # Input                                                        #
     # ------------------------------------------------------------ #
     # time: str time format in KSP time, YYMMDD_HHMM               #
+    #       (or array of str)                                      #
     # ------------------------------------------------------------ #
     # Output                                                       #
     # ------------------------------------------------------------ #
     # time: str time format in ISOT time, YYYY-MM-DDTHH:MM:SS.SSS  #
+    #       (array of str if array given)                          #
     ################################################################
     '''
-    return "20"+time[:2]+"-"+time[2:4]+"-"+time[4:6]+"T"+time[7:9]+":"+time[9:11]+":00.000"
+    if isinstance(time, str):
+        return "20"+time[:2]+"-"+time[2:4]+"-"+time[4:6]+"T"+time[7:9]+":"+time[9:11]+":00.000"
+    #fixed width strings, reassembled as characters
+    time = np.asarray(time, dtype='U11')
+    chars = time[...,None].view('U1').reshape(time.shape+(11,))
+    isot = np.empty(time.shape+(23,), dtype='U1')
+    isot[...,:] = list("20YY-MM-DDTHH:MM:00.000")
+    isot[...,2:4] = chars[...,0:2]
+    isot[...,5:7] = chars[...,2:4]
+    isot[...,8:10] = chars[...,4:6]
+    isot[...,11:13] = chars[...,7:9]
+    isot[...,14:16] = chars[...,9:11]
+    return isot.view('U23').reshape(time.shape)
 
 #function: converts isot time to day of year float
 def isot_day(time, year):
@@ -38,23 +66,24 @@ def isot_day(time, year):
     # ------------------------------------------------------------ #
     # Input                                                        #
     # ------------------------------------------------------------ #
-    # time: str time format in ISOT UTC, YYYY-MM-DDTHH:MM:SS.SSS   #
+    # time: str time format in ISOT UTC, YYYY-MM-DDTHH:MM:SS.SSS,  #
+    #       or array of str, or astropy Time                       #
+    # year: int reference year YYYY                                #
     # ------------------------------------------------------------ #
     # Output                                                       #
     # ------------------------------------------------------------ #
-    # day: float time in days since start of year YYYY             #
+    # day: float time in days since start of year YYYY (array of   #
+    #      float if array given)                                   #
     ################################################################
     '''
     
     from astropy.time import Time
     
-    #create astropy time object
+    #create astropy time object, once for whole array
     time = Time(time, format='isot', scale='utc')
-    #set reference time
-    t_ref = str(year)+"-01-01T00:00:00.000"
-    t_ref = Time(t_ref, format='isot', scale='utc')
-    #return day of year
-    return float((time - t_ref).value)
+    #return day of year since cached reference time
+    day = (time - year_epoch(year)).jd
+    return float(day) if np.ndim(day) == 0 else day
 
 #function: converts day of year float to isot time
 def day_isot(day, year):
@@ -62,56 +91,51 @@ def day_isot(day, year):
     ################################################################
     # Desc: Converts day of year float to isot time.               #
     # ------------------------------------------------------------ #
-    # Imports: astropy.time.(Time, TimeDelta)                      #
+    # Imports: astropy.time.TimeDelta                              #
     # ------------------------------------------------------------ #
     # Input                                                        #
     # ------------------------------------------------------------ #
-    #  day: float time in days since start of year YYYY            #
+    #  day: float time in days since start of year YYYY, or array  #
     # year: int reference year YYYY                                #
     # ------------------------------------------------------------ #
     # Output                                                       #
     # ------------------------------------------------------------ #
     # time: str time format in ISOT UTC, YYYY-MM-DDTHH:MM:SS.SSS   #
+    #       (array of str if array given)                          #
     ################################################################
     '''
     
-    from astropy.time import Time, TimeDelta
+    from astropy.time import TimeDelta
     
-    #create astropy time object
-    t_ref = str(year)+"-01-01T00:00:00.000"
-    t_ref = Time(t_ref, format='isot', scale='utc')
     #create astropy time difference object
     t_diff = TimeDelta(day, format='jd')
     #return isot time
-    return (t_ref+t_diff).value
+    return (year_epoch(year)+t_diff).value
 
 def day_mjd(day, year):
     '''
     ################################################################
-    # Desc: Converts day of year float to mjd time.               #
+    # Desc: Converts day of year float to mjd time.                #
     # ------------------------------------------------------------ #
-    # Imports: astropy.time.(Time, TimeDelta)                      #
+    # Imports: astropy.time.TimeDelta                              #
     # ------------------------------------------------------------ #
     # Input                                                        #
     # ------------------------------------------------------------ #
-    #  day: float time in days since start of year YYYY            #
+    #  day: float time in days since start of year YYYY, or array  #
     # year: int reference year YYYY                                #
     # ------------------------------------------------------------ #
     # Output                                                       #
     # ------------------------------------------------------------ #
-    # time: float time format in mjd                                 #
+    # time: float time format in mjd (array if array given)        #
     ################################################################
     '''
     
-    from astropy.time import Time, TimeDelta
+    from astropy.time import TimeDelta
     
-    #create astropy time object
-    t_ref = str(year)+"-01-01T00:00:00.000"
-    t_ref = Time(t_ref, format='isot', scale='utc')
     #create astropy time difference object
     t_diff = TimeDelta(day, format='jd')
-    #return isot time
-    return (t_ref+t_diff).mjd
+    #return mjd time
+    return (year_epoch(year)+t_diff).mjd
 
 #function: return RA and DEC of the moon at utc isot time, location
 def moonEQC(time, loc):
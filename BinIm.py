@@ -13,26 +13,36 @@ import numpy as np
 from SNAP.Astrometry import *
 
 #function: bin images between two times in day of year float
-def binTimes(band, t1, t2, year, out_name, delete_temp=True):
+def binTimes(band, t1, t2, year, out_name, delete_temp=True, index=None):
     
     #essential modules
     from glob import glob
     import subprocess
 
-    #read all files
-    files = glob('*.fits')
-    #find files in band
-    bandfiles = []
-    for i in range(len(files)):
-        if files[i].split('.')[2] == band:
-            bandfiles.append(files[i])
-    #find files between t1 and t2
-    binfiles = []
-    for i in range(len(bandfiles)):
-        ksp_time = bandfiles[i].split('.')[3]
-        day_time = isot_day(ksp_isot(ksp_time), year)
-        if day_time > t1 and day_time < t2:
-            binfiles.append(bandfiles[i])
+    if index is not None:
+        #index : str image index database (ImIndex.py), updated with
+        #new files here and queried instead of parsing filenames
+        import os
+        from SNAP.ImIndex import indexScan, indexQuery
+        indexScan(index, '*.fits')
+        images = indexQuery(index, band=band, t1=t1, t2=t2, year=year,
+                            pattern=os.path.join(os.path.abspath('.'), '%'))
+        binfiles = [os.path.relpath(path) for path in images.path
+                    if os.path.dirname(path) == os.path.abspath('.')]
+    else:
+        #read all files
+        files = glob('*.fits')
+        #find files in band
+        bandfiles = []
+        for i in range(len(files)):
+            if files[i].split('.')[2] == band:
+                bandfiles.append(files[i])
+        #find files between t1 and t2, converting all times at once
+        binfiles = []
+        if len(bandfiles) > 0:
+            ksp_times = [bandfile.split('.')[3] for bandfile in bandfiles]
+            day_times = isot_day(ksp_isot(ksp_times), year)
+            binfiles = [bandfiles[i] for i in range(len(bandfiles)) if day_times[i] > t1 and day_times[i] < t2]
 
     #get base output string
     out_base = out_name[:-4]
@@ -54,7 +64,8 @@ if __name__ == "__main__":
     parser.add_argument('t2', type=float, help='end time, day of year float')
     parser.add_argument('year', type=int, help='year number float')
     parser.add_argument('out_name', type=str, help='output binned file name')
+    parser.add_argument('-i', '--index', type=str, default=None, help='image index database to select files with')
     args = parser.parse_args()
     
     #create binned image
-    binTimes(args.band, args.t1, args.t2, args.year, args.out_name)
+    binTimes(args.band, args.t1, args.t2, args.year, args.out_name, index=args.index)
@@ -7,37 +7,108 @@
 #################################################################
 
 #function: crop image given
-def make_crop_image(filename, outname, ra, dec, radius):
+def make_crop_image(filename, outname, ra, dec, radius, overwrite=True, atomic=False, verbosity=1):
+    #overwrite : if False, keep existing outname and return False
+    #atomic : write to temporary file, renamed onto outname when complete
+    #returns True if crop was written
 
     from astropy.io import fits
     from astropy.wcs import WCS
-    import numpy as np
     import os
 
-    #load HDU image
-    print("loading hdu")
-    hdulist = fits.open(filename)
-    info = hdulist.info()
-    image = hdulist[0].data
-    header = hdulist[0].header
-    wcs = WCS(header)
+    from .MagCalc import imageHDU
+
+    if not overwrite and os.path.exists(outname):
+        if verbosity > 0:
+            print(outname+" already exists")
+        return False
+
+    #load HDU image, fpack (.fz) frames are read tile by tile
+    if verbosity > 0:
+        print("loading hdu")
+    hdulist = fits.open(filename, memmap=True)
+    hdu = imageHDU(hdulist)
+    header = hdu.header
+    wcs = WCS(header, hdulist)
     
     #convert position of source to world coordinates
     X, Y = wcs.all_world2pix(ra, dec, 0)
-    print(("Source located at: " + str(X) + ", " + str(Y)))
+    if verbosity > 0:
+        print(("Source located at: " + str(X) + ", " + str(Y)))
     
-    crop = fits.PrimaryHDU()
-    xlims = [int(max(X-radius,0)), int(min(X+radius,image.shape[0]))]
-    ylims = [int(max(Y-radius,0)), int(min(Y+radius,image.shape[1]))]
+    xlims = [int(max(X-radius,0)), int(min(X+radius,header['NAXIS1']))]
+    ylims = [int(max(Y-radius,0)), int(min(Y+radius,header['NAXIS2']))]
     #print xlims[0], xlims[1], ylims[0], ylims[1]
-    crop.data = image[ylims[0]:ylims[1], xlims[0]:xlims[1]]
-    crop.header = header
-    crop.header.update(wcs[ylims[0]:ylims[1], xlims[0]:xlims[1],].to_header())
+    #read only section (decompress only tiles) under crop
+    data = hdu.section[ylims[0]:ylims[1], xlims[0]:xlims[1]]
+    #primary header from image header, extension (.fz) cards are stripped
+    header = header.copy()
+    for key in ['SIMPLE', 'XTENSION', 'EXTEND', 'PCOUNT', 'GCOUNT', 'EXTNAME']:
+        header.remove(key, ignore_missing=True)
+    header.update(wcs[ylims[0]:ylims[1], xlims[0]:xlims[1],].to_header())
+    crop = fits.PrimaryHDU(data=data, header=header)
+    hdulist.close()
     
-    print("writing hdu")
-    print(("cropped "+outname))
-    if os.path.exists(outname) : os.remove(outname)
-    crop.writeto(outname)
+    if verbosity > 0:
+        print("writing hdu")
+        print(("cropped "+outname))
+    if atomic:
+        #partial crops are never left under outname
+        tmpname = outname+"."+str(os.getpid())+".tmp"
+        try:
+            crop.writeto(tmpname, overwrite=True)
+            os.replace(tmpname, outname)
+        finally:
+            if os.path.exists(tmpname) : os.remove(tmpname)
+    else:
+        if os.path.exists(outname) : os.remove(outname)
+        crop.writeto(outname)
+    return True
+
+#function: crop image in batch job, reporting failure instead of raising
+def crop_job(filename, outname, ra, dec, radius, overwrite, atomic):
+    try:
+        if make_crop_image(filename, outname, ra, dec, radius, overwrite=overwrite, atomic=atomic, verbosity=0):
+            return "cropped"
+        return "exists"
+    except Exception as e:
+        return "failed: "+repr(e)
+
+#function: crop many images around source on a process pool
+def make_crop_batch(filenames, outnames, ra, dec, radius, overwrite=False, atomic=True, nproc=None, chunksize=None, verbosity=1):
+    """
+    #################################################################
+    # Desc: Crop list of fits files to source centered squares on   #
+    #       the shared worker pool. Each job reads only the section #
+    #       (or compressed tiles) under its crop.                   #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    # filenames: list of str fits filenames to crop                 #
+    #  outnames: list of str output filenames                       #
+    #    ra,dec: float position of source in degrees                #
+    #    radius: float half size (pixels) of cropped image          #
+    # overwrite; boolean, if False skip crops that already exist    #
+    #    atomic; boolean, write each crop to a temporary file and   #
+    #            rename it onto output when complete                #
+    #     nproc; int number of workers, None keeps current pool     #
+    # chunksize; int crops per task chunk, None: few per worker     #
+    # verbosity; int counts verbosity level                         #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    #    status: list of str, "cropped", "exists" or "failed: ..."  #
+    #################################################################
+    """
+
+    from .Analysis.multi import WorkMap
+
+    args = [(filename, outname, ra, dec, radius, overwrite, atomic) for filename, outname in zip(filenames, outnames)]
+    status, done = WorkMap(crop_job, args, nproc=nproc, chunksize=chunksize)
+    if verbosity > 0:
+        for outname, stat in zip(outnames, status):
+            print(outname+" "+stat)
+    return status
 
 #main function
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+#################################################################
+# Name:     ApBench.py                                          #
+# Author:   Yuan Qi Ni                                          #
+# Function: Program checks vectorized aperture extraction in    #
+#           Photometry against the original per-pixel loops,    #
+#           and times both on a KMTNet sized crop.              #
+#################################################################
+
+#essential modules
+import numpy as np
+from timeit import default_timer as timer
+
+#essential files
+from SNAP.Photometry import dist, ap_get, ap_multi
+
+#function: original per-pixel aperture at (x0,y0) from r1 to r2
+def ap_get_loop(image, x0, y0, r1, r2):
+    xaxis = np.arange(max([0,x0-r2]), min(image.shape[1],x0+r2+1), dtype=int)
+    yaxis = np.arange(max([0,y0-r2]), min(image.shape[0],y0+r2+1), dtype=int)
+    api = np.array([image[y][x] for x in xaxis for y in yaxis if (dist(x0,y0,x,y)<=r2 and dist(x0,y0,x,y)>=r1)])
+    apx = np.array([x for x in xaxis for y in yaxis if (dist(x0,y0,x,y)<=r2 and dist(x0,y0,x,y)>=r1)])
+    apy = np.array([y for x in xaxis for y in yaxis if (dist(x0,y0,x,y)<=r2 and dist(x0,y0,x,y)>=r1)])
+    return api, apx, apy
+
+#function: original per-pixel aperture around multiple sources
+def ap_multi_loop(image, x0, y0, fitsky, r1, r2):
+    Nobj = len(x0)
+    xaxis = np.arange(0,image.shape[1], dtype=int)
+    yaxis = np.arange(0,image.shape[0], dtype=int)
+    xmask = np.zeros(image.shape[1])
+    ymask = np.zeros(image.shape[0])
+    for i in range(Nobj):
+        if fitsky[i] or i == 0:
+            xmask = np.logical_or(xmask, np.absolute(xaxis-x0[i]) <= r2)
+            ymask = np.logical_or(ymask, np.absolute(yaxis-y0[i]) <= r2)
+    xaxis = xaxis[xmask]
+    yaxis = yaxis[ymask]
+    apx, apy, api = [], [], []
+    for x in xaxis:
+        for y in yaxis:
+            inap = False
+            for i in range(Nobj):
+                if dist(x0[i],y0[i],x,y)<=r2 and (fitsky[i] or i==0):
+                    inap = True
+            for i in range(Nobj):
+                if dist(x0[i],y0[i],x,y)<r1:
+                    inap = False
+            if inap:
+                apx.append(x)
+                apy.append(y)
+                api.append(image[y][x])
+    return np.array(api), np.array(apx), np.array(apy)
+
+#function: time fun over n calls, return mean time and last output
+def bench(fun, args, n):
+    t1 = timer()
+    for i in range(n):
+        out = fun(*args)
+    return (timer()-t1)/n, out
+
+#function: check two aperture outputs are identical
+def same(out1, out2):
+    return all(np.array_equal(a, b) for a, b in zip(out1, out2))
+
+if __name__ == "__main__":
+
+    #synthetic 2000px crop with big endian pixels, as read from fits
+    np.random.seed(0)
+    image = np.random.normal(500.0, 20.0, (2000, 2000)).astype('>f4')
+    fwhm = 5.0
+    x0, y0 = 1000.37, 999.81
+    xs = [x0, x0+23.4, x0-31.2, 1995.2]
+    ys = [y0, y0-17.9, y0+8.6, 3.3]
+    fitsky = [1, 0, 1, 1]
+
+    #apertures used by SkyFit, PSFextract, PSFfit, PSFscale
+    cases = [("ap_get fit box", ap_get_loop, ap_get, (image, x0, y0, 0, 3*fwhm)),
+             ("ap_get at edge", ap_get_loop, ap_get, (image, 1998.6, 2.2, 0, 3*fwhm)),
+             ("ap_multi annulus", ap_multi_loop, ap_multi, (image, [x0], [y0], [1], 10*fwhm, 12*fwhm)),
+             ("ap_multi union", ap_multi_loop, ap_multi, (image, xs, ys, fitsky, 4*fwhm, 5*fwhm))]
+    print("%-18s %12s %12s %9s %s" % ("case", "loop [s]", "numpy [s]", "speedup", "identical"))
+    for label, old, new, args in cases:
+        t_old, out_old = bench(old, args, 1)
+        t_new, out_new = bench(new, args, 20)
+        print("%-18s %12.6f %12.6f %9.1f %s" % (label, t_old, t_new, t_old/t_new, same(out_old, out_new)))
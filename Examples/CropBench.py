@@ -0,0 +1,68 @@
+#################################################################
+# Name:     CropBench.py                                        #
+# Author:   Yuan Qi Ni                                          #
+# Function: Program checks that crops of fpack (.fz) compressed #
+#           frames match crops of the uncompressed frames, in   #
+#           data and WCS, with make_crop_image and the batch    #
+#           cropper, and times both.                            #
+#################################################################
+
+#essential modules
+import numpy as np
+import os
+import tempfile
+from timeit import default_timer as timer
+from astropy.io import fits
+from astropy.wcs import WCS
+
+#essential files
+from SNAP.CropIm import make_crop_image, make_crop_batch
+
+#function: synthetic KMTNet-like frame with TAN wcs
+def frame(shape=(2048, 2048), seed=0):
+    rng = np.random.RandomState(seed)
+    wcs = WCS(naxis=2)
+    wcs.wcs.ctype = ['RA---TAN', 'DEC--TAN']
+    wcs.wcs.crval = [177.757506, -28.744022]
+    wcs.wcs.crpix = [shape[1]/2.0, shape[0]/2.0]
+    wcs.wcs.cdelt = [-0.4/3600, 0.4/3600]
+    header = wcs.to_header()
+    header['DATE-OBS'] = '2018-04-14T20:56:07.500'
+    #integer counts, so compression is lossless
+    image = rng.poisson(500, shape).astype(np.int32)
+    return image, header
+
+if __name__ == "__main__":
+
+    image, header = frame()
+    ra, dec = 177.757506+0.02, -28.744022-0.03
+    radius = 300
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, 'frame.fits')
+        fits.PrimaryHDU(image, header=header).writeto(raw)
+        #fpack writes image either from primary or extension header
+        hdrs = {'primary':fits.PrimaryHDU(image, header=header).header,
+                'extension':fits.ImageHDU(image, header=header).header}
+        for kind, hdr in hdrs.items():
+            fz = os.path.join(tmp, 'frame.'+kind+'.fits.fz')
+            fits.HDUList([fits.PrimaryHDU(), fits.CompImageHDU(image, header=hdr, tile_shape=(64, 2048))]).writeto(fz)
+
+            t1 = timer()
+            make_crop_image(raw, os.path.join(tmp, 'raw.crop.fits'), ra, dec, radius, verbosity=0)
+            t2 = timer()
+            make_crop_image(fz, os.path.join(tmp, 'fz.crop.fits'), ra, dec, radius, verbosity=0)
+            t3 = timer()
+            status = make_crop_batch([fz], [os.path.join(tmp, 'fzb.crop.fits')], ra, dec, radius, overwrite=True, verbosity=0)
+
+            ref = fits.open(os.path.join(tmp, 'raw.crop.fits'))[0]
+            for name in ['fz.crop.fits', 'fzb.crop.fits']:
+                crop = fits.open(os.path.join(tmp, name))[0]
+                same = np.array_equal(crop.data, ref.data)
+                same = same and np.allclose(WCS(crop.header).wcs.crpix, WCS(ref.header).wcs.crpix)
+                same = same and crop.header['DATE-OBS'] == header['DATE-OBS']
+                print("%s header, %s: %s" % (kind, name, "match" if same else "MISMATCH"))
+                ok = ok and same
+            print("batch status: "+status[0])
+            print("crop from fits: %.3f s, from fz: %.3f s" % (t2-t1, t3-t2))
+    print("All crops match." if ok else "Crops differ!")
@@ -0,0 +1,86 @@
+#################################################################
+# Name:     Ni56Bench.py                                        #
+# Author:   Yuan Qi Ni                                          #
+# Function: Program checks cumulative integral Ni56 luminosity  #
+#           in Ni56Mod against the original per-time simpson    #
+#           loop, and times a multi-band Ni56Err and            #
+#           ShallowNiErr fit evaluation with both.              #
+#################################################################
+
+#essential modules
+import numpy as np
+from timeit import default_timer as timer
+from scipy.integrate import simpson
+from scipy.special import erfc
+
+#essential files
+from SNAP.Analysis import Ni56Mod
+from SNAP.Analysis.Cosmology import wave_0, bands
+
+#function: original luminosity integrals, one simpson prefix per time
+def loop_lum(x, X56_range, eps, eps_diff, L_diff):
+    x_range = Ni56Mod.ni_xrange
+    n = len(x)
+    X56_x = np.interp(x, x_range, X56_range)
+    intg_lambd = simpson(X56_range*x_range**0.76, x=x_range)
+    lambd = (eps/eps_diff)/(intg_lambd/(X56_x*x**1.76))
+    L_direct = np.zeros(n)
+    L_tail = np.zeros(n)
+    for i in range(n):
+        mask_direct = x_range<=min(x[i], 1)
+        x_direct = x_range[mask_direct]
+        intg_direct = (X56_range[mask_direct]/X56_x[i])*(x_direct/x[i])**1.76/x_direct
+        L_direct[i] = L_diff * lambd[i] * simpson(intg_direct, x=x_direct)
+        if x[i] < 1:
+            mask_tail = x_range>=x[i]
+            x_tail = x_range[mask_tail]
+            intg_tail = (X56_range[mask_tail]/X56_x[i])*(x_tail/x[i])**1.76/x_tail
+            diff_corr = erfc(x_tail/x[i]/np.sqrt(2.))/erfc(1./np.sqrt(2.))
+            L_tail[i] = L_diff * lambd[i] * simpson(intg_tail*diff_corr, x=x_tail)
+    return L_direct, L_tail
+
+#function: original normalization, integrated on every call
+def loop_norm(beta, x_2):
+    x_range = Ni56Mod.ni_xrange
+    return simpson(x_range**0.76/(1.+np.exp(-beta*(x_range-x_2))), x=x_range)
+
+#function: time fit error evaluations over a set of trial parameters
+def time_fit(trials, ts, Ls, L_errs, waves, taus):
+    t1 = timer()
+    chi2s = [Ni56Mod.Ni56Err(ts, Ls, L_errs, waves, 0.01, 33.0, taus, 16.0,
+                             1.0e43, 1.0, 1.0, beta, x_2) for beta, x_2 in trials]
+    chi2s += [Ni56Mod.ShallowNiErr(ts, Ls, L_errs, waves, 0.01, 33.0, taus, 16.0,
+                                   1.0e43, 1.0, 1.0, beta, x_2, 0.1, 0.05) for beta, x_2 in trials]
+    return np.array(chi2s), timer()-t1
+
+if __name__ == "__main__":
+
+    #three band early light curve, typical cadence
+    bs = ['B', 'V', 'i']
+    waves = [wave_0[bands[b]] for b in bs]
+    ts = [np.sort(np.random.RandomState(i).uniform(-2, 30, 90)) for i in range(3)]
+    taus = [np.ones(np.sum(t > 0)) for t in ts]
+    Ls = [np.zeros(len(t)) for t in ts]
+    L_errs = [np.ones(len(t)) for t in ts]
+    #optimizer revisits nearby shapes, with repeats
+    trials = [(8.0+0.5*(i % 5), 0.5+0.01*(i % 3)) for i in range(30)]
+
+    #luminosity integrals against original loop
+    x = np.linspace(0.05, 40, 200)/16.0
+    X56_range = 1./(1.+np.exp(-8.0*(Ni56Mod.ni_xrange-0.5)))
+    eps = np.exp(-x*16.0/8.8)
+    new = np.sum(Ni56Mod.NiDiffLum(x, X56_range, eps, 1.0, 1.0e43), axis=0)
+    old = np.sum(loop_lum(x, X56_range, eps, 1.0, 1.0e43), axis=0)
+    #original loop drops the interval between last grid point and x
+    late = x > 0.1
+    print("Max relative difference for x > 0.1: %.2e" % np.max(np.absolute(new[late]/old[late]-1)))
+
+    chi2_new, t_new = time_fit(trials, ts, Ls, L_errs, waves, taus)
+    #swap in original integrals
+    NiDiffLum, Ni56norm = Ni56Mod.NiDiffLum, Ni56Mod.Ni56norm
+    Ni56Mod.NiDiffLum, Ni56Mod.Ni56norm = loop_lum, loop_norm
+    chi2_old, t_old = time_fit(trials, ts, Ls, L_errs, waves, taus)
+    Ni56Mod.NiDiffLum, Ni56Mod.Ni56norm = NiDiffLum, Ni56norm
+    print("Max relative chi2 difference: %.2e" % np.max(np.absolute(chi2_new/chi2_old-1)))
+    print("%d fit evaluations, loop: %.3f s, cumulative: %.3f s, speedup %.1fx"
+          % (len(chi2_new), t_old, t_new, t_old/t_new))
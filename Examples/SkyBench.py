@@ -0,0 +1,55 @@
+#################################################################
+# Name:     SkyBench.py                                         #
+# Author:   Yuan Qi Ni                                          #
+# Function: Program checks closed form sky plane fit in SkyFit  #
+#           against the original curve_fit solution, and times  #
+#           both on synthetic stars over a tilted sky.          #
+#################################################################
+
+#essential modules
+import numpy as np
+from timeit import default_timer as timer
+
+#essential files
+from SNAP.Photometry import SkyFit
+
+#function: synthetic image with tilted sky, noise, stars and cosmics
+def sky_image(shape=(400, 400), sky=(0.05, -0.03, 500.0), noise=20.0, seed=0):
+    rng = np.random.RandomState(seed)
+    y, x = np.indices(shape)
+    image = sky[0]*x + sky[1]*y + sky[2] + rng.normal(0, noise, shape)
+    #stars scattered over image, some inside sky annuli
+    for i in range(40):
+        xs, ys = rng.uniform(0, shape[1]), rng.uniform(0, shape[0])
+        A = rng.uniform(100, 20000)
+        image += A*np.power(1+np.square(np.hypot(x-xs, y-ys)/2.0), -3.0)
+    #cosmic rays and hot pixels
+    hits = rng.randint(0, shape[0]*shape[1], 200)
+    image.flat[hits] += rng.uniform(500, 5000, 200)
+    return image.astype('>f4')
+
+if __name__ == "__main__":
+
+    image = sky_image()
+    fwhm = 5.0
+    positions = [(200.3, 199.7), (120.6, 80.2), (301.1, 250.9), (70.4, 330.5)]
+
+    #regression against iterative curve_fit solution
+    ok = True
+    t_curve, t_lin = 0, 0
+    for x0, y0 in positions:
+        t1 = timer()
+        old = SkyFit(image, [x0], [y0], [True], fwhm, linsky=False)
+        t2 = timer()
+        new = SkyFit(image, [x0], [y0], [True], fwhm, linsky=True)
+        t3 = timer()
+        t_curve, t_lin = t_curve+t2-t1, t_lin+t3-t2
+        #curve_fit warm starts stop at ftol short of the exact minimum,
+        #so popt should agree well within fit errors, not to machine precision
+        match = (np.all(np.absolute(old[0]-new[0]) < 0.01*new[1])
+                 and np.allclose(old[1], new[1], rtol=1e-3)
+                 and np.isclose(old[3], new[3], rtol=1e-4))
+        ok = ok and match
+        print("(%.1f, %.1f) curve_fit %s  linear %s  match %s" % (x0, y0, old[0], new[0], match))
+    print("SkyFit time curve_fit: %.4f s, linear: %.4f s" % (t_curve, t_lin))
+    print("Closed form sky plane agrees with curve_fit: %s" % ok)
@@ -0,0 +1,238 @@
+#################################################################
+# Name:     ImIndex.py                                          #
+# Author:   Yuan Qi Ni                                          #
+# Function: Program contains routines for keeping an SQLite     #
+#           index of image archive headers (path, field, band,  #
+#           observatory, time, size, FWHM), filled by an        #
+#           incremental scanner and queried by band, field,     #
+#           time and seeing without opening any image.          #
+#################################################################
+
+#essential modules
+import numpy as np
+import os
+
+#global: columns of image index table and their SQL types
+index_cols = [('path', 'TEXT PRIMARY KEY'), ('mtime', 'REAL'),
+              ('bytes', 'INTEGER'), ('field', 'TEXT'), ('band', 'TEXT'),
+              ('stamp', 'TEXT'), ('obs', 'TEXT'), ('mjd', 'REAL'),
+              ('naxis1', 'INTEGER'), ('naxis2', 'INTEGER'), ('fwhm', 'REAL')]
+#global: header keywords holding measured FWHM (pixels), first found is used
+index_fwhmkeys = ['FWHM', 'FWHM_AVE', 'SEEING']
+
+#function: open image index database, create table if needed
+def indexConnect(dbname):
+    #dbname : str SQLite database filename
+    import sqlite3
+    con = sqlite3.connect(dbname)
+    con.execute("CREATE TABLE IF NOT EXISTS images ("+", ".join(
+        [col+" "+typ for col, typ in index_cols])+")")
+    con.execute("CREATE INDEX IF NOT EXISTS images_band_mjd ON images (band, mjd)")
+    con.execute("CREATE INDEX IF NOT EXISTS images_field_mjd ON images (field, mjd)")
+    return con
+
+#function: KSP field, band, time stamp and observatory from filename
+def indexName(filename):
+    #filename : str KSP filename, FIELD.QUAD.BAND.YYMMDD_HHMM.OBS...
+    #returns None entries if filename does not follow KSP format
+    parts = os.path.basename(filename).split('.')
+    if len(parts) < 6 or len(parts[3]) != 11 or parts[3][6] != '_':
+        return None, None, None, None
+    return '.'.join(parts[:2]), parts[2], parts[3], parts[4]
+
+#function: header entries of one image, reads only headers
+def indexHeader(filename):
+    #returns dict of index columns, with DATE-OBS under 'date'
+    from astropy.io import fits
+    from .MagCalc import imageHDU
+
+    field, band, stamp, obs = indexName(filename)
+    with fits.open(filename) as hdulist:
+        header = imageHDU(hdulist).header
+        entry = {'field':field, 'band':band, 'stamp':stamp, 'obs':obs,
+                 'naxis1':header.get('NAXIS1'), 'naxis2':header.get('NAXIS2'),
+                 'date':header.get('DATE-OBS'), 'fwhm':None}
+        if band is None:
+            entry['band'] = header.get('FILTER')
+        for key in index_fwhmkeys:
+            if key in header:
+                entry['fwhm'] = float(header[key])
+                break
+    return entry
+
+def indexScan(dbname, files, rescan=False, verbosity=0):
+    '''
+    #################################################################
+    # Desc: Incrementally scan image headers into image index. Only #
+    #       files that are new or changed (size, mtime) since last  #
+    #       scan are opened, and only their headers are read.       #
+    #       Indexed files matching files that no longer exist are   #
+    #       removed from index.                                     #
+    # ------------------------------------------------------------- #
+    # Imports: sqlite3, astropy.io.fits, astropy.time.Time          #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #    dbname: str SQLite database filename                       #
+    #     files: list of str image filenames or glob patterns       #
+    #    rescan; boolean, if True reread all headers                #
+    # verbosity; int counts verbosity level                         #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    #   nscan: int number of files scanned into index               #
+    #################################################################
+    '''
+    from glob import glob
+    from astropy.time import Time
+    from .Astrometry import ksp_isot
+
+    from fnmatch import fnmatch
+
+    if isinstance(files, str):
+        files = [files]
+    paths = []
+    for pattern in files:
+        paths += sorted(glob(pattern)) if any(c in pattern for c in '*?[') else [pattern]
+    paths = [os.path.abspath(path) for path in paths]
+    patterns = [os.path.abspath(pattern) for pattern in files]
+
+    con = indexConnect(dbname)
+    known = dict((row[0], (row[1], row[2])) for row in
+                 con.execute("SELECT path, mtime, bytes FROM images"))
+    #find new or changed files
+    stale = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            #missing file, as with unreadable headers
+            if verbosity > 0:
+                print("unable to read "+path+": "+repr(e))
+            continue
+        if rescan or known.get(path) != (stat.st_mtime, stat.st_size):
+            stale.append((path, stat.st_mtime, stat.st_size))
+    #forget indexed files under scanned patterns that are gone
+    gone = [path for path in known if not os.path.exists(path)
+            and any(fnmatch(path, pattern) for pattern in patterns)]
+    if verbosity > 0:
+        print("scanning "+str(len(stale))+" of "+str(len(paths))+" files, pruning "+str(len(gone)))
+
+    #read headers of stale files
+    entries = []
+    for path, mtime, size in stale:
+        try:
+            entry = indexHeader(path)
+        except Exception as e:
+            if verbosity > 0:
+                print("unable to read "+path+": "+repr(e))
+            continue
+        if entry['date'] is None and entry['stamp'] is not None:
+            #fall back on KSP filename time stamp
+            entry['date'] = ksp_isot(entry['stamp'])
+        entry.update({'path':path, 'mtime':mtime, 'bytes':size})
+        entries.append(entry)
+    #convert all observation times at once
+    dated = [i for i, entry in enumerate(entries) if entry['date'] is not None]
+    if len(dated) > 0:
+        try:
+            mjds = np.atleast_1d(Time([entries[i]['date'] for i in dated], scale='utc').mjd)
+        except ValueError:
+            #malformed date somewhere, convert one at a time
+            mjds = np.zeros(len(dated))
+            for j, i in enumerate(dated):
+                try:
+                    mjds[j] = Time(entries[i]['date'], scale='utc').mjd
+                except ValueError as e:
+                    mjds[j] = np.nan
+                    if verbosity > 0:
+                        print("unable to read date of "+entries[i]['path']+": "+repr(e))
+        for i, mjd in zip(dated, mjds):
+            entries[i]['mjd'] = float(mjd)
+        #skip files with bad dates, as with unreadable headers
+        entries = [entry for entry in entries if not np.isnan(entry.get('mjd', 0.0))]
+    #store entries
+    cols = [col for col, typ in index_cols]
+    rows = [tuple(entry.get(col) for col in cols) for entry in entries]
+    with con:
+        con.executemany("DELETE FROM images WHERE path = ?", [(path,) for path in gone])
+        con.executemany("INSERT OR REPLACE INTO images ("+", ".join(cols)+
+                        ") VALUES ("+", ".join(["?"]*len(cols))+")", rows)
+    con.close()
+    return len(rows)
+
+#function: record measured FWHM of indexed image
+def indexFWHM(dbname, path, fwhm):
+    #fwhm : float measured FWHM (pixels) of image at path
+    con = indexConnect(dbname)
+    with con:
+        con.execute("UPDATE images SET fwhm = ? WHERE path = ?",
+                    (float(fwhm), os.path.abspath(path)))
+    con.close()
+
+def indexQuery(dbname, band=None, field=None, obs=None, t1=None, t2=None, year=None, fwhm=None, pattern=None):
+    '''
+    #################################################################
+    # Desc: Query image index for images in band, field and time    #
+    #       range with FWHM below limit, ordered in time.           #
+    # ------------------------------------------------------------- #
+    # Imports: sqlite3, astropy.time.Time (if year given)           #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #  dbname: str SQLite database filename                         #
+    #    band; str observation filter                               #
+    #   field; str KSP field, FIELD.QUAD (e.g., N3923-2.Q1)         #
+    #     obs; str observatory code (e.g., S, A, C)                 #
+    #   t1,t2; float time range, exclusive. day of year if year is  #
+    #          given, otherwise mjd                                 #
+    #    year; int year to measure time to                          #
+    #    fwhm; float upper limit on FWHM (pixels), images without a #
+    #          FWHM are excluded                                    #
+    # pattern; str SQL LIKE pattern on path (e.g., '%/raw/%')       #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    #  images: numpy record array of index columns, plus day (day   #
+    #          of year) if year is given                            #
+    #################################################################
+    '''
+    cols = [col for col, typ in index_cols]
+    #reference mjd of time range
+    mjd_ref = 0.0
+    if year is not None:
+        from astropy.time import Time
+        mjd_ref = Time(str(int(year))+"-01-01T00:00:00.000", format='isot', scale='utc').mjd
+    conds, vals = [], []
+    for col, op, val in [('band', '=', band), ('field', '=', field),
+                         ('obs', '=', obs), ('fwhm', '<', fwhm),
+                         ('path', 'LIKE', pattern)]:
+        if val is not None:
+            conds.append(col+" "+op+" ?")
+            vals.append(val)
+    if t1 is not None:
+        conds.append("mjd > ?")
+        vals.append(float(t1)+mjd_ref)
+    if t2 is not None:
+        conds.append("mjd < ?")
+        vals.append(float(t2)+mjd_ref)
+    sql = "SELECT "+", ".join(cols)+" FROM images"
+    if len(conds) > 0:
+        sql += " WHERE "+" AND ".join(conds)
+    sql += " ORDER BY mjd, path"
+    con = indexConnect(dbname)
+    rows = con.execute(sql, vals).fetchall()
+    con.close()
+
+    #convert to record array, missing values as nan or empty
+    dtype = [('path', object), ('mtime', float), ('bytes', int),
+             ('field', object), ('band', object), ('stamp', object),
+             ('obs', object), ('mjd', float), ('naxis1', int),
+             ('naxis2', int), ('fwhm', float)]
+    fill = {float:np.nan, int:-1, object:''}
+    rows = [tuple(fill[typ] if v is None else v for v, (col, typ) in zip(row, dtype)) for row in rows]
+    images = np.array(rows, dtype=dtype).view(np.recarray)
+    if year is not None:
+        from numpy.lib import recfunctions as rfn
+        images = rfn.append_fields(images, 'day', images.mjd-mjd_ref, usemask=False, asrecarray=True)
+    return images
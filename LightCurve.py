@@ -0,0 +1,398 @@
+#################################################################
+# Name:     LightCurve.py                                       #
+# Author:   Yuan Qi Ni                                          #
+# Version:  Oct, 17, 2026                                       #
+# Function: Program contains light curve generation engine.     #
+#           Runs MagCalc photometry on each epoch of a KMTNet   #
+#           image series across a process pool, and streams     #
+#           results into B/V/I light curve files in time order. #
+#           Epochs already in the light curve files are skipped #
+#           so an interrupted run can be resumed. Optionally    #
+#           keeps binary .npy copies of light curve files.      #
+#################################################################
+
+#essential modules
+import numpy as np
+import os
+import math
+
+#observation filters
+bands = ['B','V','I']
+bindex = {'B':0, 'V':1, 'I':2}
+#observatory positions
+observatories = {'A':[149.0587,-31.2712,1143.0], 'S':[18.4769,-32.3789,1762.0], 'C':[-70.8040,-30.1672,2167.0]}
+
+#global: light curve settings shared with process pool workers
+lcconfig = None
+
+#function which fills a row with column entries
+def rowGen(to,fo,RAo,DECo,Io,SNo,Mo,Mo_err,Mlimo,so):
+    from .Analysis.LCRoutines import padstr
+
+    sto = padstr("%.5f"%to,10)
+    sfo = padstr(fo,27)
+    sRAo = padstr("%.7f"%RAo,13)
+    sDECo = padstr("%.7f"%DECo,13)
+    sIo = padstr(str(Io)[:9],10)
+    sSNo = padstr(str(SNo)[:5],10)
+    sMo = padstr("%.3f"%Mo,10)
+    sMo_err = padstr("%.3f"%Mo_err,10)
+    sMlimo = padstr("%.3f"%Mlimo,10)
+    ss = "   "+so
+    out = '\n  '+sto+sfo+sRAo+sDECo+sIo+sSNo+sMo+sMo_err+sMlimo+ss
+    return out
+
+#fills first row with column headers
+def headGen(year):
+    from .Analysis.LCRoutines import padstr
+
+    sto = padstr("OBSDAY"+str(year),10)
+    sfo = padstr("STRTXT",27)
+    sRAo = padstr("RA_MC(\")",13)
+    sDECo = padstr("DEC_MC(\")",13)
+    sIo = padstr("Flux(uJy)",10)
+    sSNo = padstr("SNR",10)
+    sMo = padstr("MAG_MC",10)
+    sMo_err = padstr("MAGERR_MC",10)
+    sMlimo = padstr("LIM_MC",10)
+    ss = "   "+"NOTE"
+    out = "\n; "+sto+sfo+sRAo+sDECo+sIo+sSNo+sMo+sMo_err+sMlimo+ss
+    return out
+
+#function: dtype of binary light curve, same columns as text light curve
+def lcdtype(year):
+    names = headGen(year).split()[1:]
+    formats = ['f8','U27']+['f8']*7+['U32']
+    return np.dtype({'names':names, 'formats':formats})
+
+#function: decipher epoch information from KMTNet filename convention
+def epochinfo(filename):
+    fo = '.'.join(os.path.basename(filename).split('.')[2:5])
+    band = fo[0]
+    #observation date and time YYMMDD_HHMM orders epochs in time
+    stamp = fo.split('.')[1]
+    return fo, band, stamp
+
+#function: open or resume B/V/I light curve files
+def LCfiles(name, suffix, ra, dec, nrefs, user, t_now, year, verbosity=0):
+    """
+    #################################################################
+    # Desc: Generate B/V/I light curve files for an object, or load #
+    #       list of epochs already processed if they exist.         #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #      name: str name of object                                 #
+    #    suffix: str suffix of light curve filenames                #
+    #    ra,dec: float position of source in degrees                #
+    #     nrefs: list of int number of reference stars in B, V, I   #
+    #      user: str name of user generating light curve            #
+    #     t_now: str time stamp of light curve                      #
+    #      year: int year to measure time to                        #
+    # verbosity; int counts verbosity level                         #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    #   outs: list of str B/V/I light curve filenames               #
+    # f_done: list of B/V/I arrays of epochs already processed      #
+    #################################################################
+    """
+
+    #generate names using suffix
+    outs = [name+'.'+band+'.'+suffix for band in bands]
+
+    if all([os.path.exists(out) for out in outs]):
+        f_done = []
+        for out in outs:
+            if verbosity > 0:
+                print("Continuing "+out)
+            #load list of already processed files
+            f_done.append(np.loadtxt(out, dtype=str, comments=';', usecols=[1], ndmin=1))
+        if verbosity > 1:
+            print("Already done list:")
+            print(f_done)
+    else:
+        #already processed files is empty
+        f_done = [np.array([], dtype=str) for band in bands]
+        #write headers for BVI light curve output files
+        for i in range(len(bands)):
+            if verbosity > 0:
+                print("Starting "+outs[i])
+            outfile = open(outs[i], 'w')
+            outfile.write("; SOURCE_RA_DEC\t"+str(ra)+"\t"+str(dec))
+            outfile.write("\n; NUMBER_OF_REFERENCES\t"+str(nrefs[bindex[bands[i]]]))
+            outfile.write("\n; "+str(user)+"\t"+str(t_now))
+            outfile.write(headGen(year))
+            outfile.close()
+    return outs, f_done
+
+#function: photometry of source on a single epoch
+def epochphot(filename, ra, dec, year, cattype, catname, size=2000.0, name='object', psftype=2, fitsky=1, SNRnoise=3.0, satlvl=15.0, rellvl=16.0, satpix=40000.0, verbosity=0):
+    """
+    #################################################################
+    # Desc: Compute light curve entry of source on one KMTNet epoch #
+    #       with fixed centroid PSF photometry, followed by psftype #
+    #       photometry if source is detected above SNRnoise.        #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    # filename: str fits filename of epoch                          #
+    #   ra,dec: float position of source in degrees                 #
+    #     year: int year to measure time to                         #
+    #  cattype: str catalog type (aavso, diff, ...)                 #
+    #  catname: str catalog filename                                #
+    #     size; float radius (pixels) of reference stars            #
+    #     name; str name of object                                  #
+    #  psftype; int psf to fit when source is detected              #
+    #   fitsky; int whether to fit sky around source                #
+    # SNRnoise; float signal to noise of detection limits           #
+    #   satlvl; float reference star saturation magnitude           #
+    #   rellvl; float reference star reliable magnitude             #
+    #   satpix; float saturation pixel count                        #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    #   to: float time in days since start of year                  #
+    #   fo: str epoch name, band.YYMMDD_HHMM.observatory            #
+    # band: str observation filter                                  #
+    #  out: str formatted light curve row                           #
+    #################################################################
+    """
+
+    from .MagCalc import loadFits, magnitude, FitsError, PSFError
+    from .Astrometry import day_isot, moonEQC, moonLC, sepAngle
+
+    fo, band, stamp = epochinfo(filename)
+
+    #compute magnitude
+    Mtest = True
+    so = "_"
+    try: #try to load image
+        #read only section covering reference stars and their stamps
+        image, to, wcs = loadFits(filename, year=year, getwcs=True, memmap=True, region=(ra, dec, size+100.0), verbosity=0)
+    except FitsError:
+        #image critically failed to load
+        Mtest = False
+        so = "FITS_ERROR"
+        to = 0
+        if verbosity > 0:
+            print("Critical error loading image!")
+
+    if Mtest:
+        #get moon ephemeris
+        obs = fo[-1]
+        loc = observatories[obs]
+        time = day_isot(to,year)
+        RAmoon, DECmoon = moonEQC(time,loc)
+        ALTmoon, AZmoon = moonLC(time,loc)
+        #check if moon bright
+        if ALTmoon > 15.0:
+            so = "MOON_BRIGHT"
+        elif ALTmoon > 0.0 and sepAngle((ra,dec),(RAmoon,DECmoon)) < 90.0:
+            so = "MOON_BRIGHT"
+
+    if Mtest:
+        try:
+            # Photometry Sequence
+            #################################
+            #This sequence performs fixed PSF photometry for all images,
+            #then followed by psftype-defined PSF photometry if SNR > 3 detected
+            if verbosity > 0:
+                print("Try photometry with fixed centroid.")
+            RAo, DECo, Io, SNo, Mo, Mo_err, Mlimo = magnitude(image, image, wcs, cattype, catname, (ra,dec), radius=size, psf='1', name=name, band=band, fwhm=5.0, limsnr=SNRnoise, satmag=satlvl, refmag=rellvl, fitsky=fitsky, satpix=satpix, verbosity=0)
+            if SNo[0]>SNRnoise:
+                if verbosity > 0:
+                    print("Source is bright, get a better fix on centroid.")
+                RAo1, DECo1, Io1, SNo1, Mo1, Mo_err1, Mlimo1 = magnitude(image, image, wcs, cattype, catname, (ra,dec), radius=size, psf=str(psftype), name=name, band=band, fwhm=5.0, limsnr=SNRnoise, satmag=satlvl, refmag=rellvl, fitsky=1, satpix=satpix, verbosity=0)
+                if not any([math.isnan(Io1[0]),math.isinf(Io1[0]),math.isnan(SNo1[0]),math.isinf(SNo1[0])]):
+                    #take these if useable
+                    RAo, DECo, Io, SNo, Mo, Mo_err, Mlimo = RAo1, DECo1, Io1, SNo1, Mo1, Mo_err1, Mlimo1
+
+            #################################
+
+            RAo, DECo, Io, SNo, Mo, Mo_err = RAo[0], DECo[0], Io[0], SNo[0], Mo[0], Mo_err[0]
+
+            #check if MagCalc returns nonsense
+            if any([math.isnan(Mo),math.isinf(Mo),math.isnan(Mo_err),math.isinf(Mo_err)]):
+                Mo, Mo_err = -99.999, -99.999
+
+            if any([math.isnan(Io),math.isinf(Io),math.isnan(SNo),math.isinf(SNo)]):
+                Io, SNo = -99.99999, -99.99
+                if any([math.isnan(Mlimo),math.isinf(Mlimo)]):
+                    Mlimo = -99.999
+                    RAo, DECo = -99.9999999, -99.9999999
+                    Mtest = False
+
+            if any([math.isnan(Mlimo),math.isinf(Mlimo)]):
+                Mlimo = -99.999
+                if any([math.isnan(Io),math.isinf(Io),math.isnan(SNo),math.isinf(SNo)]):
+                    Io, SNo = -99.99999, -99.99
+                    RAo, DECo = -99.9999999, -99.9999999
+                    Mtest = False
+
+        except PSFError: #if image PSF cant be extracted
+            RAo, DECo, Io, SNo, Mo, Mo_err, Mlimo  = -99.9999999, -99.9999999, -99.99999, -99.99, -99.999, -99.999, -99.999
+            so = "PSF_ERROR"
+            Mtest = False
+            if verbosity > 0:
+                print("PSF can't be extracted!")
+        except: #General catastrophic failure
+            RAo, DECo, Io, SNo, Mo, Mo_err, Mlimo  = -99.9999999, -99.9999999, -99.99999, -99.99, -99.999, -99.999, -99.999
+            Mtest = False
+            if verbosity > 0:
+                print("Unknown catastrophic failure!")
+
+    else:
+        RAo, DECo, Io, SNo, Mo, Mo_err, Mlimo  = -99.9999999, -99.9999999, -99.99999, -99.99, -99.999, -99.999, -99.999
+
+    #check for total failure
+    if not Mtest:
+        so = so + "_BAD_IMAGE"
+    else:
+        if any([math.isnan(RAo),math.isinf(RAo),math.isnan(DECo),math.isinf(DECo)]):
+            RAo, DECo = -99.9999999, -99.9999999
+        if Mlimo < 0:
+            so = "INCONV"
+
+    #format output
+    out = rowGen(to,fo,RAo,DECo,Io,SNo,Mo,Mo_err,Mlimo,so)
+    return to, fo, band, out
+
+#function: store light curve settings in process pool worker
+def lcinit(config):
+    global lcconfig
+    lcconfig = config
+
+#function: call epoch photometry with worker's light curve settings
+def lccall(filename):
+    return (filename,)+epochphot(filename, **lcconfig)
+
+#function: stream light curve entries of epochs in time order
+def LCstream(files, nproc=None, chunksize=1, **config):
+    """
+    #################################################################
+    # Desc: Run epochphot on each file, across a process pool, and  #
+    #       yield entries in time order as soon as they are ready.  #
+    # ------------------------------------------------------------- #
+    # Imports: multiprocessing.Pool                                 #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #     files: list of str fits filenames of epochs               #
+    #     nproc; int number of processes, None for all cores,       #
+    #            1 to run serially in this process                  #
+    # chunksize; int number of epochs sent to a worker at a time    #
+    #    config; keyword arguments passed to epochphot              #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    # generator of (filename, to, fo, band, out) per epoch          #
+    #################################################################
+    """
+
+    #epochs in time order, by KMTNet filename time stamp
+    files = sorted(files, key=lambda filename: epochinfo(filename)[::-1])
+    if nproc == 1:
+        for filename in files:
+            yield (filename,)+epochphot(filename, **config)
+    else:
+        from multiprocessing import Pool
+        #ship settings to each worker once, not once per epoch
+        pool = Pool(nproc, initializer=lcinit, initargs=(config,))
+        try:
+            #imap returns in submission order while workers run ahead
+            for entry in pool.imap(lccall, files, chunksize):
+                yield entry
+        finally:
+            pool.terminate()
+            pool.join()
+
+#function: generate B/V/I light curve files of source
+def LCgenerate(files, name, suffix, ra, dec, year, cattype, catname, nrefs, user, t_now, size=2000.0, psftype=2, fitsky=1, SNRnoise=3.0, satlvl=15.0, rellvl=16.0, satpix=40000.0, nproc=None, chunksize=1, binary=False, verbosity=0):
+    """
+    #################################################################
+    # Desc: Generate B/V/I light curve files of source over KMTNet  #
+    #       epochs. Epochs are computed across a process pool, each #
+    #       row written as soon as it is ready, in time order.      #
+    #       Epochs already in existing light curve files are        #
+    #       skipped.                                                #
+    # ------------------------------------------------------------- #
+    # Input                                                         #
+    # ------------------------------------------------------------- #
+    #     files: list of str fits filenames of epochs               #
+    #      name: str name of object                                 #
+    #    suffix: str suffix of light curve filenames                #
+    #    ra,dec: float position of source in degrees                #
+    #      year: int year to measure time to                        #
+    #   cattype: str catalog type (aavso, diff, ...)                #
+    #   catname: str catalog filename                               #
+    #     nrefs: list of int number of reference stars in B, V, I   #
+    #      user: str name of user generating light curve            #
+    #     t_now: str time stamp of light curve                      #
+    #      size; float radius (pixels) of reference stars           #
+    #   psftype; int psf to fit when source is detected             #
+    #    fitsky; int whether to fit sky around source               #
+    #  SNRnoise; float signal to noise of detection limits          #
+    #    satlvl; float reference star saturation magnitude          #
+    #    rellvl; float reference star reliable magnitude            #
+    #    satpix; float saturation pixel count                       #
+    #     nproc; int number of processes, None for all cores        #
+    # chunksize; int number of epochs sent to a worker at a time    #
+    #    binary; bool whether to also keep binary .npy light curve  #
+    # verbosity; int counts verbosity level                         #
+    # ------------------------------------------------------------- #
+    # Output                                                        #
+    # ------------------------------------------------------------- #
+    # outs: list of str B/V/I light curve filenames                 #
+    #################################################################
+    """
+
+    outs, f_done = LCfiles(name, suffix, ra, dec, nrefs, user, t_now, year, verbosity=verbosity)
+
+    #epochs not already processed
+    todo = []
+    for filename in files:
+        fo, band, stamp = epochinfo(filename)
+        if band not in bands:
+            if verbosity > 0:
+                print("Skipping "+fo+", not in "+str(bands))
+        elif fo in f_done[bindex[band]]:
+            if verbosity > 0:
+                print("Already processed "+fo)
+        else:
+            todo.append(filename)
+    if verbosity > 0:
+        print("Processing "+str(len(todo))+"/"+str(len(files))+" epochs")
+
+    if binary:
+        from .Analysis.LCRoutines import LCtxt2npy, LCappend, LCtokens
+        #binary light curves start as copy of text light curves
+        npys = [os.path.splitext(out)[0]+'.npy' for out in outs]
+        for out, npy in zip(outs, npys):
+            try:
+                nrow = len(np.load(npy, mmap_mode='r'))
+            except (OSError, ValueError):
+                nrow = None
+            #recopy if missing rows, from runs without binary or runs
+            #interrupted between text and binary writes
+            if nrow != len(LCtokens(out)[1]):
+                if verbosity > 0 and nrow is not None:
+                    print("Reseeding "+npy+" from "+out)
+                LCtxt2npy(out, npy, dtype=lcdtype(year))
+
+    #keep light curve files open, flush each row in case run is interrupted
+    outfiles = [open(out, 'a') for out in outs]
+    try:
+        config = dict(ra=ra, dec=dec, year=year, cattype=cattype, catname=catname, size=size, name=name, psftype=psftype, fitsky=fitsky, SNRnoise=SNRnoise, satlvl=satlvl, rellvl=rellvl, satpix=satpix, verbosity=max(verbosity-1,0))
+        for i, (filename, to, fo, band, out) in enumerate(LCstream(todo, nproc=nproc, chunksize=chunksize, **config)):
+            if verbosity > 0:
+                print("Computed file "+str(i+1)+"/"+str(len(todo))+": "+os.path.basename(filename))
+                print(out+'\n')
+            outfiles[bindex[band]].write(out)
+            outfiles[bindex[band]].flush()
+            if binary:
+                LCappend(npys[bindex[band]], [out.split()])
+    finally:
+        for outfile in outfiles:
+            outfile.close()
+    return outs
@@ -16,6 +16,8 @@
 
 #essential modules
 import numpy as np
+import os
+from collections import OrderedDict
 
 #class: exception to clarify cause of crash as inability to extract psf on image
 class PSFError(Exception):
@@ -35,7 +37,16 @@ class FitsError(Exception):
         #set error message as value
         return repr(self.value)
 
-def loadFits(filename, year=2016, getwcs=False, gethdr=False, verbosity=0):
+#function: image HDU of fits file, tile compressed (.fz) frames keep it in extension
+def imageHDU(hdulist):
+    #hdulist : opened astropy HDUList
+    #returns first HDU holding image data, reads only headers
+    for hdu in hdulist:
+        if hdu.is_image and hdu.header.get('NAXIS', 0) > 0:
+            return hdu
+    return hdulist[0]
+
+def loadFits(filename, year=2016, getwcs=False, gethdr=False, memmap=None, region=None, verbosity=0):
     """
     #################################################################
     # Desc: Load fits file for MagCalc.                             #
@@ -44,11 +55,17 @@ def loadFits(filename, year=2016, getwcs=False, gethdr=False, verbosity=0):
     # ------------------------------------------------------------- #
     # Input                                                         #
     # ------------------------------------------------------------- #
-    #  filename: str fits filename to be opened                     #
+    #  filename: str fits filename to be opened, may be fpack (.fz) #
+    #            tile compressed                                    #
     # verbosity; int counts verbosity level                         #
     #    getwcs; boolean whether to return wcs                      #
     #    gethdr; boolean whether to return header                   #
     #      year; int year to measure time to                        #
+    #    memmap; boolean whether to memory map image instead of     #
+    #            reading it into memory, None for astropy default   #
+    #    region; (RA, DEC, half width) tuple, if given only the     #
+    #            section within half width (pixels) of RA, DEC      #
+    #            (degrees) is read. wcs and hdr describe section.   #
     # ------------------------------------------------------------- #
     # Output                                                        #
     # ------------------------------------------------------------- #
@@ -69,16 +86,47 @@ def loadFits(filename, year=2016, getwcs=False, gethdr=False, verbosity=0):
         #load HDU image
         if verbosity > 0:
             print("loading hdu")
-        hdulist = fits.open(filename)
-        info = hdulist.info()
-        image = hdulist[0].data
-        header = hdulist[0].header
-        #close HDU image
+        hdulist = fits.open(filename, memmap=memmap)
+        hdu = imageHDU(hdulist)
+        header = hdu.header
+    except:
+        raise FitsError('Unable to load fits data.')
+
+    wcs = None
+    if getwcs or region is not None:
+        try: #try to load WCS from parsed header
+            if verbosity > 0:
+                print("loading world coordinate system")
+            wcs = WCS(header, hdulist)
+        except:
+            hdulist.close()
+            raise FitsError('Unable to load wcs data.')
+
+    try: #read image, or section of image around region
+        if region is None:
+            image = hdu.data
+        else:
+            ny, nx = header['NAXIS2'], header['NAXIS1']
+            RA, DEC, half = region
+            x, y = wcs.all_world2pix(RA, DEC, 0)
+            #enclosing pixel bounds, clipped to image
+            x0 = int(min(max(np.floor(x - half), 0), nx))
+            x1 = int(min(max(np.ceil(x + half) + 1, x0), nx))
+            y0 = int(min(max(np.floor(y - half), 0), ny))
+            y1 = int(min(max(np.ceil(y + half) + 1, y0), ny))
+            if verbosity > 0:
+                print("reading section", x0, x1, y0, y1)
+            #section reads only the rows (or compressed tiles) needed
+            image = hdu.section[y0:y1, x0:x1]
+            #shift reference pixel onto section
+            wcs = wcs.slice((slice(y0, y1), slice(x0, x1)))
+            header = header.copy()
+            header['NAXIS1'], header['NAXIS2'] = x1-x0, y1-y0
+            for key, shift in (('CRPIX1', x0), ('CRPIX2', y0)):
+                if key in header:
+                    header[key] -= shift
+        #close HDU image, memory mapped data stays valid
         hdulist.close()
-        #print hdulist header
-        #if verbosity > 2:
-        #    print "\n info \n"
-        #    print header
     except:
         raise FitsError('Unable to load fits data.')
 
@@ -90,18 +138,387 @@ def loadFits(filename, year=2016, getwcs=False, gethdr=False, verbosity=0):
     retlist = [image, time]
 
     if getwcs:
-        try: #try to load WCS
-            if verbosity > 0:
-                print("loading world coordinate system")
-            wcs = WCS(filename)
-            retlist += [wcs]
-        except:
-            raise FitsError('Unable to load wcs data.')
+        retlist += [wcs]
     if gethdr:
         retlist += [header]
     return retlist
 
-def magnitude(image, catimage, wcs, cat, catname, xxx_todo_changeme, radius=500, over_intens=None, aperture=None, psf='1', name='object', band='V', fwhm=5.0, limsnr=3.0, satmag=14.0, refmag=19.0, fitsky=True, satpix=40000.0, verbosity=0, diagnosis=False):
+#global: reference star image shared with process pool workers
+refimage = None
+
+#function: store reference star image in process pool worker
+def refinit(image):
+    global refimage
+    refimage = image
+
+#function: call reference star routine on worker's shared image
+def refcall(payload):
+    func, args = payload
+    return func(refimage, *args)
+
+#function: map reference star routine over stars, in catalog order
+def refmap(func, image, args, executor='serial', nproc=None):
+    if executor == 'serial' or nproc == 1:
+        return [func(image, *arg) for arg in args]
+    elif executor == 'thread':
+        from multiprocessing.pool import ThreadPool
+        #threads share image directly
+        pool = ThreadPool(nproc)
+        try:
+            return pool.map(lambda arg: func(image, *arg), args)
+        finally:
+            pool.close()
+            pool.join()
+    elif executor == 'process':
+        from multiprocessing import Pool
+        #ship image to each worker once, not once per star
+        pool = Pool(nproc, initializer=refinit, initargs=(image,))
+        try:
+            return pool.map(refcall, [(func, arg) for arg in args])
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        raise ValueError("executor must be 'serial', 'thread' or 'process'")
+
+#function: extract PSF of reference star, no fit if extraction crashes
+def refextract(catimage, x0, y0, fwhm, fitsky, satpix, verbosity):
+    from . import Photometry as pht
+    try:
+        return pht.PSFextract(catimage, x0, y0, fwhm=fwhm, fitsky=fitsky, sat=satpix, verbosity=verbosity)
+    except:
+        return [0]*7, [0]*7, 0, [0]*3, 0
+
+#function: photometry of reference star using common PSF
+def refphot(catimage, x0, y0, catPSF, catPSFerr, aperture, fitsky, satpix, verbosity):
+    from . import Photometry as pht
+    #calculate intensity and SN ratio with reduced verbosity
+    PSFpopt, PSFperr, X2dof, skypopt, skyN = pht.PSFscale(catimage, catPSF, catPSFerr, x0, y0, fitsky=fitsky, sat=satpix, verbosity=verbosity)
+    #check preferred intensity calculation method
+    if aperture is None:
+        #integrate PSF directly
+        I, SN = pht.PSF_photometry(catimage, x0, y0, PSFpopt, PSFperr, '1', skypopt, skyN, verbosity=verbosity)
+    elif aperture <= 0:
+        #perform aperture photometry
+        #use FWHM of catPSF to define Kron aperture
+        I, SN = pht.Ap_photometry(catimage, x0, y0, skypopt, skyN, PSF=catPSF, fitsky=True, verbosity=verbosity)
+    else:
+        #use aperture given directly
+        I, SN = pht.Ap_photometry(catimage, x0, y0, skypopt, skyN, radius=aperture, fitsky=True, verbosity=verbosity)
+    return I, SN, skyN
+
+#global: in memory cache of calibration solutions, most recent last
+calcache = OrderedDict()
+#maximum number of calibration solutions held in memory
+calcache_size = 16
+
+#class: reference star calibration solution of an image
+class CalSolution:
+    """
+    Reference star photometry on an image, reusable by every source
+    measured on that image. Stage 1 (PSF fits, enough for diagnosis)
+    fills catPSF and sky statistics, stage 2 adds catIs and catSNs.
+    """
+    stage1 = ['catIDs', 'catMags', 'catMagerrs', 'catPSFs', 'catPSFerrs', 'catX2dofs', 'catSkyMs', 'catSkyNs', 'catXs', 'catYs', 'catPSF', 'catPSFerr', 'skyval', 'noise']
+    stage2 = ['catIs', 'catSNs', 'skyNs', 'catAp']
+    def __init__(self, key):
+        self.key = key
+        for field in self.stage1+self.stage2:
+            setattr(self, field, None)
+    def complete(self, diagnosis=False, aperture=None):
+        #is solution far enough along for this request
+        if diagnosis:
+            return self.catPSF is not None
+        return self.catIs is not None and self.catAp is not None and np.array_equal(self.catAp, calaperture(aperture), equal_nan=True)
+    def save(self, cachedir):
+        #write computed fields to cachedir/key.npz
+        fields = dict([(f, getattr(self, f)) for f in self.stage1+self.stage2 if getattr(self, f) is not None])
+        np.savez(os.path.join(cachedir, self.key+'.npz'), **fields)
+    @classmethod
+    def load(cls, cachedir, key):
+        #read solution from cachedir/key.npz, None if not there
+        filename = os.path.join(cachedir, key+'.npz')
+        if not os.path.exists(filename):
+            return None
+        sol = cls(key)
+        with np.load(filename) as data:
+            for field in data.files:
+                setattr(sol, field, data[field])
+        return sol
+
+#function: stage 2 aperture as stored in solution, NaN for PSF integration
+def calaperture(aperture):
+    return np.array(np.nan if aperture is None else float(aperture))
+
+#function: key identifying reference star fits (stage 1) of image
+def calkey(catimage, wcs, cat, catname, RAo, DECo, Xo, Yo, radius, band, fwhm, satmag, refmag, fitsky, satpix):
+    import hashlib
+    h = hashlib.sha1()
+    #full reference star image, so any change to pixels changes key
+    h.update(str((catimage.shape, catimage.dtype.str)).encode())
+    h.update(np.ascontiguousarray(catimage).view(np.uint8))
+    #reference star positions depend on wcs and catalog
+    h.update(wcs.to_header_string().encode())
+    h.update(str((cat, os.path.abspath(catname))).encode())
+    if cat == 'aavso':
+        #catalog is queried around object
+        h.update(str((float(RAo[0]), float(DECo[0]))).encode())
+    #reference stars are selected within radius of object
+    h.update(str((round(float(np.mean(Xo)),1), round(float(np.mean(Yo)),1), radius)).encode())
+    #fitting parameters
+    h.update(str((band, fwhm, satmag, refmag, bool(fitsky), satpix)).encode())
+    return h.hexdigest()
+
+#function: reference star calibration of image, from cache if available
+def calibrate(catimage, wcs, cat, catname, RAo, DECo, Xo, Yo, radius=500, aperture=None, name=None, band='V', fwhm=5.0, satmag=14.0, refmag=19.0, fitsky=True, satpix=40000.0, verbosity=0, diagnosis=False, executor='serial', nproc=None, cache=True, cachedir=None):
+    """
+    #####################################################################
+    # Desc: Reference star photometry on image for magnitude.           #
+    # ----------------------------------------------------------------- #
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    #  Same as magnitude, with source pixel positions Xo, Yo, and       #
+    #     cache; boolean whether to keep solution in memory.            #
+    #  cachedir; str directory to also keep solutions on disk.          #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #       sol: CalSolution, stage 1 only if diagnosis.                #
+    #####################################################################
+    """
+    from . import Catalog as ctlg
+    from . import PSFlib as plib
+    from . import Photometry as pht
+
+    if name is None:
+        name = ['object']
+    key = calkey(catimage, wcs, cat, catname, RAo, DECo, Xo, Yo, radius, band, fwhm, satmag, refmag, fitsky, satpix)
+    sol = None
+    if cache and key in calcache:
+        #solution already computed in this session
+        sol = calcache.pop(key)
+    elif cachedir is not None:
+        #solution computed in previous session
+        sol = CalSolution.load(cachedir, key)
+    if sol is None:
+        sol = CalSolution(key)
+    elif verbosity > 0:
+        print("Using cached reference star calibration "+key)
+
+    if sol.catPSF is None:
+        #load photometric reference stars catalog
+        if verbosity > 0:
+            print("loading catalog")
+        if cat == 'phot':
+            ID, RA, DEC, catM, catMerr = ctlg.catPhot(catname,band=band)
+        elif cat == 'dprs':
+            ID, RA, DEC, catM, catMerr = ctlg.catDPRS(catname,band=band)
+        elif cat == 'diff':
+            ID, RA, DEC, catM, catMerr = ctlg.catDiff(catname,band=band)
+        elif cat == 'aavso':
+            fovam = 2.0*radius*0.4/60.0 #arcmin radius in KMT scaling
+            if band == 'I':
+                if verbosity > 0:
+                    print("Performing AAVSO i -> I band conversion (Jodri 2006)")
+                IDi, RAi, DECi, catMi, catMierr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,'i',out=catname)
+                IDr, RAr, DECr, catMr, catMrerr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,'r',out=catname)
+                ID, RA, DEC, catM, catMerr = [], [], [], [], []
+                for i in range(len(IDi)):
+                    #for each ID in i band
+                    if IDi[i] in IDr:
+                        #if also in r band
+                        j = list(IDr).index(IDi[i]) #here it is
+                        #get I band from i and r
+                        ID.append(IDi[i])
+                        RA.append(RAi[i])
+                        DEC.append(DECi[i])
+                        #Jodri 2006 general stars transform
+                        catMI = 1.083*catMi[i] - 0.083*catMr[j] - 0.376
+                        catMIerr = np.sqrt(((catMr[j]-catMi[i])*0.006)**2 + (0.004)**2 + (1.083*catMierr[i])**2 + (0.083*catMrerr[j])**2)
+                        catM.append(catMI)
+                        catMerr.append(catMIerr)
+                ID, RA, DEC, catM, catMerr = np.array(ID), np.array(RA), np.array(DEC), np.array(catM), np.array(catMerr)
+                ID, RA, DEC, catM, catMerr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,'i',out=catname)
+            else:
+                ID, RA, DEC, catM, catMerr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,band,out=catname)
+    
+        #convert position of catalog stars to pixels
+        catX, catY = wcs.all_world2pix(RA, DEC, 0)
+        catX, catY = catX.astype(float), catY.astype(float)
+        #select catalog stars within some radius of object
+        index = pht.dist(catX,catY,np.mean(Xo),np.mean(Yo)) < radius
+        edgetol = 15
+        #select catalog stars within edges
+        index = np.logical_and(index, np.logical_and(catX > edgetol, catimage.shape[1]-catX > edgetol))
+        index = np.logical_and(index, np.logical_and(catY > edgetol, catimage.shape[0]-catY > edgetol))
+        #select unsaturated catalog stars
+        index = np.logical_and(index, catM > satmag)
+        #select bright enough catalog stars
+        index = np.logical_and(index, catM < refmag)
+        #remove commented catalog stars
+        index = np.logical_and(index, ID.astype('<U1') != '#')
+        #crop values to mask
+        ID, catX, catY, catRA, catDEC, catM, catMerr = ID[index], catX[index], catY[index], RA[index], DEC[index], catM[index], catMerr[index]
+        if len(ID) == 0:
+            raise PSFError('No reference stars in image.')
+        if verbosity > 0:
+            #output selected catalog stars
+            print("Selected catalog star IDs:")
+            for i in range(len(ID)):
+                print((ID[int(i)], catX[int(i)], catY[int(i)]))
+                print((catRA[int(i)], catDEC[int(i)], catM[int(i)], catMerr[int(i)]))
+        #number of selected catalog stars
+        Ncat = len(ID)
+
+        if satpix == 0:
+            #measure saturation level: works if there is saturated star 
+            sat = satpix(catimage)
+        if verbosity > 3:
+            #essential extra import
+            import matplotlib.pyplot as plt
+            #plot image of catalog positions
+            plt.imshow(catimage, cmap='Greys', vmax=0.001*np.amax(catimage), vmin=0)
+            plt.scatter(catX, catY)
+            plt.scatter(Xo, Yo, c='r')
+            for i in range(Ncat):
+                plt.text(catX[i], catY[i], ID[i])
+            for i in range(len(name)):
+                plt.text(Xo[i], Yo[i], name[i])
+            plt.show()
+        #photometry on catalog stars
+        catMags = [] #magnitude list
+        catMagerrs = []
+        catPSFs = [] #PSF fits to catalog stars
+        catPSFerrs = [] #fit errors
+        catSkyMs = [] #background average count
+        catSkyNs = [] #background noise
+        catXs = []
+        catYs = []
+        catX2dofs = []
+        catIDs = []
+        if verbosity > 0:
+            print(("Extracting PSF of "+str(Ncat)+" catalog stars."))
+    
+        #calculate PSF for each reference star
+        #verbosity is reduced for catalog stars
+        fits = refmap(refextract, catimage, [(catX[i], catY[i], fwhm, fitsky, satpix, verbosity-1) for i in range(Ncat)], executor, nproc)
+        for i in range(Ncat):
+            if verbosity > 0:
+                print(("\nComputing PSF of "+str(i+1)+"/"+str(Ncat)))
+            #position of reference star
+            x0, y0 = catX[i], catY[i]
+            #PSF fit of reference star
+            PSFpopt, PSFperr, X2dof, skypopt, skyN = fits[i]
+            PSF, PSFerr = PSFpopt[1:5], PSFperr[1:5]
+        
+            #Take only reference stars whose fits are sane 
+            if plib.E2moff_verify(PSFpopt, x0, y0):
+                PSF[3] = PSF[3] % 180.0 #principle angle
+                #break x,y degeneracy in theta
+                if PSF[0] > PSF[1]:
+                    #switched up x,y axes
+                    PSF[0], PSF[1] = PSF[1], PSF[0]
+                    if PSF[3]<90:
+                        PSF[3] += 90
+                    if PSF[3]>90:
+                        PSF[3] -= 90
+                    if verbosity > 2:
+                        print("Swapping theta to enforce ax<ay")
+                #save magnitude of catalog star
+                catMags.append(catM[i])
+                catMagerrs.append(catMerr[i])
+                #save catalog star fit
+                catPSFs.append(PSF)
+                catPSFerrs.append(PSFerr)
+                #save sky details
+                catSkyMs.append(skypopt[0]*PSFpopt[5]+skypopt[1]*PSFpopt[6]+skypopt[2])
+                catSkyNs.append(skyN)
+                #save ref star position
+                catXs.append(PSFpopt[5])
+                catYs.append(PSFpopt[6])
+                #save fit X2/dof
+                catX2dofs.append(X2dof)
+                catIDs.append(ID[i])
+            else:
+                if verbosity > 0:
+                    #say something about fit being bad for this particular star
+                    print(("\nReference star ID"+str(ID[i])+" fit unacceptable"))
+                    print(("Criminal located at position "+str([x0,y0])+".\n"))
+
+        ncat = len(catMags) #number of good stars
+        if verbosity > 0:
+            print(("\nNumber of reference stars used: "+str(ncat)+"/"+str(Ncat)))
+        if float(ncat)/Ncat < 0.5:
+            #over half reference stars are invalid... how??
+            raise PSFError('Unable to perform photometry on reference stars.')
+        catMags = np.array(catMags)
+        catMagerrs = np.array(catMagerrs)
+        catPSFs = np.array(catPSFs)
+        catPSFerrs = np.array(catPSFerrs)
+        catSkyMs = np.array(catSkyMs)
+        catSkyNs = np.array(catSkyNs)
+        catXs = np.array(catXs)
+        catYs = np.array(catYs)
+        catX2dofs = np.array(catX2dofs)
+        catIDs = np.array(catIDs)
+        #print catPSFs.T[3]
+    
+        #calculate average psf among reference stars
+        w = 1/np.square(catPSFerrs)
+        catPSF = (catPSFs*w).sum(0)/w.sum(0)
+        catPSFerr = np.sqrt(1/w.sum(0))
+        #calculate average sky parameters
+        skyval = catSkyMs.mean() #mean constant background
+        noise = catSkyNs.mean() #mean std from background
+        if verbosity > 0:
+            print(("Average PSF [ax, ay, b, theta] =",str(catPSF)))
+            print(("parameter errors =",str(catPSFerr)))
+            print(("Average FWHMx,FWHMy =",str(plib.E2moff_toFWHM(*catPSF[:-1]))))
+            print(("Average background sky count =",str(skyval)))
+            print(("Average noise in background =",str(noise)))
+            print("")
+        #store stage 1 solution
+        sol.catIDs, sol.catMags, sol.catMagerrs = catIDs, catMags, catMagerrs
+        sol.catPSFs, sol.catPSFerrs, sol.catX2dofs = catPSFs, catPSFerrs, catX2dofs
+        sol.catSkyMs, sol.catSkyNs = catSkyMs, catSkyNs
+        sol.catXs, sol.catYs = catXs, catYs
+        sol.catPSF, sol.catPSFerr = catPSF, catPSFerr
+        sol.skyval, sol.noise = skyval, noise
+
+    if not sol.complete(diagnosis, aperture):
+        #Integration using common PSF
+        catXs, catYs = sol.catXs, sol.catYs
+        catPSF, catPSFerr = sol.catPSF, sol.catPSFerr
+        ncat = len(catXs)
+        catIs = np.zeros(ncat)
+        catSNs = np.zeros(ncat)
+        skyNs = np.zeros(ncat)
+        phots = refmap(refphot, catimage, [(catXs[i], catYs[i], catPSF, catPSFerr, aperture, fitsky, satpix, verbosity-1) for i in range(ncat)], executor, nproc)
+        for i in range(ncat):
+            if verbosity > 0:
+                print(("Computing intensity of "+str(i+1)+"/"+str(ncat)))
+            I, SN, skyN = phots[i]
+            #check if reference stars are valid
+            if I == 0 or SN == 0 or skyN == 0:
+                raise PSFError('Unable to perform photometry on reference stars.')
+            #save intensity and SN ratio
+            catIs[i]=I
+            catSNs[i]=SN
+            skyNs[i]=skyN
+        #store stage 2 solution, valid for this aperture
+        sol.catIs, sol.catSNs, sol.skyNs = catIs, catSNs, skyNs
+        sol.catAp = calaperture(aperture)
+
+    if cache:
+        #keep most recent solutions
+        calcache[key] = sol
+        while len(calcache) > calcache_size:
+            calcache.popitem(last=False)
+    if cachedir is not None:
+        sol.save(cachedir)
+    return sol
+
+def magnitude(image, catimage, wcs, cat, catname, xxx_todo_changeme, radius=500, over_intens=None, aperture=None, psf='1', name='object', band='V', fwhm=5.0, limsnr=3.0, satmag=14.0, refmag=19.0, fitsky=True, satpix=40000.0, verbosity=0, diagnosis=False, executor='serial', nproc=None, cache=True, cachedir=None):
     """
     #####################################################################
     # Desc: Compute magnitude of object in image using ref catalog.     #
@@ -141,6 +558,12 @@ def magnitude(image, catimage, wcs, cat, catname, xxx_todo_changeme, radius=500,
     #    fitsky; boolean, if True; fit for planar sky around source to  #
     #            be subtracted from image before fitting/integrating.   #
     # verbosity; int counts verbosity level.                            #
+    #  executor; str how to run reference star fits: 'serial',          #
+    #            'thread' pool, or 'process' pool.                      #
+    #     nproc; int number of workers in pool (None: cpu count).       #
+    #     cache; boolean, if True; reuse reference star calibration of  #
+    #            this image and parameters from earlier calls.          #
+    #  cachedir; str directory in which to also cache calibrations.    #
     # ----------------------------------------------------------------- #
     # Output                                                            #
     # ----------------------------------------------------------------- #
@@ -151,8 +574,6 @@ def magnitude(image, catimage, wcs, cat, catname, xxx_todo_changeme, radius=500,
     #####################################################################
     """
     (RAo,DECo) = xxx_todo_changeme
-    from . import Catalog as ctlg
-    from . import PSFlib as plib
     from . import Photometry as pht
     from .Analysis.Cosmology import bands, flux_0
 
@@ -176,218 +597,18 @@ def magnitude(image, catimage, wcs, cat, catname, xxx_todo_changeme, radius=500,
         if verbosity > 0:
             print(("Source "+str(i+1)+" located at: "+str(Xo[i])+", "+str(Yo[i])))
     
-    #load photometric reference stars catalog
-    if verbosity > 0:
-        print("loading catalog")
-    if cat == 'phot':
-        ID, RA, DEC, catM, catMerr = ctlg.catPhot(catname,band=band)
-    elif cat == 'dprs':
-        ID, RA, DEC, catM, catMerr = ctlg.catDPRS(catname,band=band)
-    elif cat == 'diff':
-        ID, RA, DEC, catM, catMerr = ctlg.catDiff(catname,band=band)
-    elif cat == 'aavso':
-        fovam = 2.0*radius*0.4/60.0 #arcmin radius in KMT scaling
-        if band == 'I':
-            if verbosity > 0:
-                print("Performing AAVSO i -> I band conversion (Jodri 2006)")
-            IDi, RAi, DECi, catMi, catMierr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,'i',out=catname)
-            IDr, RAr, DECr, catMr, catMrerr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,'r',out=catname)
-            ID, RA, DEC, catM, catMerr = [], [], [], [], []
-            for i in range(len(IDi)):
-                #for each ID in i band
-                if IDi[i] in IDr:
-                    #if also in r band
-                    j = list(IDr).index(IDi[i]) #here it is
-                    #get I band from i and r
-                    ID.append(IDi[i])
-                    RA.append(RAi[i])
-                    DEC.append(DECi[i])
-                    #Jodri 2006 general stars transform
-                    catMI = 1.083*catMi[i] - 0.083*catMr[j] - 0.376
-                    catMIerr = np.sqrt(((catMr[j]-catMi[i])*0.006)**2 + (0.004)**2 + (1.083*catMierr[i])**2 + (0.083*catMrerr[j])**2)
-                    catM.append(catMI)
-                    catMerr.append(catMIerr)
-            ID, RA, DEC, catM, catMerr = np.array(ID), np.array(RA), np.array(DEC), np.array(catM), np.array(catMerr)
-            ID, RA, DEC, catM, catMerr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,'i',out=catname)
-        else:
-            ID, RA, DEC, catM, catMerr = ctlg.catAAVSO(RAo[0],DECo[0],fovam,band,out=catname)
-    
-    #convert position of catalog stars to pixels
-    catX, catY = wcs.all_world2pix(RA, DEC, 0)
-    catX, catY = catX.astype(float), catY.astype(float)
-    #select catalog stars within some radius of object
-    index = pht.dist(catX,catY,np.mean(Xo),np.mean(Yo)) < radius
-    if np.array_equal(image,catimage):
-        edgetol = 15
-    else:
-        edgetol = 15
-    #select catalog stars within edges
-    index = np.logical_and(index, np.logical_and(catX > edgetol, catimage.shape[1]-catX > edgetol))
-    index = np.logical_and(index, np.logical_and(catY > edgetol, catimage.shape[0]-catY > edgetol))
-    #select unsaturated catalog stars
-    index = np.logical_and(index, catM > satmag)
-    #select bright enough catalog stars
-    index = np.logical_and(index, catM < refmag)
-    #remove commented catalog stars
-    index = np.logical_and(index, ID.astype('<U1') != '#')
-    #crop values to mask
-    ID, catX, catY, catRA, catDEC, catM, catMerr = ID[index], catX[index], catY[index], RA[index], DEC[index], catM[index], catMerr[index]
-    if len(ID) == 0:
-        raise PSFError('No reference stars in image.')
-    if verbosity > 0:
-        #output selected catalog stars
-        print("Selected catalog star IDs:")
-        for i in range(len(ID)):
-            print((ID[int(i)], catX[int(i)], catY[int(i)]))
-            print((catRA[int(i)], catDEC[int(i)], catM[int(i)], catMerr[int(i)]))
-    #number of selected catalog stars
-    Ncat = len(ID)
-
-    if satpix == 0:
-        #measure saturation level: works if there is saturated star 
-        sat = satpix(image)
-    if verbosity > 3:
-        #essential extra import
-        import matplotlib.pyplot as plt
-        #plot image of catalog positions
-        plt.imshow(catimage, cmap='Greys', vmax=0.001*np.amax(catimage), vmin=0)
-        plt.scatter(catX, catY)
-        plt.scatter(Xo, Yo, c='r')
-        for i in range(Ncat):
-            plt.text(catX[i], catY[i], ID[i])
-        for i in range(Nobj):
-            plt.text(Xo[i], Yo[i], name[i])
-        plt.show()
-    #photometry on catalog stars
-    catMags = [] #magnitude list
-    catMagerrs = []
-    catPSFs = [] #PSF fits to catalog stars
-    catPSFerrs = [] #fit errors
-    catSkyMs = [] #background average count
-    catSkyNs = [] #background noise
-    catXs = []
-    catYs = []
-    catX2dofs = []
-    catIDs = []
-    if verbosity > 0:
-        print(("Extracting PSF of "+str(Ncat)+" catalog stars."))
-    
-    #calculate PSF for each reference star
-    for i in range(Ncat):
-        if verbosity > 0:
-            print(("\nComputing PSF of "+str(i+1)+"/"+str(Ncat)))
-        #position of reference star
-        x0, y0 = catX[i], catY[i]
-        #calculate intensity and SN ratio
-        #verbosity is reduced for catalog stars
-        try:
-            PSFpopt, PSFperr, X2dof, skypopt, skyN = pht.PSFextract(catimage, x0, y0, fwhm=fwhm, fitsky=fitsky[0], sat=satpix, verbosity=verbosity-1)
-            PSF, PSFerr = PSFpopt[1:5], PSFperr[1:5]
-        except:
-            PSFpopt = [0]*7
-        
-        #Take only reference stars whose fits are sane 
-        if plib.E2moff_verify(PSFpopt, x0, y0):
-            PSF[3] = PSF[3] % 180.0 #principle angle
-            #break x,y degeneracy in theta
-            if PSF[0] > PSF[1]:
-                #switched up x,y axes
-                PSF[0], PSF[1] = PSF[1], PSF[0]
-                if PSF[3]<90:
-                    PSF[3] += 90
-                if PSF[3]>90:
-                    PSF[3] -= 90
-                if verbosity > 2:
-                    print("Swapping theta to enforce ax<ay")
-            #save magnitude of catalog star
-            catMags.append(catM[i])
-            catMagerrs.append(catMerr[i])
-            #save catalog star fit
-            catPSFs.append(PSF)
-            catPSFerrs.append(PSFerr)
-            #save sky details
-            catSkyMs.append(skypopt[0]*PSFpopt[5]+skypopt[1]*PSFpopt[6]+skypopt[2])
-            catSkyNs.append(skyN)
-            #save ref star position
-            catXs.append(PSFpopt[5])
-            catYs.append(PSFpopt[6])
-            #save fit X2/dof
-            catX2dofs.append(X2dof)
-            catIDs.append(ID[i])
-        else:
-            if verbosity > 0:
-                #say something about fit being bad for this particular star
-                print(("\nReference star ID"+str(ID[i])+" fit unacceptable"))
-                print(("Criminal located at position "+str([x0,y0])+".\n"))
-
-    ncat = len(catMags) #number of good stars
-    if verbosity > 0:
-        print(("\nNumber of reference stars used: "+str(ncat)+"/"+str(Ncat)))
-    if float(ncat)/Ncat < 0.5:
-        #over half reference stars are invalid... how??
-        raise PSFError('Unable to perform photometry on reference stars.')
-    catMags = np.array(catMags)
-    catMagerrs = np.array(catMagerrs)
-    catPSFs = np.array(catPSFs)
-    catPSFerrs = np.array(catPSFerrs)
-    catSkyMs = np.array(catSkyMs)
-    catSkyNs = np.array(catSkyNs)
-    catXs = np.array(catXs)
-    catYs = np.array(catYs)
-    catX2dofs = np.array(catX2dofs)
-    catIDs = np.array(catIDs)
-    #print catPSFs.T[3]
-    
-    #calculate average psf among reference stars
-    w = 1/np.square(catPSFerrs)
-    catPSF = (catPSFs*w).sum(0)/w.sum(0)
-    catPSFerr = np.sqrt(1/w.sum(0))
-    #calculate average sky parameters
-    skyval = catSkyMs.mean() #mean constant background
-    noise = catSkyNs.mean() #mean std from background
-    if verbosity > 0:
-        print(("Average PSF [ax, ay, b, theta] =",str(catPSF)))
-        print(("parameter errors =",str(catPSFerr)))
-        print(("Average FWHMx,FWHMy =",str(plib.E2moff_toFWHM(*catPSF[:-1]))))
-        print(("Average background sky count =",str(skyval)))
-        print(("Average noise in background =",str(noise)))
-        print("")
+    #reference star calibration on catalog image
+    sol = calibrate(catimage, wcs, cat, catname, RAo, DECo, Xo, Yo, radius=radius, aperture=aperture, name=name, band=band, fwhm=fwhm, satmag=satmag, refmag=refmag, fitsky=fitsky[0], satpix=satpix, verbosity=verbosity, diagnosis=diagnosis, executor=executor, nproc=nproc, cache=cache, cachedir=cachedir)
+    catPSF, catPSFerr = sol.catPSF, sol.catPSFerr
+    catMags, catMagerrs = sol.catMags, sol.catMagerrs
+    catX2dofs = sol.catX2dofs
 
     if diagnosis:
         if verbosity > 0:
             print("Returning image data for diagnosis")
-        return catPSF, catPSFerr, skyval, noise
-
-    #Integration using common PSF
-    catIs = np.zeros(ncat)
-    catSNs = np.zeros(ncat)
-    skyNs = np.zeros(ncat)
-    for i in range(ncat):
-        if verbosity > 0:
-            print(("Computing intensity of "+str(i+1)+"/"+str(ncat)))
-        #position of star in catalog
-        x0, y0 = catXs[i], catYs[i]
-        #calculate intensity and SN ratio with reduced verbosity
-        PSFpopt, PSFperr, X2dof, skypopt, skyN = pht.PSFscale(catimage, catPSF, catPSFerr, x0, y0, fitsky=fitsky[0], sat=satpix, verbosity=verbosity-1)
-        #check preferred intensity calculation method
-        if aperture is None:
-            #integrate PSF directly
-            I, SN = pht.PSF_photometry(catimage, x0, y0, PSFpopt, PSFperr, '1', skypopt, skyN, verbosity=verbosity-1)
-        elif aperture <= 0:
-            #perform aperture photometry
-            #use FWHM of catPSF to define Kron aperture
-            I, SN = pht.Ap_photometry(catimage, x0, y0, skypopt, skyN, PSF=catPSF, fitsky=True, verbosity=verbosity-1)
-        else:
-            #use aperture given directly
-            I, SN = pht.Ap_photometry(catimage, x0, y0, skypopt, skyN, radius=aperture, fitsky=True, verbosity=verbosity-1)
-        #check if reference stars are valid
-        if I == 0 or SN == 0 or skyN == 0:
-            raise PSFError('Unable to perform photometry on reference stars.')
-        #save intensity and SN ratio
-        catIs[i]=I
-        catSNs[i]=SN
-        skyNs[i]=skyN
+        return catPSF, catPSFerr, sol.skyval, sol.noise
 
+    catIs, catSNs, skyNs = sol.catIs, sol.catSNs, sol.skyNs
     if verbosity > 0:
         print(("Mean SN of reference stars:",np.mean(catSNs)))
         print(("Mean background noise:", np.mean(skyNs), np.std(skyNs)))
@@ -540,6 +761,137 @@ def magnitude(image, catimage, wcs, cat, catname, xxx_todo_changeme, radius=500,
         #return calculated magnitude and magnitude errors
         return RAo, DECo, I, SNo, mo, mo_err
 
+#function: forced photometry of one source using common PSF
+def srcphot(image, x0, y0, catPSF, catPSFerr, psf, aperture, fwhm, fitsky, satpix, verbosity):
+    try:
+        return srcfit(image, x0, y0, catPSF, catPSFerr, psf, aperture, fwhm, fitsky, satpix, verbosity)
+    except:
+        #target at edge or failed fit, NaN row without failing others
+        if verbosity > 0:
+            print("Unable to measure target at "+str(x0)+", "+str(y0))
+        return x0, y0, np.nan, np.nan, np.nan
+
+#function: fit and integrate forced photometry target
+def srcfit(image, x0, y0, catPSF, catPSFerr, psf, aperture, fwhm, fitsky, satpix, verbosity):
+    from . import Photometry as pht
+    #fit source to as great a degree as needed
+    if psf == '2':
+        PSFpopt, PSFperr, X2dof, skypopt, skyN = pht.PSFfit(image, catPSF, catPSFerr, x0, y0, fitsky=fitsky, sat=satpix, verbosity=verbosity)
+    elif psf == '3':
+        PSFpopt, PSFperr, X2dof, skypopt, skyN = pht.PSFextract(image, x0, y0, fwhm, fitsky=fitsky, sat=satpix, verbosity=verbosity)
+    else:
+        PSFpopt, PSFperr, X2dof, skypopt, skyN = pht.PSFscale(image, catPSF, catPSFerr, x0, y0, fitsky=fitsky, sat=satpix, verbosity=verbosity)
+    #check preferred intensity calculation method
+    if aperture is None:
+        #integrate PSF directly
+        I, SN = pht.PSF_photometry(image, x0, y0, PSFpopt, PSFperr, psf, skypopt, skyN, verbosity=verbosity)
+    elif aperture <= 0:
+        #use FWHM of catPSF to define Kron aperture
+        I, SN = pht.Ap_photometry(image, x0, y0, skypopt, skyN, PSF=catPSF, fitsky=fitsky, verbosity=verbosity)
+    else:
+        #use aperture given directly
+        I, SN = pht.Ap_photometry(image, x0, y0, skypopt, skyN, radius=aperture, fitsky=fitsky, verbosity=verbosity)
+    return PSFpopt[5], PSFpopt[6], I, SN, skyN
+
+def forcedphot(image, catimage, wcs, cat, catname, RA, DEC, radius=500, aperture=None, psf='1', band='V', fwhm=5.0, limsnr=3.0, satmag=14.0, refmag=19.0, fitsky=True, satpix=40000.0, verbosity=0, executor='serial', nproc=None, cache=True, cachedir=None):
+    """
+    #####################################################################
+    # Desc: Forced photometry of many targets on one image, calibrated  #
+    #       once using ref catalog.                                     #
+    # ----------------------------------------------------------------- #
+    # Imports:                                                          #
+    # ----------------------------------------------------------------- #
+    # Input                                                             #
+    # ----------------------------------------------------------------- #
+    #     image: numpy array containing image data on which to measure  #
+    #            target photometry.                                     #
+    #  catimage: numpy array containing image data on which to measure  #
+    #            reference star photometry.                             #
+    #       wcs: astropy wcs object, world coordinate system on image.  #
+    #       cat: str catalog type (phot, dprs, or diff from Catalog.py) #
+    #   catname: str catalog name.                                      #
+    #   RA, DEC: float arrays, equatorial coordinates of targets (deg). #
+    #    radius; float radius around targets in which to take ref stars.#
+    #  aperture; float aperture in which to integrate light. If None;   #
+    #            PSF is integrated. If not positive; Kron aperture.     #
+    #       psf; string PSF fit for every target ('1' fixed centroid,   #
+    #            '2' free centroid, '3' free shape).                    #
+    #      band; char observational filter of data.                     #
+    #      fwhm; float estimate of FWHM on image.                       #
+    #    limsnr; float signal to noise ratio defining detection limit,  #
+    #            if 0.0, then no detection limits are calculated.       #
+    #    satmag; float magnitude below which reference stars are        #
+    #            considered to be saturated and hence not used.         #
+    #    refmag; float magnitude above which reference stars are        #
+    #            considered to be reliable, and therefore used.         #
+    #    fitsky; boolean, if True; fit for planar sky around targets.   #
+    # verbosity; int counts verbosity level.                            #
+    #  executor; str how to run star and target fits: 'serial',         #
+    #            'thread' pool, or 'process' pool.                      #
+    #     nproc; int number of workers in pool (None: cpu count).       #
+    #     cache; boolean, if True; reuse reference star calibration.    #
+    #  cachedir; str directory in which to also cache calibrations.    #
+    # ----------------------------------------------------------------- #
+    # Output                                                            #
+    # ----------------------------------------------------------------- #
+    #       out: numpy structured array, one row per target, of RA,     #
+    #            DEC, flux (uJy), SNR, mag, err, mlim (NaN if invalid). #
+    #####################################################################
+    """
+    from .Analysis.Cosmology import bands, flux_0
+
+    RA, DEC = np.atleast_1d(RA).astype(float), np.atleast_1d(DEC).astype(float)
+    Nobj = len(RA)
+    #convert position of all targets to pixel at once
+    Xo, Yo = wcs.all_world2pix(RA, DEC, 0)
+    names = ['target'+str(i+1) for i in range(Nobj)]
+    
+    #reference star calibration on catalog image, once for all targets
+    sol = calibrate(catimage, wcs, cat, catname, RA, DEC, Xo, Yo, radius=radius, aperture=aperture, name=names, band=band, fwhm=fwhm, satmag=satmag, refmag=refmag, fitsky=fitsky, satpix=satpix, verbosity=verbosity, executor=executor, nproc=nproc, cache=cache, cachedir=cachedir)
+    catMags, catMagerrs = np.asarray(sol.catMags), np.asarray(sol.catMagerrs)
+    catIs, catSNs = np.asarray(sol.catIs), np.asarray(sol.catSNs)
+
+    #forced photometry on every target
+    if verbosity > 0:
+        print(("Computing photometry of "+str(Nobj)+" targets."))
+    phots = refmap(srcphot, image, [(Xo[i], Yo[i], sol.catPSF, sol.catPSFerr, psf, aperture, fwhm, fitsky, satpix, verbosity-1) for i in range(Nobj)], executor, nproc)
+    Xp, Yp, Io, SNo, skyNo = [np.array(col, dtype=float) for col in zip(*phots)]
+
+    out = np.zeros(Nobj, dtype=[('RA','f8'),('DEC','f8'),('flux','f8'),('SNR','f8'),('mag','f8'),('err','f8'),('mlim','f8')])
+    out['flux'], out['SNR'] = np.nan, np.nan
+    out['mag'], out['err'], out['mlim'] = np.nan, np.nan, np.nan
+    #calibrate valid targets against every reference star at once
+    valid = np.logical_and(np.logical_and(Io != 0, SNo != 0), skyNo != 0)
+    valid = np.logical_and(valid, np.isfinite(Io+SNo+skyNo))
+    if valid.any():
+        Iv, SNv = Io[valid][:,None], SNo[valid][:,None]
+        #relative flux of each target wrt each reference star
+        Ir = flux_0[bands[band]]*1e6*np.power(10,-catMags/2.5)*Iv/catIs
+        Ir_err = Ir*np.sqrt(np.square(1/catSNs)+np.square(np.log(10)*catMagerrs/2.5))
+        #weighted mean over reference stars
+        w = 1/np.square(Ir_err)
+        I = np.sum(Ir*w, axis=1)/np.sum(w, axis=1)
+        I_rand = np.sqrt(1/np.sum(w, axis=1))
+        I_err = np.sqrt((I/SNv[:,0])**2 + I_rand**2)
+        out['flux'][valid], out['SNR'][valid] = I, SNo[valid]
+        #magnitude from flux, where source is present
+        mag = np.full(len(I), np.nan)
+        err = np.full(len(I), np.nan)
+        pos = I > 0
+        mag[pos] = -2.5*np.log10(I[pos]/(flux_0[bands[band]]*1e6))
+        err[pos] = (2.5/np.log(10))*(I_err[pos]/I[pos])
+        out['mag'][valid], out['err'][valid] = mag, err
+    #measured position where source is present, else given position
+    good = np.isfinite(out['mag'])
+    Xw, Yw = np.where(good, Xp, Xo), np.where(good, Yp, Yo)
+    out['RA'], out['DEC'] = wcs.all_pix2world(Xw, Yw, 0)
+
+    if limsnr != 0:
+        #detection limit at each target with properly estimated sky noise
+        for i in np.arange(Nobj)[np.logical_and(skyNo != 0, np.isfinite(skyNo))]:
+            out['mlim'][i] = limitingM(10.0, 0.1, limsnr, sol.catPSF, sol.catPSFerr, skyNo[i], catMags, catMagerrs, catSNs, catIs, verbosity-1)[0]
+    return out
+
 #function: recursively calculates limiting magnitude by scaling PSF to SN3.0
 def limitingM(ru, rl, limsnr, PSF, PSFerr, skyN, catM, catMerr, catSN, catI, verbosity=0, level=0):
     """
@@ -679,6 +1031,8 @@ if __name__ == "__main__":
     parser.add_argument("-f", "--refMag", type=float, default=19.0, help="Reliable lower bound for reference star brightness")
     parser.add_argument("-d", "--diffIm", type=str, default=None, help="Difference fits image containing source, which if given will be used instead to perform source photometry. Original image will be used for reference star photometry. Difference image wcs and psf must match original image. If not, matching is required in preprocessing.")
     parser.add_argument("--fit_sky", action='store_const', const=True, default=False, help="Give this flag if it is desirable to fit for and subtract planar sky around the source.")
+    parser.add_argument("--executor", type=str, default='serial', help="How to run reference star fits: serial, thread, or process.")
+    parser.add_argument("--nproc", type=int, default=None, help="Number of workers for thread or process executor. Default is cpu count.")
     parser.add_argument("-v", "--verbosity", action="count", default=0)
     args = parser.parse_args()
     
@@ -696,10 +1050,10 @@ if __name__ == "__main__":
     
     #compute position, magnitude and error
     if args.noiseSNR != 0:
-        RA, DEC, I, SN, M, Merr, Mlim = magnitude(image, catimage, wcs, args.catalog, args.catname, (RA,DEC), radius=args.radius, aperture=args.aperture, psf=args.psf, name=args.source, band=args.band, fwhm=args.fwhm, limsnr=args.noiseSNR, satmag=args.satMag, refmag=args.refMag, fitsky=args.fit_sky, satpix=args.satpix, verbosity=args.verbosity)
+        RA, DEC, I, SN, M, Merr, Mlim = magnitude(image, catimage, wcs, args.catalog, args.catname, (RA,DEC), radius=args.radius, aperture=args.aperture, psf=args.psf, name=args.source, band=args.band, fwhm=args.fwhm, limsnr=args.noiseSNR, satmag=args.satMag, refmag=args.refMag, fitsky=args.fit_sky, satpix=args.satpix, verbosity=args.verbosity, executor=args.executor, nproc=args.nproc)
         #output position, magnitude
         print((time, RA, DEC, I, SN, M, Merr, Mlim))
     else:
-        RA, DEC, I, SN, M, Merr = magnitude(image, catimage, wcs, args.catalog, args.catname, (RA,DEC), radius=args.radius, aperture=args.aperture, psf=args.psf, name=args.source, band=args.band, fwhm=args.fwhm, limsnr=args.noiseSNR, satmag=args.satMag, refmag=args.refMag, fitsky=args.fit_sky, satpix=args.satpix, verbosity=args.verbosity)
+        RA, DEC, I, SN, M, Merr = magnitude(image, catimage, wcs, args.catalog, args.catname, (RA,DEC), radius=args.radius, aperture=args.aperture, psf=args.psf, name=args.source, band=args.band, fwhm=args.fwhm, limsnr=args.noiseSNR, satmag=args.satMag, refmag=args.refMag, fitsky=args.fit_sky, satpix=args.satpix, verbosity=args.verbosity, executor=args.executor, nproc=args.nproc)
         #output position, magnitude
         print((time, RA, DEC, I, SN, M, Merr))
@@ -22,6 +22,23 @@ def dist(x1, y1, x2, y2):
 def D2plane(xxx_todo_changeme, a, b, c):
     (x, y) = xxx_todo_changeme
     return (a*x + b*y + c).ravel()
+#function: closed form least squares fit of D2plane
+def D2plane_fit(xxx_todo_changeme, I, sigma=None):
+    """
+    Plane is linear in (a, b, c), so solve it directly rather than
+    iterating with curve_fit. Covariance matches curve_fit with
+    absolute_sigma=True (unit weights if sigma is None).
+    """
+    (x, y) = xxx_todo_changeme
+    A = np.column_stack((np.ravel(x), np.ravel(y), np.ones(np.size(x)))).astype(float)
+    I = np.ravel(I).astype(float)
+    if sigma is not None:
+        #weight rows by inverse error
+        w = 1.0/np.ravel(sigma)
+        A, I = A*w[:,None], I*w
+    popt = np.linalg.lstsq(A, I, rcond=None)[0]
+    pcov = np.linalg.inv(np.dot(A.T, A))
+    return popt, pcov
 
 ###############################################
 # Circular moffat function for PSF (legacy)   #
@@ -101,6 +118,36 @@ def E2moff(xxx_todo_changeme2, A, ax, ay, b, theta, x0, y0):
     (x, y) = xxx_todo_changeme2
     m = A*np.power(1+np.square(Mdist(x,y,x0,y0,ax,ay,theta)),-b)
     return m.ravel()
+#function: jacobian of elliptical 2D moffat function
+def E2moff_jac(xxx_todo_changeme2, A, ax, ay, b, theta, x0, y0, free=None):
+    """
+    Analytic partial derivatives of E2moff with respect to
+    [A, ax, ay, b, theta, x0, y0], one row per pixel, for use as
+    curve_fit jac instead of finite differences.
+    free selects the columns of parameters being fit.
+    """
+    (x, y) = xxx_todo_changeme2
+    rad = theta*np.pi/180
+    c, s = np.cos(rad), np.sin(rad)
+    xr, yr = rotI(np.ravel(x)-x0, np.ravel(y)-y0, theta)
+    u = 1+np.square(xr/ax)+np.square(yr/ay)
+    #moffat and its derivative wrt squared Mahalanobis distance
+    up = np.power(u,-b)
+    m = A*up
+    dmdD = -b*m/u
+    #chain rule through rotated coordinates
+    dDdxr, dDdyr = 2*xr/ax**2, 2*yr/ay**2
+    jac = np.empty((len(xr), 7))
+    jac[:,0] = up
+    jac[:,1] = dmdD*(-2*np.square(xr)/ax**3)
+    jac[:,2] = dmdD*(-2*np.square(yr)/ay**3)
+    jac[:,3] = -m*np.log(u)
+    jac[:,4] = dmdD*(dDdxr*yr - dDdyr*xr)*np.pi/180
+    jac[:,5] = dmdD*(-dDdxr*c + dDdyr*s)
+    jac[:,6] = dmdD*(-dDdxr*s - dDdyr*c)
+    if free is not None:
+        jac = jac[:,free]
+    return jac
 #function: integrate elliptical moffat function
 def E2moff_integrate(A, ax, ay, b, f=0.9):
     if b > 1:
@@ -272,3 +319,27 @@ def E2moff_multi(xxx_todo_changeme3, psftype, given, free):
                 out+= Sersic2D(amplitude=free[count],r_eff=free[count+1],n=float(psf[1:]),x_0=free[count+2],y_0=free[count+3],ellip=free[count+4],theta=free[count+5])(x,y)
                 count = count+6
     return out
+
+#function: jacobian of composite moffat psf for multiple objects
+def E2moff_multi_jac(xxx_todo_changeme3, psftype, given, free):
+    (x,y) = xxx_todo_changeme3
+    jac = np.zeros((np.size(x), len(free)))
+    count = 0
+    for i, psf in enumerate(psftype):
+        #fill columns of free parameters for each moffat
+        if psf == '3':
+            #given is empty, general psf params are all in free
+            jac[:,count:count+7] = E2moff_jac((x, y),*free[count:count+7])
+            count = count+7
+        if psf == '2':
+            #given contains [ax,ay,b,theta], free has [A, x0, y0]
+            jac[:,count:count+3] = E2moff_jac((x,y),free[count],given[i][0],given[i][1],given[i][2],given[i][3],free[count+1],free[count+2],free=[0,5,6])
+            count = count+3
+        if psf == '1':
+            #given contains [ax,ay,b,theta,x0,y0], free has [A]
+            jac[:,count:count+1] = E2moff_jac((x, y),free[count],*given[i],free=[0])
+            count = count+1
+        if psf[0] == 's':
+            #no analytic jacobian for sersic profile
+            return None
+    return jac
@@ -26,14 +26,35 @@ def dist(x1, y1, x2, y2):
     #Euclidean distance
     return np.sqrt(np.square(x1-x2)+np.square(y1-y2))
 
+#function: pixel axes of box within r of (x0,y0), clipped to image
+def ap_box(image, x0, y0, r):
+    xaxis = np.arange(max([0,x0-r]), min(image.shape[1],x0+r+1), dtype=int)
+    yaxis = np.arange(max([0,y0-r]), min(image.shape[0],y0+r+1), dtype=int)
+    return xaxis, yaxis
+
+#function: distance map from (x0,y0) over box, indexed [x][y]
+def ap_dist(x0, y0, xaxis, yaxis):
+    #broadcast x down rows and y across columns (x-major, like ap loops)
+    return np.sqrt(np.square(x0-xaxis)[:,None]+np.square(y0-yaxis)[None,:])
+
+#function: extract pixels in boolean mask over box, in x-major order
+def ap_mask(image, xaxis, yaxis, mask):
+    if not mask.any():
+        return np.array([]), np.array([]), np.array([])
+    #box is indexed [y][x] in image, transpose to [x][y] to match mask
+    box = image[np.ix_(yaxis, xaxis)].T
+    api = box[mask].astype(box.dtype.newbyteorder('='))
+    apx = np.broadcast_to(xaxis[:,None], mask.shape)[mask]
+    apy = np.broadcast_to(yaxis[None,:], mask.shape)[mask]
+    return api, apx, apy
+
 #function: photometric aperture at (x0,y0) from r1 to r2
 def ap_get(image, x0, y0, r1, r2):
-    xaxis = np.arange(max([0,x0-r2]), min(image.shape[1],x0+r2+1), dtype=int)
-    yaxis = np.arange(max([0,y0-r2]), min(image.shape[0],y0+r2+1), dtype=int)
-    api = np.array([image[y][x] for x in xaxis for y in yaxis if (dist(x0,y0,x,y)<=r2 and dist(x0,y0,x,y)>=r1)])
-    apx = np.array([x for x in xaxis for y in yaxis if (dist(x0,y0,x,y)<=r2 and dist(x0,y0,x,y)>=r1)])
-    apy = np.array([y for x in xaxis for y in yaxis if (dist(x0,y0,x,y)<=r2 and dist(x0,y0,x,y)>=r1)])
-    return api, apx, apy
+    xaxis, yaxis = ap_box(image, x0, y0, r2)
+    if len(xaxis) == 0 or len(yaxis) == 0:
+        return np.array([]), np.array([]), np.array([])
+    d = ap_dist(x0, y0, xaxis, yaxis)
+    return ap_mask(image, xaxis, yaxis, np.logical_and(d<=r2, d>=r1))
 
 #function: photometric aperture around multiple sources from r1 to r2
 def ap_multi(image, x0, y0, fitsky, r1, r2):
@@ -49,8 +70,8 @@ def ap_multi(image, x0, y0, fitsky, r1, r2):
     #Extract zone around all objects for which fitsky=1
     xaxis = np.arange(0,image.shape[1], dtype=int)
     yaxis = np.arange(0,image.shape[0], dtype=int)
-    xmask = np.zeros(image.shape[1])
-    ymask = np.zeros(image.shape[0])
+    xmask = np.zeros(image.shape[1], dtype=bool)
+    ymask = np.zeros(image.shape[0], dtype=bool)
     for i in range(Nobj):
         if fitsky[i] or i == 0:
             xap_single = np.absolute(xaxis-x0[i]) <= r2
@@ -59,25 +80,79 @@ def ap_multi(image, x0, y0, fitsky, r1, r2):
             ymask = np.logical_or(ymask, yap_single)
     xaxis = xaxis[xmask]
     yaxis = yaxis[ymask]
+    if len(xaxis) == 0 or len(yaxis) == 0:
+        return np.array([]), np.array([]), np.array([])
     #find union of all apertures in zone
-    apx, apy, api = [], [], []
-    for x in xaxis:
-        for y in yaxis:
-            #is this pixel in an aperture?
-            inap = False
-            for i in range(Nobj):
-                if dist(x0[i],y0[i],x,y)<=r2 and (fitsky[i] or i==0):
-                    inap = True
-            #exclude pixels too close to any objects
-            for i in range(Nobj):
-                if dist(x0[i],y0[i],x,y)<r1:
-                    inap = False
-            if inap:
-                apx.append(x)
-                apy.append(y)
-                api.append(image[y][x])
-    return np.array(api), np.array(apx), np.array(apy)
-    
+    inap = np.zeros((len(xaxis), len(yaxis)), dtype=bool)
+    near = np.zeros((len(xaxis), len(yaxis)), dtype=bool)
+    for i in range(Nobj):
+        d = ap_dist(x0[i], y0[i], xaxis, yaxis)
+        #is this pixel in an aperture?
+        if fitsky[i] or i==0:
+            inap |= d<=r2
+        #exclude pixels too close to any objects
+        near |= d<r1
+    inap &= ~near
+    return ap_mask(image, xaxis, yaxis, inap)
+
+#class: pixels and statistics of one sky annulus
+class SkyAnnulus:
+    """Sky annulus pixels between r1 and r2, with background statistics"""
+    def __init__(self, r1, r2, api, apx, apy, sat=40000.0):
+        self.r1, self.r2 = r1, r2
+        #clean saturated pixels
+        self.x, self.y, self.i = PSFclean(apx, apy, api, api, sat=sat)
+        #number of usable pixels
+        self.N = len(self.i)
+        if self.N > 0:
+            #first estimate mean background value
+            self.mean = np.mean(np.absolute(self.i))
+            #std of pixels within 3sigma of median (stars, cosmics)
+            res = self.i - np.median(self.i)
+            clip = np.absolute(res) < 3*np.std(res)
+            self.std = np.std(res[clip]) if clip.any() else 0.0
+        else:
+            self.mean = float('NaN')
+            self.std = float('NaN')
+
+#function: sky annuli around multiple sources, from one distance map
+def sky_annuli(image, x0, y0, fitsky, radii, sat=40000.0):
+    if hasattr(x0, '__iter__'):
+        Nobj = len(x0)
+    else:
+        Nobj = 1
+        x0 = [x0]
+        y0 = [y0]
+        fitsky = [fitsky]
+    #outermost radius defines zone around all objects for which fitsky=1
+    rmax = max([r2 for r1, r2 in radii])
+    xaxis = np.arange(0,image.shape[1], dtype=int)
+    yaxis = np.arange(0,image.shape[0], dtype=int)
+    xmask = np.zeros(image.shape[1], dtype=bool)
+    ymask = np.zeros(image.shape[0], dtype=bool)
+    for i in range(Nobj):
+        if fitsky[i] or i == 0:
+            xmask = np.logical_or(xmask, np.absolute(xaxis-x0[i]) <= rmax)
+            ymask = np.logical_or(ymask, np.absolute(yaxis-y0[i]) <= rmax)
+    xaxis = xaxis[xmask]
+    yaxis = yaxis[ymask]
+    #distance to nearest sky object, and to nearest object of any kind
+    shape = (len(xaxis), len(yaxis))
+    dsky = np.full(shape, np.inf)
+    dall = np.full(shape, np.inf)
+    for i in range(Nobj):
+        d = ap_dist(x0[i], y0[i], xaxis, yaxis)
+        if fitsky[i] or i == 0:
+            dsky = np.minimum(dsky, d)
+        dall = np.minimum(dall, d)
+    #same pixels as ap_multi for each annulus, without rescanning image
+    annuli = []
+    for r1, r2 in radii:
+        mask = np.logical_and(dsky<=r2, dall>=r1)
+        api, apx, apy = ap_mask(image, xaxis, yaxis, mask)
+        annuli.append(SkyAnnulus(r1, r2, api, apx, apy, sat))
+    return annuli
+
 #function: clean out cosmic rays and junk from PSF
 def PSFclean(x,y,psf,ref,skyN=None,sat=40000,fu=10,fl=10):
     #remove saturated pixels
@@ -106,8 +181,25 @@ def satpix(image):
     #Return saturation level
     return full/2.0
 
+#function: fits sky plane with iterative clipping, in closed form
+def SkyPlaneFit(x, y, I, sat=40000.0, clips=((2,1000),(2,2))):
+    
+    from .PSFlib import D2plane, D2plane_fit
+
+    #fit, then filter out noisy pixels at fu, fl sigma levels
+    for fu, fl in clips:
+        popt, pcov = D2plane_fit((x, y), I)
+        skyTheo = D2plane((x,y),*popt)
+        skyN = np.std(I-skyTheo)
+        x, y, I = PSFclean(x,y,I,skyTheo,skyN,sat,fu=fu,fl=fl)
+    #calculate better fit from cleaner data
+    popt, pcov = D2plane_fit((x, y), I)
+    skyN = np.std(I-D2plane((x,y),*popt))
+    #return plane, covariance, noise, and pixels used
+    return popt, pcov, skyN, x, y, I
+
 #function: fits background sky plane and noise
-def SkyFit(image, x0, y0, fitsky, fwhm=5.0, sat=40000.0, verbosity=0):
+def SkyFit(image, x0, y0, fitsky, fwhm=5.0, sat=40000.0, verbosity=0, linsky=True):
     #update 180610: x0, y0 need to be lists (even if length is 1)
     
     from scipy.optimize import curve_fit
@@ -122,63 +214,67 @@ def SkyFit(image, x0, y0, fitsky, fwhm=5.0, sat=40000.0, verbosity=0):
         y0 = [y0]
         fitsky = [fitsky]
 
-    #get background sky annulus
-    annulus1, x1, y1 = ap_multi(image, x0, y0, fitsky, 4*fwhm, 5*fwhm)
-    annulus2, x2, y2 = ap_multi(image, x0, y0, fitsky, 5*fwhm, 6*fwhm)
-    annulus3, x3, y3 = ap_multi(image, x0, y0, fitsky, 6*fwhm, 7*fwhm)
-    annulus4, x4, y4 = ap_multi(image, x0, y0, fitsky, 7*fwhm, 10*fwhm)
-    annulus5, x5, y5 = ap_multi(image, x0, y0, fitsky, 10*fwhm, 12*fwhm)
-    xs = [x1,x2,x3,x4,x5]
-    ys = [y1,y2,y3,y4,y5]
-    annuli = [annulus1, annulus2, annulus3, annulus4, annulus5]
+    #get background sky annuli in one pass over the 12fwhm zone
+    radii = [(4*fwhm,5*fwhm),(5*fwhm,6*fwhm),(6*fwhm,7*fwhm),(7*fwhm,10*fwhm),(10*fwhm,12*fwhm)]
+    annuli = sky_annuli(image, x0, y0, fitsky, radii, sat)
     colors = ['m','r','y','g','b']
-    #check all annuli
-    B = np.zeros(len(annuli))
-    for i in range(len(annuli)):
-        #clean saturated pixels
-        xs[i], ys[i], annuli[i] = PSFclean(xs[i],ys[i],annuli[i],annuli[i],sat=sat)
-        #get first estimate mean background value
-        B[i] = np.mean(np.absolute(annuli[i]))
+    #check all annuli for mean background value
+    B = np.array([annulus.mean for annulus in annuli])
     #pick annulus with lowest background
     lowest = np.argmin(B)
-    skyB, skyi, skyx, skyy = B[lowest], annuli[lowest], xs[lowest], ys[lowest]
+    skyB, skyi, skyx, skyy = B[lowest], annuli[lowest].i, annuli[lowest].x, annuli[lowest].y
     color = colors[lowest]
     
     #fit sky background
     try:
-        skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=[0,0,skyB], maxfev=maxfev, absolute_sigma=True)
-        #Fit function
-        skyTheo = D2plane((skyx,skyy),*skypopt)
-        skyN = np.std(skyi-skyTheo)
-        #filter out noisy pixels at 5sigma level (star)
-        skyx, skyy, skyi = PSFclean(skyx,skyy,skyi,skyTheo,skyN,sat,fu=2, fl=1000)
+        if linsky:
+            #closed form plane fit, clipping star then cosmics
+            try:
+                skypopt, skypcov, skyN, skyx, skyy, skyi = SkyPlaneFit(skyx, skyy, skyi, sat)
+            except np.linalg.LinAlgError:
+                #too few or collinear sky pixels left
+                raise PSFError('Unable to fit sky.')
+            if any(fitsky):
+                #plane is linear, fit error calculable once fit succeeds
+                skyperr = np.sqrt(np.diag(skypcov))
+            else:
+                skypopt = np.array([0,0,0])
+                skyperr = np.array([0,0,0])
+        else:
+            #iterative plane fit with curve_fit
+            skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=[0,0,skyB], maxfev=maxfev, absolute_sigma=True)
+            #Fit function
+            skyTheo = D2plane((skyx,skyy),*skypopt)
+            skyN = np.std(skyi-skyTheo)
+            #filter out noisy pixels at 5sigma level (star)
+            skyx, skyy, skyi = PSFclean(skyx,skyy,skyi,skyTheo,skyN,sat,fu=2, fl=1000)
 
-        #calculate better fit from cleaner data
-        skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=skypopt, maxfev=maxfev, absolute_sigma=True)
-        #Fit function
-        skyTheo = D2plane((skyx,skyy),*skypopt)
-        skyN = np.std(skyi-skyTheo)
-        #filter out noisy pixels at 5sigma level (cosmic rays/hot pix)
-        skyx, skyy, skyi = PSFclean(skyx,skyy,skyi,skyTheo,skyN,sat,fu=2, fl=2)
-        
-        if any(fitsky):
             #calculate better fit from cleaner data
             skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=skypopt, maxfev=maxfev, absolute_sigma=True)
-            try:
-                #try to calculate fit error
-                skyperr = np.sqrt(np.diag(skypcov))
-            except:
-                #fit error uncalculable
+            #Fit function
+            skyTheo = D2plane((skyx,skyy),*skypopt)
+            skyN = np.std(skyi-skyTheo)
+            #filter out noisy pixels at 5sigma level (cosmic rays/hot pix)
+            skyx, skyy, skyi = PSFclean(skyx,skyy,skyi,skyTheo,skyN,sat,fu=2, fl=2)
+        
+            if any(fitsky):
+                #calculate better fit from cleaner data
+                skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=skypopt, maxfev=maxfev, absolute_sigma=True)
                 try:
-                    #take closer initial conditions, try again
-                    skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=skypopt, maxfev=maxfev, absolute_sigma=True)
+                    #try to calculate fit error
                     skyperr = np.sqrt(np.diag(skypcov))
                 except:
-                    #fit error really is uncalculable, how???
-                    raise PSFError('Unable to fit sky.')
-        else:
-            skypopt = np.array([0,0,0])
-            skyperr = np.array([0,0,0])
+                    #fit error uncalculable
+                    try:
+                        #take closer initial conditions, try again
+                        skypopt, skypcov = curve_fit(D2plane, (skyx, skyy), skyi, p0=skypopt, maxfev=maxfev, absolute_sigma=True)
+                        skyperr = np.sqrt(np.diag(skypcov))
+                    except:
+                        #fit error really is uncalculable, how???
+                        raise PSFError('Unable to fit sky.')
+            else:
+                skypopt = np.array([0,0,0])
+                skyperr = np.array([0,0,0])
         #calculate sky noise near source
         skyTheo = D2plane((skyx,skyy),*skypopt)
         skyN = np.std(skyi-skyTheo)
@@ -205,6 +301,9 @@ def SkyFit(image, x0, y0, fitsky, fwhm=5.0, sat=40000.0, verbosity=0):
             plt.scatter(skyx-x1, skyy-y1, c=color, marker='.')
             plt.scatter(np.array(x0, dtype=int)-x1, np.array(y0, dtype=int)-y1, color='r', marker='.')
             plt.show()
+    except PSFError:
+        #sky fit failure already identified
+        raise
     except:
         #catastrophic failure of sky plane fitting, How???
         raise PSFError('Sky fitting catastrophic failure.')
@@ -220,7 +319,7 @@ def SkyFit(image, x0, y0, fitsky, fwhm=5.0, sat=40000.0, verbosity=0):
 def PSFextract(image, x0, y0, fwhm=5.0, fitsky=True, sat=40000.0, verbosity=0):
     
     from scipy.optimize import curve_fit
-    from .PSFlib import D2plane, E2moff, E2moff_toFWHM, E2moff_verify
+    from .PSFlib import D2plane, E2moff, E2moff_jac, E2moff_toFWHM, E2moff_verify
     
     #fit sky background in an annulus
     skypopt, skyperr, skyX2dof, skyN = SkyFit(image, [x0], [y0], [fitsky], fwhm, sat, verbosity)
@@ -258,7 +357,7 @@ def PSFextract(image, x0, y0, fwhm=5.0, fitsky=True, sat=40000.0, verbosity=0):
         #fit 2d psf to background subtracted source light
         est = [image[int(y0)][int(x0)],fwhm/4.0,fwhm,3.0,120.0,x0,y0]
         bounds = ([-float("Inf"),0.01,0.01,1.01,-float("Inf"),0.0,0.0],[float("Inf"),5*fwhm,5*fwhm,float("Inf"),float("Inf"),image.shape[1],image.shape[0]])
-        PSFpopt, PSFpcov = curve_fit(E2moff, (x, y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+        PSFpopt, PSFpcov = curve_fit(E2moff, (x, y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, jac=E2moff_jac, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
         #DONT FLAG COSMICS IN PSFEXTRACT, will break moffat function.
         #Fit function
         #I_theo = E2moff((x,y),*PSFpopt)
@@ -266,14 +365,14 @@ def PSFextract(image, x0, y0, fwhm=5.0, fitsky=True, sat=40000.0, verbosity=0):
         #x, y, intens = PSFclean(x,y,intens,I_theo,skyN,sat,10)
 
         #calculate better PSF from cleaner data
-        #PSFpopt, PSFpcov = curve_fit(E2moff, (x, y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2) , p0=PSFpopt, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+        #PSFpopt, PSFpcov = curve_fit(E2moff, (x, y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2) , p0=PSFpopt, jac=E2moff_jac, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
         try:
             #try to calculate fit error
             PSFperr = np.sqrt(np.diag(PSFpcov))
         except:
             try:
                 #take closer initial conditions
-                PSFpopt, PSFpcov = curve_fit(E2moff, (x, y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2) , p0=PSFpopt, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+                PSFpopt, PSFpcov = curve_fit(E2moff, (x, y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2) , p0=PSFpopt, jac=E2moff_jac, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
                 PSFperr = np.sqrt(np.diag(PSFpcov))
             except:
                 PSFperr = [0]*5
@@ -319,7 +418,7 @@ def PSFextract(image, x0, y0, fwhm=5.0, fitsky=True, sat=40000.0, verbosity=0):
 def PSFfit(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
 
     from scipy.optimize import curve_fit
-    from .PSFlib import D2plane, E2moff, E2moff_toFWHM, E2moff_verify
+    from .PSFlib import D2plane, E2moff, E2moff_jac, E2moff_toFWHM, E2moff_verify
 
     #get given fit parameters
     ax, axerr = PSF[0], PSFerr[0]
@@ -354,7 +453,7 @@ def PSFfit(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
         #fit 2d fixed psf to background subtracted source light
         est = [image[int(y0)][int(x0)],x0,y0]
         bounds = ([-float("Inf"),0,0],[float("Inf"),image.shape[1],image.shape[0]])
-        fitpopt, fitpcov = curve_fit(lambda xy,A,x0,y0: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+        fitpopt, fitpcov = curve_fit(lambda xy,A,x0,y0: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, jac=lambda xy,A,x0,y0: E2moff_jac(xy,A,ax,ay,b,theta,x0,y0,free=[0,5,6]), bounds=bounds, absolute_sigma=True, maxfev=maxfev)
         #parameters fitted to source
         A = fitpopt[0]
         X0 = fitpopt[1]
@@ -366,14 +465,15 @@ def PSFfit(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
         x, y, intens = PSFclean(x,y,intens,I_theo,skyN,sat,10,10)
 
         #calculate better PSF from cleaner data
-        fitpopt, fitpcov = curve_fit(lambda xy,A,x0,y0: E2moff(xy,A,ax,ay,b,theta,X0,Y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+        #position is held at X0,Y0 in this fit, so it has no position derivative
+        fitpopt, fitpcov = curve_fit(lambda xy,A,x0,y0: E2moff(xy,A,ax,ay,b,theta,X0,Y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, jac=lambda xy,A,x0,y0: E2moff_jac(xy,A,ax,ay,b,theta,X0,Y0,free=[0,5,6])*[1,0,0], bounds=bounds, absolute_sigma=True, maxfev=maxfev)
         try:
             #try to calculate fit error
             fitperr = np.sqrt(np.diag(fitpcov))
         except:
             try:
                 #take closer initial conditions
-                fitpopt, fitpcov = curve_fit(lambda xy,A,x0,y0: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+                fitpopt, fitpcov = curve_fit(lambda xy,A,x0,y0: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, jac=lambda xy,A,x0,y0: E2moff_jac(xy,A,ax,ay,b,theta,x0,y0,free=[0,5,6]), bounds=bounds, absolute_sigma=True, maxfev=maxfev)
                 fitperr = np.sqrt(np.diag(fitpcov))
             except:
                 fitperr = [0]*3
@@ -413,7 +513,7 @@ def PSFfit(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
 def PSFscale(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
     
     from scipy.optimize import curve_fit
-    from .PSFlib import D2plane, E2moff, E2moff_toFWHM, E2moff_verify
+    from .PSFlib import D2plane, E2moff, E2moff_jac, E2moff_toFWHM, E2moff_verify
 
     #get given fit parameters
     ax, axerr = PSF[0], PSFerr[0]
@@ -441,7 +541,7 @@ def PSFscale(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
     try:
         #fit 2d fixed psf to background subtracted source light
         est = [image[int(y0)][int(x0)]]
-        fitpopt, fitpcov = curve_fit(lambda xy,A: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, absolute_sigma=True, maxfev=maxfev)
+        fitpopt, fitpcov = curve_fit(lambda xy,A: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, jac=lambda xy,A: E2moff_jac(xy,A,ax,ay,b,theta,x0,y0,free=[0]), absolute_sigma=True, maxfev=maxfev)
         #parameters fitted to source
         PSFpopt = [fitpopt[0],ax,ay,b,theta,x0,y0]
         #Fit function
@@ -450,14 +550,14 @@ def PSFscale(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
         x, y, intens = PSFclean(x,y,intens,I_theo,skyN,sat,10,10)
 
         #calculate better PSF from cleaner data
-        fitpopt, fitpcov = curve_fit(lambda xy,A: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, absolute_sigma=True, maxfev=maxfev)
+        fitpopt, fitpcov = curve_fit(lambda xy,A: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, jac=lambda xy,A: E2moff_jac(xy,A,ax,ay,b,theta,x0,y0,free=[0]), absolute_sigma=True, maxfev=maxfev)
         try:
             #try to calculate fit error
             fitperr = np.sqrt(np.diag(fitpcov))
         except:
             try:
                 #take closer initial conditions
-                fitpopt, fitpcov = curve_fit(lambda xy,A: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, absolute_sigma=True, maxfev=maxfev)
+                fitpopt, fitpcov = curve_fit(lambda xy,A: E2moff(xy,A,ax,ay,b,theta,x0,y0), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, jac=lambda xy,A: E2moff_jac(xy,A,ax,ay,b,theta,x0,y0,free=[0]), absolute_sigma=True, maxfev=maxfev)
                 fitperr = np.sqrt(np.diag(fitpcov))
             except:
                 fitperr = [0]
@@ -494,7 +594,7 @@ def PSFscale(image, PSF, PSFerr, x0, y0, fitsky=True, sat=40000.0, verbosity=0):
 def PSFmulti(image, PSF, PSFerr, psftype, x0, y0, fitsky, sat=40000.0, verbosity=0):
 
     from scipy.optimize import curve_fit
-    from .PSFlib import D2plane, E2moff_multi, E2moff_toFWHM, E2moff_verify
+    from .PSFlib import D2plane, E2moff_multi, E2moff_multi_jac, E2moff_toFWHM, E2moff_verify
 
     maxfev = 1000000
 
@@ -563,24 +663,29 @@ def PSFmulti(image, PSF, PSFerr, psftype, x0, y0, fitsky, sat=40000.0, verbosity
     
     given = np.array(given)
     bounds = (lbounds,ubounds)
+    if any([psf[0] == 's' for psf in psftype]):
+        #no analytic jacobian for sersic profile, use finite differences
+        jac = '2-point'
+    else:
+        jac = lambda xy,*free: E2moff_multi_jac(xy,psftype, given, free)
     
     try:
         #fit 2d fixed psf to background subtracted source light
-        fitpopt, fitpcov = curve_fit(lambda xy,*free: E2moff_multi(xy,psftype, given, free), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+        fitpopt, fitpcov = curve_fit(lambda xy,*free: E2moff_multi(xy,psftype, given, free), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=est, jac=jac, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
         #Fit function
         I_theo = E2moff_multi((x, y),psftype, given, fitpopt)
         #filter out noisy pixels at 5sigma level (cos rays/hot pix)
         x, y, intens = PSFclean(x,y,intens,I_theo,skyN,sat,10,10)
 
         #calculate better PSF from cleaner data
-        fitpopt, fitpcov = curve_fit(lambda xy,*free: E2moff_multi(xy,psftype, given, free), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+        fitpopt, fitpcov = curve_fit(lambda xy,*free: E2moff_multi(xy,psftype, given, free), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, jac=jac, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
         try:
             #try to calculate fit error
             fitperr = np.sqrt(np.diag(fitpcov))
         except:
             try:
                 #take closer initial conditions
-                fitpopt, fitpcov = curve_fit(lambda xy,*free: E2moff_multi(xy,psftype, given, free), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
+                fitpopt, fitpcov = curve_fit(lambda xy,*free: E2moff_multi(xy,psftype, given, free), (x,y), intens, sigma=np.sqrt(np.absolute(intens)+skyN**2), p0=fitpopt, jac=jac, bounds=bounds, absolute_sigma=True, maxfev=maxfev)
                 fitperr = np.sqrt(np.diag(fitpcov))
             except:
                 fitperr = [0]*len(est)
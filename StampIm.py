@@ -26,17 +26,19 @@ def make_stamp_image(filename, ra, dec, radius=100):
     from astropy.wcs import WCS
     import matplotlib.pyplot as plt
 
-    #load HDU image
+    from .MagCalc import imageHDU
+
+    #load HDU image, fpack (.fz) frames are read tile by tile
     hdulist = fits.open(filename)
-    wcs = WCS(filename)
-    image = hdulist[0].data
-    #close HDU image
-    hdulist.close()
+    hdu = imageHDU(hdulist)
+    wcs = WCS(hdu.header, hdulist)
 
     cX, cY = wcs.all_world2pix(ra, dec, 0)
-    cX, cY = int(round(cX)), int(round(cY))
-    image = image.T[cX-radius:cX+radius+1].T
-    image = image[cY-radius:cY+radius+1]
+    cX, cY = int(round(float(cX))), int(round(float(cY)))
+    #read only section (decompress only tiles) under stamp
+    image = hdu.section[max(cY-radius,0):cY+radius+1, max(cX-radius,0):cX+radius+1]
+    #close HDU image
+    hdulist.close()
     return image
 
 #function: create A4 collage of stamp images with filename as subtext
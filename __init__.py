@@ -11,7 +11,9 @@ from .CropIm import *
 from .StampIm import *
 from .DiffIm import *
 from .BinIm import *
+from .ImIndex import *
 from .ColorCorr import *
 from .AutoSEx import *
 from .MatchPhot import *
 from .ClickMag import *
+from .LightCurve import *
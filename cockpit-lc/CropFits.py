@@ -3,6 +3,7 @@
 # Author:   Yuan Qi Ni                                          #
 # Date:     Apr., 26, 2018                                      #
 # Function: Program crops raw fits files into given size.       #
+#           Crops run in parallel, existing crops are skipped.  #
 #           Update /raw files and ObjData.py before running.    #
 #################################################################
 
@@ -11,7 +12,7 @@ import os
 from glob import glob
 
 #essential imports
-from SNAP.CropIm import make_crop_image
+from SNAP.CropIm import make_crop_batch
 from ContextManager import cd
 from ObjData import *
 
@@ -22,20 +23,21 @@ wd = os.getcwd()
 with cd(wd+"/../"):
     if not os.path.isdir("crop"): os.mkdir('crop')
 
-#raw image files
-filenames = sorted(glob('../raw/'+prefix+'*.fits'))
+#raw image files, fpack compressed frames are cropped directly
+filenames = sorted(glob('../raw/'+prefix+'*.fits')+glob('../raw/'+prefix+'*.fits.fz'))
 
 #crop files write path
 outpath = '../crop/'
 
-#crop each file if not already cropped
+#output file for each input file, unpacked frame preferred over .fz
+crops = {}
 for filename in filenames:
-    #input file
     imname = filename.split("/")[-1]
-    #output file
-    outname = outpath+imname[:-4]+'crop.fits'
-
-    if os.path.exists(outname):
-        print(outname+" already exists")
-    else:
-        make_crop_image(filename, outname, ra, dec, size/2)
+    if imname.endswith('.fz'): imname = imname[:-3]
+    crops.setdefault(outpath+imname[:-4]+'crop.fits', filename)
+outnames = sorted(crops)
+filenames = [crops[outname] for outname in outnames]
+
+#crop each file if not already cropped, on process pool
+if __name__ == "__main__":
+    make_crop_batch(filenames, outnames, ra, dec, size/2, overwrite=False, atomic=True)
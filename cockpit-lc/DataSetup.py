@@ -35,13 +35,19 @@ os.system("rsync -tv "+rawfiles+"REF_Images/*.fits ../ref/")
 #synchronize raw files from remote
 os.system("rsync -tv "+rawfiles+"*.fz ../raw/")
 
+#SNAP loading, cropping and stamping read .fz tiles directly, but
+#Diffgen.py, Diffold.py and LCbgen.py still look for unpacked ../raw/*.fits
+#set False only if those are not used
+unpack = True
+
 #unpack files
-with cd(wd+"/../raw/"):
-    filenames = sorted(glob(prefix+'*.fits.fz'))
-    #if not already unpacked, unpack
-    for filename in filenames:
-        outname = filename[:-3]
-        if os.path.exists(outname):
-            print("Already unpacked "+outname)
-        else:
-            subprocess.call(['funpack',filename])
+if unpack:
+    with cd(wd+"/../raw/"):
+        filenames = sorted(glob(prefix+'*.fits.fz'))
+        #if not already unpacked, unpack
+        for filename in filenames:
+            outname = filename[:-3]
+            if os.path.exists(outname):
+                print("Already unpacked "+outname)
+            else:
+                subprocess.call(['funpack',filename])
@@ -67,3 +67,7 @@ rellvl = 16.0
 satpix = 40000.0
 #number of reference stars used in each band
 nrefs = [11,13,19]
+#number of processes making light curve (None uses all cores)
+nproc = None
+#also keep binary .npy light curves, faster to load and append to
+binary = False
@@ -19,6 +19,7 @@ from multiprocessing import Pool
 from SNAP.Analysis.LCRoutines import*
 from SNAP.Analysis.LCFitting import*
 from SNAP.Analysis.Cosmology import*
+from SNAP.Analysis.ShockMod import*
 from ObjData import *
 
 #ejecta mass in chandrasekhar masses
@@ -75,6 +76,13 @@ print("Sigma levels:",limSNs)
 print("Trial a13s:", a13s)
 print("Trial thetas:",thetas)
 
+#distance modulus
+DM = intDM(z)
+#tabulate Kasen models over a13s
+print("Tabulating Kasen model grid")
+grid = KasenGrid(a13s, m_cs=[m_c], e_51s=[e_51], zs=[z],
+                 waves=[wave_0[bands[b]] for b in band], cachedir='.')
+
 #for each confidence interval
 for n, conf in enumerate(confs):
     #array to hold percent of viewing angles ruled out for each a13 at this conf
@@ -89,7 +97,7 @@ for n, conf in enumerate(confs):
         #for each band
         for i in range(len(t)):
             #generate theoretical light curve
-            Lk = np.array([KasenFit(ti, a13, 1.0, wave_0[bands[band[i]]], m_c, e_51, z, 0) for ti in t[i]])
+            Lk = grid.flux(t[i], a13, 1.0, wave_0[bands[band[i]]], z, m_c, e_51, DM, 0)
 
             #compare to observed for each viewing angle
             for k, theta in enumerate(thetas):
@@ -116,7 +124,7 @@ for n, conf in enumerate(confs):
             #plot section
             f, ax = plt.subplots(len(t), sharex=True) 
             for i in range(len(t)):
-                Lk = np.array([KasenFit(ti, a13, 1.0, wave_0[bands[band[i]]], m_c, e_51, z, 0) for ti in t[i]])
+                Lk = grid.flux(t[i], a13, 1.0, wave_0[bands[band[i]]], z, m_c, e_51, DM, 0)
                 Fk = Lk*Kasen_isocorr(153)
                 #Fk = Lk*Kasen_isocorr(180)
                 ax[i].errorbar(t[i], F[i], yerr=sig*F_err[i], fmt="k+")
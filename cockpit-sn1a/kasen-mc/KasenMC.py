@@ -16,12 +16,12 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.stats import norm
-from multiprocessing import Pool
 
 #essential files
 from SNAP.Analysis.LCRoutines import*
 from SNAP.Analysis.LCFitting import*
 from SNAP.Analysis.Cosmology import*
+from SNAP.Analysis.ShockMod import*
 from ObjData import *
 
 #ejecta mass in chandrasekhar masses
@@ -82,6 +82,23 @@ print("Sigma levels:",limSNs)
 print("Trial a13s:", a13s)
 print("Trial thetas:",thetas)
 
+#distance modulus
+DM = intDM(z)
+#tabulate Kasen models over a13s, spanning errors in m_c, e_51, z
+#out to widest confidence interval of MCerr trials, flux of trials
+#outside the grid is NaN
+print("Tabulating Kasen model grid")
+smax = norm.ppf((1+max(confs))/2.0)
+span = np.linspace(-smax, smax, 9)
+grid = KasenGrid(a13s, m_cs=np.maximum(m_c+span*m_c_err, 0.01*m_c),
+                 e_51s=np.maximum(e_51+span*e_51_err, 0.01*e_51),
+                 zs=np.maximum(z+span[::2]*zerr, 0.01*z),
+                 waves=[wave_0[bands[b]] for b in band], cachedir='.')
+
+#function: interpolated Kasen flux, trial parameters last for MCerr
+def gridflux(t_day, a13, kappa, wave, z, m_c, e_51, t0):
+    return grid.flux(t_day, a13, kappa, wave, z, m_c, e_51, DM, t0)
+
 #Note in log for reference
 outfile = open(logfile, 'a')
 outfile.write(" ; Confs "+str(confs))
@@ -96,101 +113,74 @@ def gen_a13(a13, conf):
     Fk_errs = []
     for i in range(len(t)):
         #print band[i]
-        Fk = np.zeros(len(t[i]))
-        Fk_err = np.zeros(len(t[i]))
-        for r in range(len(t[i])):
-            #get theoretical light curve at each time
-            Fk[r], Fk_err[r] = MCerr(KasenFit, [t[i][r], a13, 1.0,
-                                                wave_0[bands[band[i]]]],
-                                     [m_c, e_51, z, 0],
-                                     [m_c_err, e_51_err, zerr, t0err],
-                                     [nmc,nmc,nmc,nmc], conf)
-            #Assumptions here:
-            #Independent parameters is a good assumption (MCerr uses this)
-            #No covariance simulation needed.
+        #get theoretical light curve at all times, trials in one call
+        Fk, Fk_err = MCerr(gridflux, [t[i], a13, 1.0,
+                                      wave_0[bands[band[i]]]],
+                           [z, m_c, e_51, 0],
+                           [zerr, m_c_err, e_51_err, t0err],
+                           [nmc,nmc,nmc,nmc], conf, vectorized=True)
+        #Assumptions here:
+        #Independent parameters is a good assumption (MCerr uses this)
+        #No covariance simulation needed.
         Fks.append(Fk)
         Fk_errs.append(Fk_err)
     print("done model at a13:", a13)
     return Fks, Fk_errs
 
-def test_a13(gen, gen_err, sig, flim):
-    #boolean mask for whether angle is ruled out to given confidence
-    print("Testing model at sig:", sig)
-    mask = np.array([True]*len(thetas))
+def test_a13(a13, gen, gen_err, sigs, flims):
+    #boolean matrix for whether angle is ruled out at each sig
+    print("Testing model at a13:", a13)
+    mask = np.ones((len(sigs), len(thetas)), dtype=bool)
     
     for i in range(len(t)):
-        for k, theta in enumerate(thetas):
-            #check if any points rule out angle with conf
-            if ruleout(F[i], F_err[i], gen[i], gen_err[i], theta, sig, flim[i]):
-                mask[k] = False
+        #check if any points rule out angles with each conf
+        flim = np.array([flim[i] for flim in flims])
+        mask &= ~ruleout(F[i], F_err[i], gen[i], gen_err[i], thetas, sigs, flim)
     
-    #At this confidence level, we rule out some percent of angles
-    outangles = 180.0*float(len(thetas)-len(thetas[mask]))/len(thetas)
+    #At each confidence level, we rule out some percent of angles
+    outangles = 180.0*(len(thetas)-mask.sum(axis=1))/float(len(thetas))
     #record some stuff into log for some intermediary reference
     outfile = open(logfile, 'a')
-    outfile.write(str(norm.cdf(sig))+"\t"+str(a13)+"\t"+str(outangles)+"\n")
+    for sig, outangle in zip(sigs, outangles):
+        outfile.write(str(norm.cdf(sig))+"\t"+str(a13)+"\t"+str(outangle)+"\n")
     outfile.close()
-    #Angles ruled out at confidence sig 
+    #Angles ruled out at each confidence sig 
     return outangles
 
-nproc = 32
-
 print("Generating Synthetic Light Curves")
-#generate synthetic light curves
-pool = Pool(nproc)
-procs = []
-#for each model
-for j, a13 in enumerate(a13s):
-    #start process to generate model, taking highest confidence interval
-    procs.append(pool.apply_async(gen_a13, [a13, confs[-1]]))
-#array to hold generated light curves
-genlcs = []
-#get processes
-print("Processes", len(procs))
-for n, proc in enumerate(procs):
-    print("getting proc",n)
-    genlcs.append(proc.get())
-    print("got proc",n)
-pool.terminate()
+#generate synthetic light curves from grid, taking highest confidence interval
+genlcs = [gen_a13(a13, confs[-1]) for a13 in a13s]
 print("Generated Light Curves")
 
 print("Checking Against Observations")
-outangles = []
-#for each confidence interval
-for n, conf in enumerate(confs):
-    #sigma needed to establish confidence below LC
-    sig = norm.ppf(conf)
-    
-    pool = Pool(nproc)
-    procs = []
-    #for each generated model
-    for j, a13 in enumerate(a13s):
-        Fks = genlcs[j][0]
-        Fk_errs = genlcs[j][1]
-        #start process to test model against data
-        procs.append(pool.apply_async(test_a13, [Fks, Fk_errs, sig, flimconf[n]]))
-        """
-        #Diagnostic tool
-        if n == 2 and a13 > 0.195 and a13 < 0.205:
-            print "plotting section"
-            #plot section
-            f, ax = plt.subplots(len(t), sharex=True) 
-            for i in range(len(t)):
-                c = Kasen_isocorr(80)
-                ax[i].errorbar(t[i], F[i], yerr=sig*F_err[i], fmt="k+")
-                ax[i].errorbar(t[i], Fks[i]*c, yerr=sig*Fk_errs[i]*c, fmt="g+")
-                ax[i].scatter(t[i], flimconf[n][i], color='r', marker='v')
-            plt.subplots_adjust(hspace=None)
-            plt.show()
-        """
-    #percent of viewing angles ruled out for each a13 model at this conf
-    outangles.append([proc.get() for proc in procs])
-    pool.terminate()
+#sigma needed to establish each confidence below LC
+sigs = norm.ppf(confs)
+#percent of viewing angles ruled out at each conf for each a13 model
+outangles = np.array([test_a13(a13, genlcs[j][0], genlcs[j][1], sigs, flimconf)
+                      for j, a13 in enumerate(a13s)]).T
+"""
+#Diagnostic tool
+n = 2
+sig = sigs[n]
+for j, a13 in enumerate(a13s):
+    Fks = genlcs[j][0]
+    Fk_errs = genlcs[j][1]
+    if a13 > 0.195 and a13 < 0.205:
+        print "plotting section"
+        #plot section
+        f, ax = plt.subplots(len(t), sharex=True) 
+        for i in range(len(t)):
+            c = Kasen_isocorr(80)
+            ax[i].errorbar(t[i], F[i], yerr=sig*F_err[i], fmt="k+")
+            ax[i].errorbar(t[i], Fks[i]*c, yerr=sig*Fk_errs[i]*c, fmt="g+")
+            ax[i].scatter(t[i], flimconf[n][i], color='r', marker='v')
+        plt.subplots_adjust(hspace=None)
+        plt.show()
+"""
 print("Checked Against Observations.")
 print("DONE!")    
 
 print("Saving...")
 #Output ruled out angles vs a13
-outangles = np.array(outangles)
 out = np.concatenate(([a13s], outangles), axis=0)
 np.savetxt(kasfile, out.T)